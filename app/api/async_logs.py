@@ -0,0 +1,77 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List
+from app.api.responses import OPERATIONAL_LOG_COLUMNS, RECONCILIATION_LOG_COLUMNS, RECONCILIATION_LOG_EXTRA_KEYS, json_rows_response
+from app.db.async_base import get_async_db
+from app.schemas.schemas import OperationalLog, ReconciliationLog
+from app.services.async_log_service import (
+    get_operational_logs,
+    create_operational_log,
+    get_reconciliation_logs
+)
+from app.services.reconciliation_service import reconciliation_log_rows
+
+# create router for log operations, mounted ahead of the sync one when DB_MODE=async
+router = APIRouter()
+
+@router.get("/operational", response_model=List[OperationalLog])
+async def get_operational_logs_endpoint(
+    skip: int = Query(0, ge=0, description="number of records to skip"),
+    limit: int = Query(100, ge=1, le=1000, description="maximum number of records to return"),
+    db: AsyncSession = Depends(get_async_db)
+) -> Response:
+    """
+    get operational logs
+    args:
+        skip (int): number of records to skip
+        limit (int): maximum number of records to return
+        db (AsyncSession): async database session
+    returns:
+        Response: json list of operational logs
+    raises:
+        HTTPException: if log retrieval fails
+    """
+    try:
+        rows = await get_operational_logs(db, skip, limit, OPERATIONAL_LOG_COLUMNS)
+        return json_rows_response(rows, OPERATIONAL_LOG_COLUMNS)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"error getting operational logs: {str(e)}")
+
+@router.post("/operational", response_model=OperationalLog)
+async def create_operational_log_endpoint(
+    message: str,
+    db: AsyncSession = Depends(get_async_db)
+) -> OperationalLog:
+    """
+    create a new operational log
+    args:
+        message (str): message to log
+        db (AsyncSession): async database session
+    returns:
+        OperationalLog: created log entry
+    raises:
+        HTTPException: if log creation fails
+    """
+    try:
+        return await create_operational_log(db, message)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/reconciliation", response_model=List[ReconciliationLog])
+async def get_reconciliation_logs_endpoint(
+    skip: int = 0,
+    limit: int = 100,
+    db: AsyncSession = Depends(get_async_db)
+) -> Response:
+    """
+    get a list of reconciliation logs
+    args:
+        skip (int): number of records to skip
+        limit (int): maximum number of records to return
+        db (AsyncSession): async database session
+    returns:
+        Response: json list of reconciliation logs
+    """
+    rows = await get_reconciliation_logs(db, skip, limit, newest_first=False, columns=RECONCILIATION_LOG_COLUMNS)
+    rows = await db.run_sync(reconciliation_log_rows, rows)
+    return json_rows_response(rows, RECONCILIATION_LOG_COLUMNS, extra_keys=RECONCILIATION_LOG_EXTRA_KEYS)
@@ -0,0 +1,141 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from typing import List, Optional
+from datetime import date, datetime
+import queue
+from app.api.responses import DISCREPANCY_COLUMNS, RECONCILIATION_LOG_COLUMNS, RECONCILIATION_LOG_EXTRA_KEYS, json_rows_response
+from app.db.async_base import get_async_db
+from app.db.base import SessionLocal
+from app.models.models import ReconciliationLog as ReconciliationLogModel
+from app.schemas.schemas import ReconciliationDiscrepancy, ReconciliationJob, ReconciliationLog
+from app.services.reconciliation_job_service import get_reconciliation_job, submit_reconciliation_job
+from app.services.async_log_service import get_reconciliation_logs
+from app.services.async_reconciliation_service import get_discrepancies
+from app.services.reconciliation_service import reconciliation_log_rows
+
+# create router, mounted ahead of the sync reconciliation router when DB_MODE=async
+router = APIRouter()
+
+@router.post("/run", response_model=ReconciliationJob, status_code=202)
+async def trigger_reconciliation(
+    cutoff: Optional[datetime] = Query(None, description="only reconcile trades booked at or before this time"),
+    rebuild: bool = Query(False, description="rebuild the incremental trade aggregates from every trade"),
+    key: Optional[str] = Query(None, description="comma separated columns to reconcile by, e.g. trader,asset_class"),
+    as_of: Optional[date] = Query(None, description="reconcile this past business date against its positions snapshot"),
+    snapshot_id: Optional[int] = Query(None, description="read positions from this stored snapshot instead of the file")
+) -> ReconciliationJob:
+    """
+    queue a reconciliation run, poll /jobs/{job_id} for its outcome
+    the job runs on the background executor with a sync session, so the
+    pandas comparison no longer blocks the event loop
+    args:
+        cutoff (Optional[datetime]): only reconcile trades booked at or before this time
+        rebuild (bool): rebuild the incremental trade aggregates from every trade
+        key (Optional[str]): comma separated columns to reconcile by
+        as_of (Optional[date]): reconcile this past business date, excludes cutoff
+        snapshot_id (Optional[int]): read positions from this stored snapshot
+    returns:
+        ReconciliationJob: queued or already running job
+    raises:
+        HTTPException: if the key is invalid, both cutoff and as_of are given or the job queue is full
+    """
+    try:
+        return submit_reconciliation_job(SessionLocal, cutoff, rebuild=rebuild, key=key, as_of=as_of, snapshot_id=snapshot_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except queue.Full as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+@router.get("/jobs/{job_id}", response_model=ReconciliationJob)
+async def get_reconciliation_job_status(
+    job_id: str,
+    db: AsyncSession = Depends(get_async_db)
+) -> ReconciliationJob:
+    """
+    get the status and progress of a reconciliation job
+    args:
+        job_id (str): job id returned by /run
+        db (AsyncSession): async database session
+    returns:
+        ReconciliationJob: job with its reconciliation log once completed
+    raises:
+        HTTPException: if the job is unknown
+    """
+    job = get_reconciliation_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="reconciliation job not found")
+    if job["reconciliation_log_id"] is not None:
+        # the discrepancies view and stages read related rows, which cannot lazy load on an async session
+        job["result"] = await db.get(
+            ReconciliationLogModel,
+            job["reconciliation_log_id"],
+            options=[
+                selectinload(ReconciliationLogModel.discrepancy_rows),
+                selectinload(ReconciliationLogModel.stages)
+            ]
+        )
+    return job
+
+@router.get("/logs", response_model=List[ReconciliationLog])
+async def get_reconciliation_logs_endpoint(
+    skip: int = Query(0, ge=0, description="number of records to skip"),
+    limit: int = Query(100, ge=1, le=1000, description="maximum number of records to return"),
+    db: AsyncSession = Depends(get_async_db)
+) -> Response:
+    """
+    get reconciliation logs
+    args:
+        skip (int): number of records to skip
+        limit (int): maximum number of records to return
+        db (AsyncSession): async database session
+    returns:
+        Response: json list of reconciliation logs
+    raises:
+        HTTPException: if log retrieval fails
+    """
+    try:
+        rows = await get_reconciliation_logs(db, skip, limit, columns=RECONCILIATION_LOG_COLUMNS)
+        rows = await db.run_sync(reconciliation_log_rows, rows)
+        return json_rows_response(rows, RECONCILIATION_LOG_COLUMNS, extra_keys=RECONCILIATION_LOG_EXTRA_KEYS)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"error getting reconciliation logs: {str(e)}")
+
+@router.get("/discrepancies", response_model=List[ReconciliationDiscrepancy])
+async def get_discrepancies_endpoint(
+    asset_class: Optional[str] = Query(None, description="filter by asset class"),
+    trader: Optional[str] = Query(None, description="filter by trader name"),
+    type: Optional[str] = Query(None, description="filter by discrepancy type, quantity or price"),
+    start: Optional[datetime] = Query(None, description="only runs at or after this time"),
+    end: Optional[datetime] = Query(None, description="only runs at or before this time"),
+    reconciliation_log_id: Optional[int] = Query(None, description="only this reconciliation run"),
+    skip: int = Query(0, ge=0, description="number of records to skip"),
+    limit: int = Query(100, ge=1, le=1000, description="maximum number of records to return"),
+    db: AsyncSession = Depends(get_async_db)
+) -> Response:
+    """
+    query discrepancies across reconciliation runs, newest run first
+    args:
+        asset_class (Optional[str]): filter by asset class
+        trader (Optional[str]): filter by trader name
+        type (Optional[str]): filter by discrepancy type
+        start (Optional[datetime]): only runs at or after this time
+        end (Optional[datetime]): only runs at or before this time
+        reconciliation_log_id (Optional[int]): only this reconciliation run
+        skip (int): number of records to skip
+        limit (int): maximum number of records to return
+        db (AsyncSession): async database session
+    returns:
+        Response: json list of discrepancies
+    raises:
+        HTTPException: if the range is invalid or the query fails
+    """
+    if start and end and start > end:
+        raise HTTPException(status_code=400, detail="start must not be after end")
+    try:
+        rows = await get_discrepancies(
+            db, asset_class, trader, type, start, end, reconciliation_log_id, skip, limit, DISCREPANCY_COLUMNS
+        )
+        return json_rows_response(rows, DISCREPANCY_COLUMNS)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"error getting discrepancies: {str(e)}")
@@ -0,0 +1,128 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from app.db.async_base import get_async_db
+from app.schemas.schemas import Trade, TradeCreate
+from app.models.models import TradeStatus
+from app.api.responses import TRADE_COLUMNS, json_rows_response
+from app.api.trades import NEXT_CURSOR_HEADER
+from app.services.async_trade_service import (
+    create_trade,
+    get_trades_page,
+    get_trade_by_id,
+    update_trade_status
+)
+
+# create router, mounted ahead of the sync trades router when DB_MODE=async
+router = APIRouter()
+
+@router.post("/", response_model=Trade)
+async def create_trade_endpoint(
+    trade: TradeCreate,
+    db: AsyncSession = Depends(get_async_db)
+) -> Trade:
+    """
+    create a new trade
+    args:
+        trade (TradeCreate): trade data to create
+        db (AsyncSession): async database session
+    returns:
+        Trade: created trade
+    raises:
+        HTTPException: if trade creation fails
+    """
+    try:
+        return await create_trade(db, trade)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"error creating trade: {str(e)}")
+
+@router.get("/", response_model=List[Trade])
+async def get_trades_endpoint(
+    trader: Optional[str] = Query(None, description="filter by trader name"),
+    asset_class: Optional[str] = Query(None, description="filter by asset class"),
+    status: Optional[TradeStatus] = Query(None, description="filter by trade status"),
+    cursor: Optional[str] = Query(None, description="cursor from the X-Next-Cursor header of the previous page"),
+    skip: int = Query(0, ge=0, description="number of records to skip, ignored when a cursor is given"),
+    limit: int = Query(100, ge=1, le=1000, description="maximum number of records to return"),
+    db: AsyncSession = Depends(get_async_db)
+) -> Response:
+    """
+    get trades with optional filtering
+    the cursor for the next page is returned in the X-Next-Cursor header;
+    only the response columns are selected and encoded straight to json
+    args:
+        trader (Optional[str]): filter by trader name
+        asset_class (Optional[str]): filter by asset class
+        status (Optional[TradeStatus]): filter by trade status
+        cursor (Optional[str]): cursor returned with the previous page
+        skip (int): number of records to skip
+        limit (int): maximum number of records to return
+        db (AsyncSession): async database session
+    returns:
+        Response: json list of trades matching the criteria
+    raises:
+        HTTPException: if the cursor is invalid or trade retrieval fails
+    """
+    try:
+        rows, next_cursor = await get_trades_page(db, trader, asset_class, cursor, skip, limit, status, TRADE_COLUMNS)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"error getting trades: {str(e)}")
+    return json_rows_response(rows, TRADE_COLUMNS, {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None)
+
+@router.get("/{trade_id}", response_model=Trade)
+async def get_trade_endpoint(
+    trade_id: str,
+    db: AsyncSession = Depends(get_async_db)
+) -> Trade:
+    """
+    get a trade by its id
+    args:
+        trade_id (str): trade id to search for
+        db (AsyncSession): async database session
+    returns:
+        Trade: trade if found
+    raises:
+        HTTPException: if trade is not found or retrieval fails
+    """
+    try:
+        trade = await get_trade_by_id(db, trade_id)
+        if not trade:
+            raise HTTPException(status_code=404, detail=f"trade {trade_id} not found")
+        return trade
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"error getting trade: {str(e)}")
+
+@router.patch("/{trade_id}/status", response_model=Trade)
+async def update_trade_status_endpoint(
+    trade_id: str,
+    status: TradeStatus,
+    db: AsyncSession = Depends(get_async_db)
+) -> Trade:
+    """
+    update a trade's status
+    args:
+        trade_id (str): trade id to update
+        status (TradeStatus): new status to set
+        db (AsyncSession): async database session
+    returns:
+        Trade: updated trade
+    raises:
+        HTTPException: if trade update fails
+    """
+    try:
+        trade = await update_trade_status(db, trade_id, status)
+        if not trade:
+            raise HTTPException(status_code=404, detail=f"trade {trade_id} not found")
+        return trade
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"error updating trade status: {str(e)}")
@@ -1,12 +1,15 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from typing import Dict
+from typing import Dict, List
 from app.db.base import get_db
 from app.db.db_utils import (
     reset_database,
     initialize_database,
-    get_database_info
+    get_database_info,
+    ensure_indexes,
+    explain_trade_queries
 )
+from app.schemas.schemas import QueryPlanReport
 
 # create router
 router = APIRouter()
@@ -58,4 +61,38 @@ def get_db_info() -> Dict[str, int]:
             "reconciliation_logs_count": info["reconciliation_logs_count"]
         }
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e)) 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/indexes")
+def create_indexes(db: Session = Depends(get_db)) -> Dict[str, List[str]]:
+    """
+    create missing trade indexes on the existing database
+    uses CREATE INDEX CONCURRENTLY on postgres so the table stays writable
+    args:
+        db (Session): database session, its engine is used for the ddl
+    returns:
+        Dict[str, List[str]]: names of the indexes created
+    raises:
+        HTTPException: if index creation fails
+    """
+    try:
+        return {"created": ensure_indexes(db.get_bind())}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/query-plans", response_model=List[QueryPlanReport])
+def get_query_plans(db: Session = Depends(get_db)) -> List[QueryPlanReport]:
+    """
+    explain the trade listing query for each supported filter combination
+    combinations whose plan still scans or sorts are flagged
+    args:
+        db (Session): database session
+    returns:
+        List[QueryPlanReport]: plan and findings per filter combination
+    raises:
+        HTTPException: if a query cannot be explained
+    """
+    try:
+        return explain_trade_queries(db)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"error explaining queries: {str(e)}")
@@ -1,10 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 from typing import List
+from app.api.responses import OPERATIONAL_LOG_COLUMNS, RECONCILIATION_LOG_COLUMNS, RECONCILIATION_LOG_EXTRA_KEYS, json_rows_response
 from app.db.base import get_db
 from app.schemas.schemas import OperationalLog, ReconciliationLog
 from app.models.models import OperationalLog as OperationalLogModel
-from app.models.models import ReconciliationLog as ReconciliationLogModel
+from app.services.reconciliation_service import reconciliation_log_rows
 
 # create router for log operations
 router = APIRouter()
@@ -14,7 +16,7 @@ def get_operational_logs(
     skip: int = Query(0, ge=0, description="number of records to skip"),
     limit: int = Query(100, ge=1, le=1000, description="maximum number of records to return"),
     db: Session = Depends(get_db)
-) -> List[OperationalLog]:
+) -> Response:
     """
     get operational logs
     args:
@@ -22,14 +24,15 @@ def get_operational_logs(
         limit (int): maximum number of records to return
         db (Session): database session
     returns:
-        List[OperationalLog]: list of operational logs
+        Response: json list of operational logs
     raises:
         HTTPException: if log retrieval fails
     """
     try:
-        return db.query(OperationalLogModel).order_by(
+        rows = db.execute(select(*OPERATIONAL_LOG_COLUMNS).order_by(
             OperationalLogModel.timestamp.desc()
-        ).offset(skip).limit(limit).all()
+        ).offset(skip).limit(limit)).all()
+        return json_rows_response(rows, OPERATIONAL_LOG_COLUMNS)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"error getting operational logs: {str(e)}")
 
@@ -63,7 +66,7 @@ def get_reconciliation_logs(
     skip: int = 0,
     limit: int = 100,
     db: Session = Depends(get_db)
-):
+) -> Response:
     """
     get a list of reconciliation logs
     args:
@@ -71,6 +74,9 @@ def get_reconciliation_logs(
         limit (int): maximum number of records to return
         db (Session): database session
     returns:
-        List[ReconciliationLog]: list of reconciliation logs
+        Response: json list of reconciliation logs
     """
-    return db.query(ReconciliationLogModel).offset(skip).limit(limit).all() 
\ No newline at end of file
+    rows = db.execute(select(*RECONCILIATION_LOG_COLUMNS).offset(skip).limit(limit)).all()
+    return json_rows_response(
+        reconciliation_log_rows(db, rows), RECONCILIATION_LOG_COLUMNS, extra_keys=RECONCILIATION_LOG_EXTRA_KEYS
+    ) 
\ No newline at end of file
@@ -1,40 +1,95 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
+from datetime import date, datetime
+import queue
+import tempfile
+from app.api.responses import DISCREPANCY_COLUMNS, RECONCILIATION_LOG_COLUMNS, RECONCILIATION_LOG_EXTRA_KEYS, json_rows_response
 from app.db.base import get_db
-from app.schemas.schemas import ReconciliationLog
-from app.services.reconciliation_service import run_reconciliation
+from app.schemas.schemas import (
+    PositionSnapshotVersion,
+    ReconciliationDiscrepancy,
+    ReconciliationJob,
+    ReconciliationLog,
+    StreamingReconciliationCheck,
+    StreamingReconciliationState
+)
+from app.services.position_snapshot_service import (
+    create_position_snapshot,
+    get_position_snapshot,
+    get_position_snapshots,
+    parse_positions_file
+)
+from app.services.reconciliation_job_service import get_reconciliation_job, submit_reconciliation_job
+from app.services.reconciliation_service import discrepancies_query, reconciliation_log_rows
+from app.services.streaming_reconciliation_service import start_streaming_reconciliation, streaming_reconciler
 from app.models.models import ReconciliationLog as ReconciliationLogModel
 
 # create router
 router = APIRouter()
 
-@router.post("/run", response_model=ReconciliationLog)
+# positions uploads larger than this are spooled to disk before loading
+POSITIONS_SPOOL_MAX_SIZE = 64 * 1024 * 1024
+
+@router.post("/run", response_model=ReconciliationJob, status_code=202)
 def trigger_reconciliation(
+    cutoff: Optional[datetime] = Query(None, description="only reconcile trades booked at or before this time"),
+    rebuild: bool = Query(False, description="rebuild the incremental trade aggregates from every trade"),
+    key: Optional[str] = Query(None, description="comma separated columns to reconcile by, e.g. trader,asset_class"),
+    as_of: Optional[date] = Query(None, description="reconcile this past business date against its positions snapshot"),
+    snapshot_id: Optional[int] = Query(None, description="read positions from this stored snapshot instead of the file"),
     db: Session = Depends(get_db)
-) -> ReconciliationLog:
+) -> ReconciliationJob:
     """
-    trigger a reconciliation run
+    queue a reconciliation run, poll /jobs/{job_id} for its outcome
+    a run with the same parameters as one already in flight returns that job
     args:
-        db (Session): database session
+        cutoff (Optional[datetime]): only reconcile trades booked at or before this time
+        rebuild (bool): rebuild the incremental trade aggregates from every trade
+        key (Optional[str]): comma separated columns to reconcile by
+        as_of (Optional[date]): reconcile this past business date, excludes cutoff
+        snapshot_id (Optional[int]): read positions from this stored snapshot
+        db (Session): database session, jobs open their own on the same engine
     returns:
-        ReconciliationLog: reconciliation results
+        ReconciliationJob: queued or already running job
     raises:
-        HTTPException: if reconciliation fails
+        HTTPException: if the key is invalid, both cutoff and as_of are given or the job queue is full
     """
+    bind = db.get_bind()
     try:
-        return run_reconciliation(db)
+        return submit_reconciliation_job(lambda: Session(bind=bind), cutoff, rebuild=rebuild, key=key, as_of=as_of, snapshot_id=snapshot_id)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"error running reconciliation: {str(e)}")
+    except queue.Full as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+@router.get("/jobs/{job_id}", response_model=ReconciliationJob)
+def get_reconciliation_job_status(job_id: str, db: Session = Depends(get_db)) -> ReconciliationJob:
+    """
+    get the status and progress of a reconciliation job
+    args:
+        job_id (str): job id returned by /run
+        db (Session): database session
+    returns:
+        ReconciliationJob: job with its reconciliation log once completed
+    raises:
+        HTTPException: if the job is unknown
+    """
+    job = get_reconciliation_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="reconciliation job not found")
+    if job["reconciliation_log_id"] is not None:
+        job["result"] = db.get(ReconciliationLogModel, job["reconciliation_log_id"])
+    return job
 
 @router.get("/logs", response_model=List[ReconciliationLog])
 def get_reconciliation_logs(
     skip: int = Query(0, ge=0, description="number of records to skip"),
     limit: int = Query(100, ge=1, le=1000, description="maximum number of records to return"),
     db: Session = Depends(get_db)
-) -> List[ReconciliationLog]:
+) -> Response:
     """
     get reconciliation logs
     args:
@@ -42,13 +97,188 @@ def get_reconciliation_logs(
         limit (int): maximum number of records to return
         db (Session): database session
     returns:
-        List[ReconciliationLog]: list of reconciliation logs
+        Response: json list of reconciliation logs
     raises:
         HTTPException: if log retrieval fails
     """
     try:
-        return db.query(ReconciliationLogModel).order_by(
+        rows = db.execute(select(*RECONCILIATION_LOG_COLUMNS).order_by(
             ReconciliationLogModel.run_time.desc()
-        ).offset(skip).limit(limit).all()
+        ).offset(skip).limit(limit)).all()
+        return json_rows_response(
+            reconciliation_log_rows(db, rows), RECONCILIATION_LOG_COLUMNS, extra_keys=RECONCILIATION_LOG_EXTRA_KEYS
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"error getting reconciliation logs: {str(e)}")
+
+@router.get("/discrepancies", response_model=List[ReconciliationDiscrepancy])
+def get_discrepancies(
+    asset_class: Optional[str] = Query(None, description="filter by asset class"),
+    trader: Optional[str] = Query(None, description="filter by trader name"),
+    type: Optional[str] = Query(None, description="filter by discrepancy type, quantity or price"),
+    start: Optional[datetime] = Query(None, description="only runs at or after this time"),
+    end: Optional[datetime] = Query(None, description="only runs at or before this time"),
+    reconciliation_log_id: Optional[int] = Query(None, description="only this reconciliation run"),
+    skip: int = Query(0, ge=0, description="number of records to skip"),
+    limit: int = Query(100, ge=1, le=1000, description="maximum number of records to return"),
+    db: Session = Depends(get_db)
+) -> Response:
+    """
+    query discrepancies across reconciliation runs, newest run first
+    args:
+        asset_class (Optional[str]): filter by asset class
+        trader (Optional[str]): filter by trader name
+        type (Optional[str]): filter by discrepancy type
+        start (Optional[datetime]): only runs at or after this time
+        end (Optional[datetime]): only runs at or before this time
+        reconciliation_log_id (Optional[int]): only this reconciliation run
+        skip (int): number of records to skip
+        limit (int): maximum number of records to return
+        db (Session): database session
+    returns:
+        Response: json list of discrepancies
+    raises:
+        HTTPException: if the range is invalid or the query fails
+    """
+    if start and end and start > end:
+        raise HTTPException(status_code=400, detail="start must not be after end")
+    try:
+        rows = db.execute(discrepancies_query(
+            asset_class, trader, type, start, end, reconciliation_log_id, skip, limit, DISCREPANCY_COLUMNS
+        )).all()
+        return json_rows_response(rows, DISCREPANCY_COLUMNS)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"error getting discrepancies: {str(e)}")
+
+@router.get("/stream", response_model=StreamingReconciliationState)
+def get_streaming_breaks(db: Session = Depends(get_db)) -> StreamingReconciliationState:
+    """
+    get the live break set of streaming reconciliation
+    trades written without an event, e.g. by bulk loads, are folded in first
+    args:
+        db (Session): database session
+    returns:
+        StreamingReconciliationState: reconciler state and current breaks
+    raises:
+        HTTPException: if catching up fails
+    """
+    try:
+        streaming_reconciler.catch_up(db)
+        return streaming_reconciler.state()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"error getting streaming breaks: {str(e)}")
+
+@router.post("/stream/reload", response_model=StreamingReconciliationState)
+def reload_streaming_reconciliation(
+    key: Optional[str] = Query(None, description="comma separated columns to reconcile by, e.g. trader,asset_class"),
+    db: Session = Depends(get_db)
+) -> StreamingReconciliationState:
+    """
+    start streaming reconciliation, or reload its positions snapshot and trade totals
+    args:
+        key (Optional[str]): comma separated columns to reconcile by
+        db (Session): database session, catch-ups open their own on the same engine
+    returns:
+        StreamingReconciliationState: reconciler state and current breaks
+    raises:
+        HTTPException: if the key or positions file is invalid
+    """
+    bind = db.get_bind()
+    try:
+        return start_streaming_reconciliation(lambda: Session(bind=bind), key).state()
+    except (FileNotFoundError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/stream/verify", response_model=StreamingReconciliationCheck)
+def verify_streaming_reconciliation(db: Session = Depends(get_db)) -> StreamingReconciliationCheck:
+    """
+    compare the live break set with a full reconciliation of the same trades
+    args:
+        db (Session): database session
+    returns:
+        StreamingReconciliationCheck: whether both agree and where they differ
+    raises:
+        HTTPException: if streaming reconciliation is not running or the check fails
+    """
+    if not streaming_reconciler.running:
+        raise HTTPException(status_code=409, detail="streaming reconciliation is not running")
+    try:
+        return streaming_reconciler.verify(db)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"error getting reconciliation logs: {str(e)}") 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"error verifying streaming reconciliation: {str(e)}")
+
+@router.post("/positions", response_model=PositionSnapshotVersion, status_code=201)
+async def upload_position_snapshot(
+    request: Request,
+    as_of: date = Query(..., description="business date of the positions"),
+    source: Optional[str] = Query(None, description="name of the uploaded file, kept with the snapshot"),
+    db: Session = Depends(get_db)
+) -> PositionSnapshotVersion:
+    """
+    store a positions csv from the request body as a new snapshot version of its date
+    the body is spooled to a temporary file, validated and bulk loaded
+    args:
+        request (Request): incoming request whose body is the csv
+        as_of (date): business date of the positions
+        source (Optional[str]): name of the uploaded file
+        db (Session): database session
+    returns:
+        PositionSnapshotVersion: the stored snapshot
+    raises:
+        HTTPException: if the file is invalid or the load fails
+    """
+    with tempfile.SpooledTemporaryFile(max_size=POSITIONS_SPOOL_MAX_SIZE) as spool:
+        async for chunk in request.stream():
+            spool.write(chunk)
+        spool.seek(0)
+
+        def load() -> PositionSnapshotVersion:
+            return create_position_snapshot(db, parse_positions_file(spool), as_of, source)
+
+        try:
+            return await run_in_threadpool(load)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"error loading positions snapshot: {str(e)}")
+
+@router.get("/positions", response_model=List[PositionSnapshotVersion])
+def get_position_snapshots_endpoint(
+    as_of: Optional[date] = Query(None, description="only the versions of this business date"),
+    skip: int = Query(0, ge=0, description="number of snapshots to skip"),
+    limit: int = Query(100, ge=1, le=1000, description="maximum number of snapshots to return"),
+    db: Session = Depends(get_db)
+) -> List[PositionSnapshotVersion]:
+    """
+    list stored positions snapshots, latest date and version first
+    args:
+        as_of (Optional[date]): only the versions of this business date
+        skip (int): number of snapshots to skip
+        limit (int): maximum number of snapshots to return
+        db (Session): database session
+    returns:
+        List[PositionSnapshotVersion]: snapshot versions
+    raises:
+        HTTPException: if the query fails
+    """
+    try:
+        return get_position_snapshots(db, as_of, skip, limit)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"error getting positions snapshots: {str(e)}")
+
+@router.get("/positions/{snapshot_id}", response_model=PositionSnapshotVersion)
+def get_position_snapshot_endpoint(snapshot_id: int, db: Session = Depends(get_db)) -> PositionSnapshotVersion:
+    """
+    get a stored positions snapshot
+    args:
+        snapshot_id (int): snapshot id
+        db (Session): database session
+    returns:
+        PositionSnapshotVersion: the snapshot
+    raises:
+        HTTPException: if the snapshot is not found
+    """
+    snapshot = get_position_snapshot(db, snapshot_id)
+    if snapshot is None:
+        raise HTTPException(status_code=404, detail="positions snapshot not found")
+    return snapshot
@@ -0,0 +1,66 @@
+from fastapi import Response
+from pydantic import BaseModel
+from typing import Any, Dict, Iterable, Optional, Sequence, Tuple, Type
+import orjson
+from app.models.models import OperationalLog, ReconciliationDiscrepancy, ReconciliationLog, Trade
+from app.schemas import schemas
+
+def schema_columns(
+    model: Any,
+    schema: Type[BaseModel],
+    exclude: Sequence[str] = (),
+    **overrides: Any
+) -> Tuple[Any, ...]:
+    """
+    get the model columns backing a response schema, in the schema's field order
+    args:
+        model (Any): sqlalchemy model class
+        schema (Type[BaseModel]): response schema with from_attributes
+        exclude (Sequence[str]): fields not backed by a column, filled in per row
+        overrides (Any): columns for fields that are not plain model columns,
+            labelled with the field name
+    returns:
+        Tuple[Any, ...]: model columns named like the schema fields
+    """
+    return tuple(
+        overrides[name].label(name) if name in overrides else getattr(model, name)
+        for name in schema.model_fields
+        if name not in exclude
+    )
+
+# columns selected by the list endpoints, so rows serialize to the same objects as the schemas
+TRADE_COLUMNS = schema_columns(Trade, schemas.Trade)
+OPERATIONAL_LOG_COLUMNS = schema_columns(OperationalLog, schemas.OperationalLog)
+# discrepancies json is stored only by older runs, reconciliation_log_rows builds the rest
+# and appends the stages, which come from their own table
+RECONCILIATION_LOG_EXTRA_KEYS = ("stages",)
+RECONCILIATION_LOG_COLUMNS = schema_columns(
+    ReconciliationLog,
+    schemas.ReconciliationLog,
+    exclude=RECONCILIATION_LOG_EXTRA_KEYS,
+    discrepancies=ReconciliationLog.discrepancies_json
+)
+DISCREPANCY_COLUMNS = schema_columns(ReconciliationDiscrepancy, schemas.ReconciliationDiscrepancy)
+
+def json_rows_response(
+    rows: Iterable[Sequence[Any]],
+    columns: Sequence[Any],
+    headers: Optional[Dict[str, str]] = None,
+    extra_keys: Sequence[str] = ()
+) -> Response:
+    """
+    serialize column rows straight to a json list of objects
+    skips building an orm object and a pydantic model per row; orjson encodes
+    datetimes and enums itself, utc offsets as "Z" like pydantic does
+    args:
+        rows (Iterable[Sequence[Any]]): rows selected with columns, followed by
+            one value per extra key
+        columns (Sequence[Any]): selected columns, their keys name the fields
+        headers (Optional[Dict[str, str]]): extra response headers
+        extra_keys (Sequence[str]): names of the values appended to each row
+    returns:
+        Response: application/json response
+    """
+    keys = [column.key for column in columns] + list(extra_keys)
+    content = orjson.dumps([dict(zip(keys, row)) for row in rows], option=orjson.OPT_UTC_Z)
+    return Response(content=content, media_type="application/json", headers=headers)
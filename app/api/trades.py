@@ -1,19 +1,54 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from anyio import from_thread
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import Any, Dict, Iterator, List, Optional
+from datetime import datetime
+import queue
+import tempfile
+import uuid
+from app.api.responses import TRADE_COLUMNS, json_rows_response
 from app.db.base import get_db
-from app.schemas.schemas import Trade, TradeCreate
+from app.schemas.schemas import Trade, TradeCreate, BulkTradeResult, ColumnarTradeResult, TradeStats, TradeUploadProgress, TradeWriterMetrics
 from app.models.models import TradeStatus
 from app.services.trade_service import (
+    BULK_INSERT_CHUNK_SIZE,
+    COLUMNAR_FORMATS,
+    EXPORT_FORMATS,
+    UPLOAD_COMMIT_EVERY,
+    UPLOAD_FORMATS,
     create_trade,
-    get_trades,
+    create_trades_bulk,
+    create_trades_columnar,
+    export_trades,
+    get_trade_stats,
+    get_upload_progress,
+    ingest_trade_records,
+    iter_lines,
+    iter_trade_records,
+    get_trades_page,
     get_trade_by_id,
     update_trade_status
 )
+from app.services.trade_writer_service import trade_writer
 
 # create router
 router = APIRouter()
 
+# response header carrying the cursor of the next page of trades
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+# content types of the export formats
+EXPORT_MEDIA_TYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet"
+}
+
+# request bodies larger than this are spooled to disk during columnar ingest
+COLUMNAR_SPOOL_MAX_SIZE = 64 * 1024 * 1024
+
 @router.post("/", response_model=Trade)
 def create_trade_endpoint(
     trade: TradeCreate,
@@ -30,37 +65,254 @@ def create_trade_endpoint(
         HTTPException: if trade creation fails
     """
     try:
+        # with group commit enabled the trade is committed together with concurrent requests
+        if trade_writer.running:
+            return trade_writer.create_trade(trade)
         return create_trade(db, trade)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
+    except queue.Full:
+        raise HTTPException(status_code=503, detail="trade write queue is full")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"error creating trade: {str(e)}")
 
+@router.post("/batch", response_model=BulkTradeResult)
+def create_trades_batch_endpoint(
+    trades: List[Dict[str, Any]],
+    chunk_size: int = Query(BULK_INSERT_CHUNK_SIZE, ge=1, le=100000, description="rows per insert batch"),
+    db: Session = Depends(get_db)
+) -> BulkTradeResult:
+    """
+    create a batch of trades in a single transaction
+    rows are validated individually against the TradeCreate schema so one bad
+    row is reported in the results instead of failing the whole request
+    args:
+        trades (List[Dict[str, Any]]): trade rows to create
+        chunk_size (int): rows per insert batch
+        db (Session): database session
+    returns:
+        BulkTradeResult: per-row results and throughput
+    raises:
+        HTTPException: if the batch insert fails
+    """
+    try:
+        return create_trades_bulk(db, trades, chunk_size)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"error creating trades: {str(e)}")
+
+@router.post("/upload", response_model=TradeUploadProgress)
+async def upload_trades_endpoint(
+    request: Request,
+    file_format: str = Query("csv", description="file format, csv (with header row) or ndjson"),
+    commit_every: int = Query(UPLOAD_COMMIT_EVERY, ge=1, le=100000, description="rows per committed batch"),
+    resume_from: Optional[int] = Query(None, ge=0, description="number of leading rows to skip"),
+    upload_id: Optional[str] = Query(None, description="upload identifier, reuse it to resume a failed load"),
+    db: Session = Depends(get_db)
+) -> TradeUploadProgress:
+    """
+    stream a csv or ndjson trade file from the request body
+    the body is parsed incrementally and committed every commit_every rows,
+    so memory use does not grow with the file size
+    args:
+        request (Request): incoming request whose body is the file
+        file_format (str): csv or ndjson
+        commit_every (int): rows per committed batch
+        resume_from (Optional[int]): number of leading rows to skip
+        upload_id (Optional[str]): upload identifier
+        db (Session): database session
+    returns:
+        TradeUploadProgress: final progress of the upload
+    raises:
+        HTTPException: if the format is unsupported or the load fails,
+            the detail carries the committed offset to resume from
+    """
+    if file_format not in UPLOAD_FORMATS:
+        raise HTTPException(status_code=400, detail=f"unsupported upload format {file_format}")
+
+    upload_id = upload_id or uuid.uuid4().hex
+    body = request.stream()
+
+    async def next_chunk() -> bytes:
+        return await body.__anext__()
+
+    def read_chunks() -> Iterator[bytes]:
+        # pull body chunks from the event loop as the worker thread consumes them
+        while True:
+            try:
+                yield from_thread.run(next_chunk)
+            except StopAsyncIteration:
+                return
+
+    def ingest() -> Dict[str, Any]:
+        records = iter_trade_records(iter_lines(read_chunks()), file_format)
+        return ingest_trade_records(db, records, commit_every, resume_from, upload_id)
+
+    try:
+        return await run_in_threadpool(ingest)
+    except ValueError as e:
+        progress = get_upload_progress(upload_id) or {}
+        raise HTTPException(status_code=400, detail={
+            "message": str(e),
+            "upload_id": upload_id,
+            "committed_offset": progress.get("committed_offset", resume_from or 0)
+        })
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"error uploading trades: {str(e)}")
+
+@router.post("/columnar", response_model=ColumnarTradeResult)
+async def upload_trades_columnar_endpoint(
+    request: Request,
+    file_format: str = Query("parquet", description="file format, arrow (ipc stream) or parquet"),
+    chunk_size: int = Query(BULK_INSERT_CHUNK_SIZE, ge=1, le=100000, description="rows per insert batch"),
+    db: Session = Depends(get_db)
+) -> ColumnarTradeResult:
+    """
+    ingest an arrow ipc stream or parquet file of trades from the request body
+    the body is spooled to a temporary file (parquet needs random access) and
+    validated batch by batch with vectorized masks
+    args:
+        request (Request): incoming request whose body is the file
+        file_format (str): arrow or parquet
+        chunk_size (int): rows per insert batch
+        db (Session): database session
+    returns:
+        ColumnarTradeResult: counts, throughput and first rejections
+    raises:
+        HTTPException: if the format is unsupported or the ingest fails
+    """
+    if file_format not in COLUMNAR_FORMATS:
+        raise HTTPException(status_code=400, detail=f"unsupported columnar format {file_format}")
+
+    with tempfile.SpooledTemporaryFile(max_size=COLUMNAR_SPOOL_MAX_SIZE) as spool:
+        async for chunk in request.stream():
+            spool.write(chunk)
+        spool.seek(0)
+        try:
+            return await run_in_threadpool(create_trades_columnar, db, spool, file_format, chunk_size)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"error ingesting trades: {str(e)}")
+
+@router.get("/uploads/{upload_id}", response_model=TradeUploadProgress)
+def get_upload_progress_endpoint(upload_id: str) -> TradeUploadProgress:
+    """
+    get the progress of a streaming trade upload
+    args:
+        upload_id (str): upload identifier
+    returns:
+        TradeUploadProgress: current progress
+    raises:
+        HTTPException: if the upload is not known
+    """
+    progress = get_upload_progress(upload_id)
+    if not progress:
+        raise HTTPException(status_code=404, detail=f"upload {upload_id} not found")
+    return progress
+
+@router.get("/writer/metrics", response_model=TradeWriterMetrics)
+def get_trade_writer_metrics() -> TradeWriterMetrics:
+    """
+    get group commit writer metrics
+    returns:
+        TradeWriterMetrics: queue depth, batch sizes and flush latencies
+    """
+    return trade_writer.metrics()
+
+@router.get("/stats", response_model=TradeStats)
+def get_trade_stats_endpoint(
+    start: Optional[datetime] = Query(None, description="include trades at or after this time"),
+    end: Optional[datetime] = Query(None, description="include trades before this time"),
+    db: Session = Depends(get_db)
+) -> TradeStats:
+    """
+    get trade totals and per day, asset class and trader breakdowns
+    args:
+        start (Optional[datetime]): include trades at or after this time
+        end (Optional[datetime]): include trades before this time
+        db (Session): database session
+    returns:
+        TradeStats: aggregated trade statistics
+    raises:
+        HTTPException: if the range is invalid or aggregation fails
+    """
+    if start and end and start > end:
+        raise HTTPException(status_code=400, detail="start must not be after end")
+    try:
+        return get_trade_stats(db, start, end)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"error getting trade stats: {str(e)}")
+
+@router.get("/export")
+def export_trades_endpoint(
+    file_format: str = Query("csv", description="export format, csv, ndjson or parquet"),
+    trader: Optional[str] = Query(None, description="filter by trader name"),
+    asset_class: Optional[str] = Query(None, description="filter by asset class"),
+    start: Optional[datetime] = Query(None, description="include trades at or after this time"),
+    end: Optional[datetime] = Query(None, description="include trades before this time"),
+    db: Session = Depends(get_db)
+) -> StreamingResponse:
+    """
+    stream all matching trades as a csv, ndjson or parquet file
+    rows are fetched in batches through a server-side cursor and encoded as
+    they arrive, so server memory does not depend on the number of rows
+    args:
+        file_format (str): csv, ndjson or parquet
+        trader (Optional[str]): filter by trader name
+        asset_class (Optional[str]): filter by asset class
+        start (Optional[datetime]): include trades at or after this time
+        end (Optional[datetime]): include trades before this time
+        db (Session): database session
+    returns:
+        StreamingResponse: the encoded trades, oldest first
+    raises:
+        HTTPException: if the format is unsupported
+    """
+    if file_format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"unsupported export format {file_format}")
+    return StreamingResponse(
+        export_trades(db, file_format, trader, asset_class, start, end),
+        media_type=EXPORT_MEDIA_TYPES[file_format],
+        headers={"Content-Disposition": f"attachment; filename=trades.{file_format}"}
+    )
+
 @router.get("/", response_model=List[Trade])
 def get_trades_endpoint(
     trader: Optional[str] = Query(None, description="filter by trader name"),
     asset_class: Optional[str] = Query(None, description="filter by asset class"),
-    skip: int = Query(0, ge=0, description="number of records to skip"),
+    status: Optional[TradeStatus] = Query(None, description="filter by trade status"),
+    cursor: Optional[str] = Query(None, description="cursor from the X-Next-Cursor header of the previous page"),
+    skip: int = Query(0, ge=0, description="number of records to skip, ignored when a cursor is given"),
     limit: int = Query(100, ge=1, le=1000, description="maximum number of records to return"),
     db: Session = Depends(get_db)
-) -> List[Trade]:
+) -> Response:
     """
     get trades with optional filtering
+    the cursor for the next page is returned in the X-Next-Cursor header;
+    passing it back pages with a seek on (timestamp, id) instead of an offset.
+    only the response columns are selected and encoded straight to json
     args:
         trader (Optional[str]): filter by trader name
         asset_class (Optional[str]): filter by asset class
+        status (Optional[TradeStatus]): filter by trade status
+        cursor (Optional[str]): cursor returned with the previous page
         skip (int): number of records to skip
         limit (int): maximum number of records to return
         db (Session): database session
     returns:
-        List[Trade]: list of trades matching the criteria
+        Response: json list of trades matching the criteria
     raises:
-        HTTPException: if trade retrieval fails
+        HTTPException: if the cursor is invalid or trade retrieval fails
     """
     try:
-        return get_trades(db, trader, asset_class, skip, limit)
+        rows, next_cursor = get_trades_page(db, trader, asset_class, cursor, skip, limit, status, TRADE_COLUMNS)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"error getting trades: {str(e)}")
+    return json_rows_response(rows, TRADE_COLUMNS, {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None)
 
 @router.get("/{trade_id}", response_model=Trade)
 def get_trade_endpoint(
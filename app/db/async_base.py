@@ -0,0 +1,68 @@
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from typing import AsyncIterator, Optional
+import os
+from dotenv import load_dotenv
+from app.db.base import SQLALCHEMY_DATABASE_URL
+
+load_dotenv()
+
+# "sync" serves the api routers with blocking sessions, "async" with asyncio sessions
+DB_MODE = os.getenv("DB_MODE", "sync").lower()
+
+# async drivers for the sync urls used elsewhere in the app
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgres": "postgresql+asyncpg",
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+}
+
+def to_async_url(url: str) -> str:
+    """
+    convert a sync database url to its async driver equivalent
+    args:
+        url (str): sync database url, e.g. sqlite:///./tradeops.db
+    returns:
+        str: url using aiosqlite or asyncpg
+    raises:
+        ValueError: if the database has no supported async driver
+    """
+    scheme, separator, rest = url.partition("://")
+    if scheme in ASYNC_DRIVERS.values():
+        return url
+    if scheme not in ASYNC_DRIVERS:
+        raise ValueError(f"no async driver configured for {scheme}")
+    return f"{ASYNC_DRIVERS[scheme]}{separator}{rest}"
+
+# created on first use so the async drivers are only needed in async mode
+_async_engine: Optional[AsyncEngine] = None
+_async_session_factory: Optional[async_sessionmaker] = None
+
+def get_async_engine() -> AsyncEngine:
+    """
+    get the shared async engine
+    returns:
+        AsyncEngine: engine bound to DATABASE_URL through the async driver
+    """
+    global _async_engine
+    if _async_engine is None:
+        _async_engine = create_async_engine(to_async_url(SQLALCHEMY_DATABASE_URL))
+    return _async_engine
+
+def get_async_session_factory() -> async_sessionmaker:
+    """
+    get the shared async session factory
+    returns:
+        async_sessionmaker: factory producing AsyncSession objects
+    """
+    global _async_session_factory
+    if _async_session_factory is None:
+        _async_session_factory = async_sessionmaker(
+            get_async_engine(), autoflush=False, expire_on_commit=False
+        )
+    return _async_session_factory
+
+# Dependency
+async def get_async_db() -> AsyncIterator[AsyncSession]:
+    async with get_async_session_factory()() as db:
+        yield db
@@ -1,10 +1,14 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.engine import Engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-from app.models.models import Base, Trade, ReconciliationLog, OperationalLog
+from app.models.models import Base, Trade, TradeStatus, ReconciliationDiscrepancy, ReconciliationLog, ReconciliationWatermark, OperationalLog
 from app.db.sample_data import create_sample_trades
-from typing import Dict, Any
+from app.services.trade_service import encode_cursor, trades_page_query
+from typing import Dict, Any, List, Optional
+from datetime import datetime
+from itertools import combinations
 import os
 import json
 
@@ -137,4 +141,156 @@ def get_database_info() -> Dict[str, Any]:
         finally:
             db.close()
     except Exception as e:
-        raise Exception(f"error getting database info: {str(e)}") 
\ No newline at end of file
+        raise Exception(f"error getting database info: {str(e)}") 
+
+def ensure_indexes(bind: Optional[Engine] = None) -> List[str]:
+    """
+    create any missing trade indexes on an existing database
+    on postgres each index is built with CREATE INDEX CONCURRENTLY outside a
+    transaction, so reads and writes continue while it builds; sqlite has no
+    concurrent build and holds the write lock for the duration. table
+    statistics are refreshed afterwards so the planner considers the new indexes
+    args:
+        bind (Optional[Engine]): engine to use, defaults to the application engine
+    returns:
+        List[str]: names of the indexes that were created
+    raises:
+        Exception: if index creation fails
+    """
+    bind = bind or engine
+    try:
+        table = Trade.__table__
+        if not inspect(bind).has_table(table.name):
+            table.create(bind)
+        existing = {index["name"] for index in inspect(bind).get_indexes(table.name)}
+        missing = [index for index in table.indexes if index.name not in existing]
+        created = []
+        with bind.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+            for index in missing:
+                columns = ", ".join(column.name for column in index.columns)
+                concurrently = "CONCURRENTLY " if bind.dialect.name == "postgresql" else ""
+                unique = "UNIQUE " if index.unique else ""
+                connection.execute(text(
+                    f"CREATE {unique}INDEX {concurrently}IF NOT EXISTS {index.name} ON {table.name} ({columns})"
+                ))
+                created.append(index.name)
+            if created:
+                connection.execute(text(f"ANALYZE {table.name}"))
+        return created
+    except Exception as e:
+        raise Exception(f"error creating indexes: {str(e)}")
+
+# nullable columns added to existing tables since they were first created
+ADDED_COLUMNS = [
+    ReconciliationDiscrepancy.__table__.c.no_trades,
+    ReconciliationWatermark.__table__.c.trade_generation
+]
+
+def ensure_columns(bind: Optional[Engine] = None) -> List[str]:
+    """
+    add any missing nullable columns to existing tables
+    create_all skips tables that already exist, so columns added to a model
+    afterwards are created here with ALTER TABLE ... ADD COLUMN
+    args:
+        bind (Optional[Engine]): engine to use, defaults to the application engine
+    returns:
+        List[str]: table.column names of the columns that were added
+    raises:
+        Exception: if a column cannot be added
+    """
+    bind = bind or engine
+    try:
+        added = []
+        with bind.begin() as connection:
+            for column in ADDED_COLUMNS:
+                table = column.table.name
+                if not inspect(connection).has_table(table):
+                    continue
+                if column.name in {existing["name"] for existing in inspect(connection).get_columns(table)}:
+                    continue
+                column_type = column.type.compile(dialect=bind.dialect)
+                connection.execute(text(f"ALTER TABLE {table} ADD COLUMN {column.name} {column_type}"))
+                added.append(f"{table}.{column.name}")
+        return added
+    except Exception as e:
+        raise Exception(f"error adding columns: {str(e)}")
+
+def explain_query(db: Session, query) -> List[str]:
+    """
+    get the database's plan for a query
+    args:
+        db (Session): database session
+        query: sqlalchemy select statement
+    returns:
+        List[str]: plan lines as reported by EXPLAIN QUERY PLAN (sqlite) or EXPLAIN
+    """
+    connection = db.connection()
+    dialect = connection.dialect
+    compiled = query.compile(dialect=dialect)
+
+    # bind values go through their column types, e.g. enums become their stored names
+    params = {}
+    for name, value in compiled.params.items():
+        processor = compiled.binds[name].type.bind_processor(dialect)
+        params[name] = processor(value) if processor else value
+    if compiled.positional:
+        params = tuple(params[name] for name in compiled.positiontup)
+
+    if dialect.name == "sqlite":
+        rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}", params).all()
+        return [row[-1] for row in rows]
+    rows = connection.exec_driver_sql(f"EXPLAIN {compiled}", params).all()
+    return [row[0] for row in rows]
+
+def plan_problems(plan: List[str], filtered: bool) -> List[str]:
+    """
+    find the steps of a plan that scan or sort instead of seeking an index
+    an ordered index scan is expected for an unfiltered first page, but a
+    filtered page should be a seek on the filter's index
+    args:
+        plan (List[str]): plan lines from explain_query
+        filtered (bool): whether the query has an equality or seek predicate
+    returns:
+        List[str]: plan lines that indicate a scan or a sort
+    """
+    problems = []
+    for line in plan:
+        step = line.strip().lstrip("->").strip()
+        if step.startswith("SCAN") and ("USING" not in step or filtered):
+            problems.append(line)
+        elif "TEMP B-TREE" in step or step.startswith("Seq Scan") or step.startswith("Sort"):
+            problems.append(line)
+    return problems
+
+def explain_trade_queries(db: Session) -> List[Dict[str, Any]]:
+    """
+    explain the trade listing query for every supported filter combination
+    each combination is checked for the first page and for a cursor page,
+    and flagged when its plan still scans or sorts. plans depend on table
+    statistics, so results on a near-empty table may differ from production
+    args:
+        db (Session): database session
+    returns:
+        List[Dict[str, Any]]: filters, cursor flag, plan lines, problem lines
+        and whether the combination is flagged
+    """
+    sample = {"trader": "trader", "asset_class": "EQUITY", "status": TradeStatus.PENDING}
+    cursor = encode_cursor(Trade(id=1, timestamp=datetime.now().replace(microsecond=0)))
+    reports = []
+    for size in range(len(sample) + 1):
+        for filters in combinations(sample, size):
+            for with_cursor in (False, True):
+                query = trades_page_query(
+                    cursor=cursor if with_cursor else None,
+                    **{name: sample[name] for name in filters}
+                )
+                plan = explain_query(db, query)
+                problems = plan_problems(plan, bool(filters) or with_cursor)
+                reports.append({
+                    "filters": list(filters),
+                    "cursor": with_cursor,
+                    "plan": plan,
+                    "problems": problems,
+                    "flagged": bool(problems)
+                })
+    return reports
@@ -1,10 +1,24 @@
-from app.db.base import Base, engine
+from app.db.base import Base, SessionLocal, engine
+from app.db.db_utils import ensure_columns, ensure_indexes
 from app.models.models import Trade, ReconciliationLog, OperationalLog
+from app.services.reconciliation_service import migrate_legacy_discrepancies
 
 def init_db():
     Base.metadata.create_all(bind=engine)
+    # create_all skips tables that already exist, so add columns and indexes introduced since
+    ensure_columns(engine)
+    created = ensure_indexes(engine)
+    # logs written before reconciliation_discrepancies only kept their discrepancies as json
+    db = SessionLocal()
+    try:
+        migrate_legacy_discrepancies(db)
+    finally:
+        db.close()
+    return created
 
 if __name__ == "__main__":
     print("Creating database tables...")
-    init_db()
-    print("Database tables created successfully!") 
\ No newline at end of file
+    created = init_db()
+    if created:
+        print(f"Created indexes: {', '.join(created)}")
+    print("Database tables created successfully!")
\ No newline at end of file
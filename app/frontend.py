@@ -204,32 +204,30 @@ def show_dashboard() -> None:
     st.title("Dashboard")
     
     try:
-        # get trades data
-        response = requests.get(f"{API_BASE_URL}/trades")
+        # get aggregated trade statistics
+        response = requests.get(f"{API_BASE_URL}/trades/stats")
         if response.status_code != 200:
             st.error("Error fetching trades data")
             return
             
-        trades = response.json()
-        if not trades:
+        stats = response.json()
+        if not stats['total_trades']:
             st.info("No trades data available")
             return
-            
-        # convert to dataframe
-        df = pd.DataFrame(trades)
         
         # quick stats
         col1, col2, col3 = st.columns(3)
         
         with col1:
+            total_trades = stats['total_trades']
             st.metric(
                 "Total Trades",
-                len(df),
-                f"+{len(df) % 10}%"
+                total_trades,
+                f"+{total_trades % 10}%"
             )
         
         with col2:
-            total_volume = df['quantity'].sum()
+            total_volume = stats['total_volume']
             st.metric(
                 "Total Volume",
                 f"${total_volume:,.2f}",
@@ -237,7 +235,7 @@ def show_dashboard() -> None:
             )
         
         with col3:
-            active_traders = df['trader'].nunique()
+            active_traders = stats['active_traders']
             st.metric(
                 "Active Traders",
                 active_traders,
@@ -250,23 +248,22 @@ def show_dashboard() -> None:
         with col1:
             st.markdown("### Trading Activity")
             # prepare data for trading activity chart
-            df['timestamp'] = pd.to_datetime(df['timestamp'])
-            daily_trades = df.groupby(df['timestamp'].dt.date).size().reset_index(name='count')
+            daily_trades = pd.DataFrame(stats['daily'], columns=['date', 'trade_count', 'total_volume'])
             
             # create trading activity chart
             fig = px.line(
                 daily_trades,
-                x='timestamp',
-                y='count',
+                x='date',
+                y='trade_count',
                 title='Trading Activity Over Time',
-                labels={'timestamp': 'Date', 'count': 'Number of Trades'}
+                labels={'date': 'Date', 'trade_count': 'Number of Trades'}
             )
             st.plotly_chart(fig, use_container_width=True)
         
         with col2:
             st.markdown("### Asset Distribution")
             # prepare data for asset distribution chart
-            asset_dist = df['asset_class'].value_counts().reset_index()
+            asset_dist = pd.DataFrame(stats['by_asset_class'], columns=['key', 'trade_count'])
             asset_dist.columns = ['asset_class', 'count']
             
             # create asset distribution chart
@@ -280,12 +277,14 @@ def show_dashboard() -> None:
         
         # recent trades
         st.markdown("### Recent Trades")
-        recent_trades = df.sort_values('timestamp', ascending=False).head(5)
-        st.dataframe(
-            recent_trades[['trade_id', 'trader', 'asset_class', 'quantity', 'price', 'timestamp']],
-            use_container_width=True,
-            hide_index=True
-        )
+        response = requests.get(f"{API_BASE_URL}/trades", params={"limit": 5})
+        if response.status_code == 200 and response.json():
+            recent_trades = pd.DataFrame(response.json())
+            st.dataframe(
+                recent_trades[['trade_id', 'trader', 'asset_class', 'quantity', 'price', 'timestamp']],
+                use_container_width=True,
+                hide_index=True
+            )
         
     except Exception as e:
         st.error(f"Error loading dashboard: {str(e)}")
@@ -432,20 +431,6 @@ def show_analytics() -> None:
     st.title("Analytics")
     
     try:
-        # get trades data
-        response = requests.get(f"{API_BASE_URL}/trades")
-        if response.status_code != 200:
-            st.error("Error fetching trades data")
-            return
-            
-        trades = response.json()
-        if not trades:
-            st.info("No trades data available")
-            return
-            
-        # convert to dataframe
-        df = pd.DataFrame(trades)
-        
         # time range selector
         col1, col2 = st.columns(2)
         
@@ -461,23 +446,36 @@ def show_analytics() -> None:
                 value=datetime.now()
             )
         
-        # filter data by date range
-        df['timestamp'] = pd.to_datetime(df['timestamp'])
-        mask = (df['timestamp'].dt.date >= start_date) & (df['timestamp'].dt.date <= end_date)
-        filtered_df = df[mask]
+        # get statistics aggregated over the date range, end date included
+        response = requests.get(
+            f"{API_BASE_URL}/trades/stats",
+            params={
+                "start": start_date.isoformat(),
+                "end": (end_date + timedelta(days=1)).isoformat()
+            }
+        )
+        if response.status_code != 200:
+            st.error("Error fetching trades data")
+            return
+            
+        stats = response.json()
+        if not stats['total_trades']:
+            st.info("No trades data available")
+            return
         
         # metrics
         col1, col2, col3 = st.columns(3)
         
         with col1:
+            total_trades = stats['total_trades']
             st.metric(
                 "Total Trades",
-                len(filtered_df),
-                f"+{len(filtered_df) % 10}%"
+                total_trades,
+                f"+{total_trades % 10}%"
             )
         
         with col2:
-            total_volume = filtered_df['quantity'].sum()
+            total_volume = stats['total_volume']
             st.metric(
                 "Total Volume",
                 f"${total_volume:,.2f}",
@@ -485,7 +483,7 @@ def show_analytics() -> None:
             )
         
         with col3:
-            avg_trade_size = filtered_df['quantity'].mean()
+            avg_trade_size = stats['avg_trade_size']
             st.metric(
                 "Average Trade Size",
                 f"${avg_trade_size:,.2f}",
@@ -498,26 +496,25 @@ def show_analytics() -> None:
         with col1:
             st.markdown("### Trading Activity")
             # prepare data for trading activity chart
-            daily_volume = filtered_df.groupby(filtered_df['timestamp'].dt.date)['quantity'].sum().reset_index()
+            daily_volume = pd.DataFrame(stats['daily'], columns=['date', 'trade_count', 'total_volume'])
             
             # create trading activity chart
             fig = px.line(
                 daily_volume,
-                x='timestamp',
-                y='quantity',
+                x='date',
+                y='total_volume',
                 title='Daily Trading Volume',
-                labels={'timestamp': 'Date', 'quantity': 'Volume'}
+                labels={'date': 'Date', 'total_volume': 'Volume'}
             )
             st.plotly_chart(fig, use_container_width=True)
         
         with col2:
             st.markdown("### Asset Analysis")
             # prepare data for asset analysis
-            asset_stats = filtered_df.groupby('asset_class').agg({
-                'quantity': ['count', 'sum', 'mean']
-            }).reset_index()
-            
-            asset_stats.columns = ['asset_class', 'trade_count', 'total_volume', 'avg_trade_size']
+            asset_stats = pd.DataFrame(
+                stats['by_asset_class'],
+                columns=['key', 'trade_count', 'total_volume', 'avg_trade_size']
+            ).rename(columns={'key': 'asset_class'})
             
             # create asset analysis chart
             fig = px.bar(
@@ -532,11 +529,10 @@ def show_analytics() -> None:
         # trader performance
         st.markdown("### Trader Performance")
         # prepare data for trader performance
-        trader_stats = filtered_df.groupby('trader').agg({
-            'quantity': ['count', 'sum', 'mean']
-        }).reset_index()
-        
-        trader_stats.columns = ['trader', 'trade_count', 'total_volume', 'avg_trade_size']
+        trader_stats = pd.DataFrame(
+            stats['by_trader'],
+            columns=['key', 'trade_count', 'total_volume', 'avg_trade_size']
+        ).rename(columns={'key': 'trader'})
         
         # create trader performance chart
         fig = px.bar(
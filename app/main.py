@@ -3,6 +3,13 @@ from fastapi.middleware.cors import CORSMiddleware
 import os
 from dotenv import load_dotenv
 from app.services.scheduler_service import start_scheduler, stop_scheduler
+from app.services.trade_writer_service import GROUP_COMMIT_ENABLED, start_trade_writer, stop_trade_writer
+from app.services.reconciliation_job_service import shutdown_reconciliation_jobs
+from app.services.streaming_reconciliation_service import (
+    STREAMING_RECONCILIATION_ENABLED,
+    start_streaming_reconciliation,
+    stop_streaming_reconciliation
+)
 from app.db.base import SessionLocal
 
 # load environment variables
@@ -24,17 +31,24 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# startup event handler - initializes scheduler
+# startup event handler - initializes scheduler, the optional group commit writer and streaming reconciliation
 @app.on_event("startup")
 async def startup_event():
     db = SessionLocal()
     start_scheduler(db)
     db.close()
+    if GROUP_COMMIT_ENABLED:
+        start_trade_writer(SessionLocal)
+    if STREAMING_RECONCILIATION_ENABLED:
+        start_streaming_reconciliation(SessionLocal)
 
-# shutdown event handler - stops scheduler
+# shutdown event handler - stops scheduler and streaming reconciliation, flushes queued trades and drains reconciliation jobs
 @app.on_event("shutdown")
 async def shutdown_event():
     stop_scheduler()
+    stop_trade_writer()
+    shutdown_reconciliation_jobs()
+    stop_streaming_reconciliation()
 
 # root endpoint - welcome message
 @app.get("/")
@@ -42,10 +56,38 @@ async def root():
     return {"message": "Welcome to TradeOps Portal API"}
 
 # import and include all api routers
+from fastapi import APIRouter
 from app.api import trades, reconciliation, logs, database
+from app.db.async_base import DB_MODE
 
 # register api routes with their respective prefixes
 app.include_router(trades.router, prefix="/api/v1/trades", tags=["trades"])
 app.include_router(reconciliation.router, prefix="/api/v1/reconciliation", tags=["reconciliation"])
 app.include_router(logs.router, prefix="/api/v1/logs", tags=["logs"])
-app.include_router(database.router, prefix="/api/v1/database", tags=["database"]) 
\ No newline at end of file
+app.include_router(database.router, prefix="/api/v1/database", tags=["database"])
+
+def use_async_routes(router: APIRouter, prefix: str, tags: list) -> None:
+    """
+    swap sync routes for their async versions in place
+    routes keep the position of the sync route they replace, so static paths
+    registered before a path parameter route still match first; endpoints
+    without an async version keep using the sync router
+    args:
+        router (APIRouter): router with the async endpoints
+        prefix (str): prefix the sync router is mounted under
+        tags (list): openapi tags for the routes
+    """
+    prefixed = APIRouter()
+    prefixed.include_router(router, prefix=prefix, tags=tags)
+    for async_route in prefixed.routes:
+        for index, route in enumerate(app.router.routes):
+            if getattr(route, "path", None) == async_route.path and route.methods == async_route.methods:
+                app.router.routes[index] = async_route
+                break
+
+# DB_MODE=async serves the core trade, log and reconciliation endpoints with async sessions
+if DB_MODE == "async":
+    from app.api import async_trades, async_reconciliation, async_logs
+    use_async_routes(async_trades.router, "/api/v1/trades", ["trades"])
+    use_async_routes(async_reconciliation.router, "/api/v1/reconciliation", ["reconciliation"])
+    use_async_routes(async_logs.router, "/api/v1/logs", ["logs"])
@@ -1,11 +1,11 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Enum, func
-from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy import Boolean, Column, Integer, String, Float, Date, DateTime, Enum, ForeignKey, Index, UniqueConstraint, event, func, inspect, insert, update
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import ORMExecuteState, Session, relationship
+from app.db.base import Base  # shared declarative base used by the session factory
 import enum
+import json
 from datetime import datetime
-from typing import Optional
-
-# create base class for models
-Base = declarative_base()
+from typing import Any, Dict, Optional
 
 class TradeStatus(str, enum.Enum):
     """
@@ -55,9 +55,71 @@ class Trade(Base):
     timestamp = Column(DateTime(timezone=True), server_default=func.now())
     status = Column(Enum(TradeStatus), default=TradeStatus.PENDING)
 
+    __table_args__ = (
+        # serves newest-first listing and keyset pagination on (timestamp, id)
+        Index("ix_trades_timestamp_id", "timestamp", "id"),
+        # one per listing filter, so a filtered page is an index seek already in timestamp order
+        Index("ix_trades_trader_timestamp", "trader", "timestamp", "id"),
+        Index("ix_trades_asset_class_timestamp", "asset_class", "timestamp", "id"),
+        Index("ix_trades_status_timestamp", "status", "timestamp", "id"),
+    )
+
     def __repr__(self) -> str:
         return f"<Trade {self.trade_id} by {self.trader}>"
 
+# trade columns reconciliation reads, changing one alters totals built from the old values
+RECONCILED_TRADE_COLUMNS = ("trader", "asset_class", "quantity", "price", "timestamp")
+
+class TradeChangeStamp(Base):
+    """
+    model for the counter of changes to trades that were already booked
+    new trades show in the highest trade id and the trade count, this counts
+    the rest, so readers of trade totals can tell from one row whether the
+    trades they have seen were deleted or edited. the single row is created by
+    the first change
+    attributes:
+        id: unique identifier, always 1
+        generation: bumped by every flush or statement deleting trades or changing their reconciled columns
+        updated_at: when the generation last moved
+    """
+    __tablename__ = "trade_change_stamps"
+
+    id = Column(Integer, primary_key=True)
+    generation = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    def __repr__(self) -> str:
+        return f"<TradeChangeStamp generation {self.generation}>"
+
+def bump_trade_generation(connection: Connection) -> None:
+    """
+    record a delete or edit of trades, in the transaction making it
+    args:
+        connection (Connection): connection of the transaction changing trades
+    """
+    stamp = TradeChangeStamp.__table__
+    bumped = connection.execute(
+        update(stamp).where(stamp.c.id == 1).values(generation=stamp.c.generation + 1, updated_at=func.now())
+    ).rowcount
+    if not bumped:
+        connection.execute(insert(stamp).values(id=1, generation=1))
+
+@event.listens_for(Session, "after_flush")
+def _stamp_flushed_trade_changes(session: Session, flush_context: Any) -> None:
+    # the session still lists what the flush deleted and changed
+    changed = any(isinstance(obj, Trade) for obj in session.deleted) or any(
+        isinstance(obj, Trade) and any(inspect(obj).attrs[column].history.has_changes() for column in RECONCILED_TRADE_COLUMNS)
+        for obj in session.dirty
+    )
+    if changed:
+        bump_trade_generation(session.connection())
+
+@event.listens_for(Session, "do_orm_execute")
+def _stamp_bulk_trade_changes(state: ORMExecuteState) -> None:
+    # bulk update and delete statements bypass the flush
+    if (state.is_update or state.is_delete) and any(mapper.class_ is Trade for mapper in state.all_mappers):
+        bump_trade_generation(state.session.connection())
+
 class ReconciliationLog(Base):
     """
     model for storing reconciliation results
@@ -66,7 +128,10 @@ class ReconciliationLog(Base):
         run_time: when the reconciliation was run
         summary: summary of the reconciliation
         status: status of the reconciliation
-        discrepancies: json string of discrepancies found
+        discrepancies: json string of discrepancies found, built from
+            discrepancy_rows unless the log predates them
+        discrepancy_rows: discrepancies found, one row each
+        stages: timing and memory profile of each stage of the run
     """
     __tablename__ = "reconciliation_logs"
 
@@ -74,11 +139,280 @@ class ReconciliationLog(Base):
     run_time = Column(DateTime(timezone=True), server_default=func.now())
     summary = Column(String, nullable=False)
     status = Column(Enum(ReconciliationStatus), nullable=False)
-    discrepancies = Column(String)  # json string of discrepancies
+    # json string of discrepancies, only written by runs before reconciliation_discrepancies
+    discrepancies_json = Column("discrepancies", String)
+    discrepancy_rows = relationship(
+        "ReconciliationDiscrepancy",
+        order_by="ReconciliationDiscrepancy.id",
+        cascade="all, delete-orphan"
+    )
+    stages = relationship(
+        "ReconciliationRunStage",
+        order_by="ReconciliationRunStage.id",
+        cascade="all, delete-orphan"
+    )
+
+    @property
+    def discrepancies(self) -> Optional[str]:
+        """
+        discrepancies as the json string older clients read
+        returns:
+            Optional[str]: stored json for older logs, otherwise built from the discrepancy rows
+        """
+        if self.discrepancies_json is not None:
+            return self.discrepancies_json
+        return json.dumps([row.to_dict() for row in self.discrepancy_rows])
+
+    @discrepancies.setter
+    def discrepancies(self, value: Optional[str]) -> None:
+        self.discrepancies_json = value
 
     def __repr__(self) -> str:
         return f"<ReconciliationLog {self.id} at {self.run_time}>"
 
+class ReconciliationDiscrepancy(Base):
+    """
+    model for one discrepancy found by a reconciliation run
+    attributes:
+        id: unique identifier
+        reconciliation_log_id: run that found the discrepancy
+        run_time: when the run happened, copied from its log for range queries
+        asset_class: type of asset
+        trader: name of the trader, when reconciling by trader
+        type: type of discrepancy (quantity or price)
+        position_value: value from positions
+        trade_value: value from trades
+        difference: difference between values
+        no_trades: the key had no trades, so the json record holds trade_value
+            as the integer 0; None on rows stored before it was recorded
+    """
+    __tablename__ = "reconciliation_discrepancies"
+
+    id = Column(Integer, primary_key=True, index=True)
+    reconciliation_log_id = Column(
+        Integer, ForeignKey("reconciliation_logs.id", ondelete="CASCADE"), nullable=False, index=True
+    )
+    run_time = Column(DateTime(timezone=True), nullable=False)
+    asset_class = Column(String)
+    trader = Column(String)
+    type = Column(String, nullable=False)
+    position_value = Column(Float, nullable=False)
+    trade_value = Column(Float, nullable=False)
+    difference = Column(Float, nullable=False)
+    no_trades = Column(Boolean)
+
+    __table_args__ = (
+        # serves newest-first listing and run time ranges
+        Index("ix_reconciliation_discrepancies_run_time", "run_time", "id"),
+        # one per query filter, so a filtered page is an index seek already in run time order
+        Index("ix_reconciliation_discrepancies_asset_class", "asset_class", "type", "run_time", "id"),
+        Index("ix_reconciliation_discrepancies_type", "type", "run_time", "id"),
+        Index("ix_reconciliation_discrepancies_trader", "trader", "run_time", "id"),
+    )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        the discrepancy as the record stored in the legacy json, key columns first
+        returns:
+            Dict[str, Any]: discrepancy record
+        """
+        record = {}
+        if self.trader is not None:
+            record['trader'] = self.trader
+        if self.asset_class is not None:
+            record['asset_class'] = self.asset_class
+        record.update(
+            type=self.type,
+            position_value=self.position_value,
+            # the float column would turn the integer 0 of keys without trades into 0.0
+            trade_value=int(self.trade_value) if self.no_trades else self.trade_value,
+            difference=self.difference
+        )
+        return record
+
+    def __repr__(self) -> str:
+        return f"<ReconciliationDiscrepancy {self.type} on {self.asset_class} in run {self.reconciliation_log_id}>"
+
+class ReconciliationRunStage(Base):
+    """
+    model for the profile of one stage of a reconciliation run
+    attributes:
+        id: unique identifier, stages of a run are numbered in execution order
+        reconciliation_log_id: run the stage belongs to
+        stage: stage name
+        seconds: wall time spent in the stage
+        rows: rows the stage processed, None where it is not counted
+        peak_memory_bytes: peak traced python memory above the stage's starting level
+    """
+    __tablename__ = "reconciliation_run_stages"
+
+    id = Column(Integer, primary_key=True, index=True)
+    reconciliation_log_id = Column(
+        Integer, ForeignKey("reconciliation_logs.id", ondelete="CASCADE"), nullable=False, index=True
+    )
+    stage = Column(String, nullable=False)
+    seconds = Column(Float, nullable=False)
+    rows = Column(Integer)
+    peak_memory_bytes = Column(Integer)
+
+    def __repr__(self) -> str:
+        return f"<ReconciliationRunStage {self.stage} of run {self.reconciliation_log_id}: {self.seconds:.3f}s>"
+
+class ReconciliationFingerprint(Base):
+    """
+    model for the inputs a reconciliation run saw, used to serve unchanged reruns from cache
+    attributes:
+        id: unique identifier
+        reconciliation_log_id: run the fingerprint belongs to
+        fingerprint: hash of the positions file identity, trades table version and run parameters
+        source_log_id: run whose result was reused, None if the run computed its own
+    """
+    __tablename__ = "reconciliation_fingerprints"
+
+    id = Column(Integer, primary_key=True, index=True)
+    reconciliation_log_id = Column(
+        Integer, ForeignKey("reconciliation_logs.id", ondelete="CASCADE"), nullable=False, unique=True
+    )
+    fingerprint = Column(String, nullable=False, index=True)
+    source_log_id = Column(Integer)
+
+    def __repr__(self) -> str:
+        return f"<ReconciliationFingerprint {self.fingerprint[:12]} of run {self.reconciliation_log_id}>"
+
+class ReconciliationAggregate(Base):
+    """
+    model for the running trade totals of one asset class, kept for incremental reconciliation
+    attributes:
+        id: unique identifier
+        asset_class: type of asset
+        quantity_sum: summed trade quantity
+        price_sum: summed trade price, for the average price
+        notional_sum: summed quantity times price
+        trade_count: number of trades folded in
+    """
+    __tablename__ = "reconciliation_aggregates"
+
+    id = Column(Integer, primary_key=True, index=True)
+    asset_class = Column(String, unique=True, nullable=False)
+    quantity_sum = Column(Float, nullable=False, default=0.0)
+    price_sum = Column(Float, nullable=False, default=0.0)
+    notional_sum = Column(Float, nullable=False, default=0.0)
+    trade_count = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self) -> str:
+        return f"<ReconciliationAggregate {self.asset_class}: {self.trade_count} trades>"
+
+class ReconciliationWatermark(Base):
+    """
+    model for the high-water mark of the trades folded into the reconciliation aggregates
+    attributes:
+        id: unique identifier
+        name: which aggregates the watermark belongs to
+        max_trade_id: highest trade row id folded in
+        max_timestamp: latest trade timestamp folded in
+        trade_count: number of trades folded in
+        trade_generation: TradeChangeStamp generation the folded trades were read at
+        updated_at: when the watermark last moved
+    """
+    __tablename__ = "reconciliation_watermarks"
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, unique=True, nullable=False)
+    max_trade_id = Column(Integer, nullable=False, default=0)
+    max_timestamp = Column(DateTime(timezone=True))
+    trade_count = Column(Integer, nullable=False, default=0)
+    trade_generation = Column(Integer)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    def __repr__(self) -> str:
+        return f"<ReconciliationWatermark {self.name} at trade {self.max_trade_id}>"
+
+class PositionSnapshotVersion(Base):
+    """
+    model for one loaded version of the positions of a business date
+    attributes:
+        id: snapshot id, referenced by the snapshot rows and by runs reading them
+        as_of: business date of the positions
+        version: number of the version among the snapshots of the date, from 1
+        source: name of the file the snapshot was loaded from
+        key_columns: comma separated key columns the snapshot carries
+        row_count: number of positions
+        created_at: when the snapshot was loaded
+    """
+    __tablename__ = "position_snapshot_versions"
+
+    id = Column(Integer, primary_key=True, index=True)
+    as_of = Column(Date, nullable=False)
+    version = Column(Integer, nullable=False)
+    source = Column(String)
+    key_columns = Column(String, nullable=False)
+    row_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        # serves the latest version of a date
+        UniqueConstraint("as_of", "version", name="uq_position_snapshot_versions_as_of_version"),
+    )
+
+    def __repr__(self) -> str:
+        return f"<PositionSnapshotVersion {self.id}: {self.as_of} v{self.version}, {self.row_count} positions>"
+
+class PositionSnapshot(Base):
+    """
+    model for one position of a positions snapshot
+    attributes:
+        id: unique identifier
+        snapshot_id: snapshot the position belongs to
+        as_of: business date of the snapshot, copied from its version
+        position_row: position of the row in the loaded file, from 0
+        trader: name of the trader, when the snapshot is keyed by trader
+        asset_class: type of asset
+        quantity: position quantity
+        price: position price
+    """
+    __tablename__ = "position_snapshots"
+
+    id = Column(Integer, primary_key=True)
+    snapshot_id = Column(
+        Integer, ForeignKey("position_snapshot_versions.id", ondelete="CASCADE"), nullable=False
+    )
+    as_of = Column(Date, nullable=False)
+    position_row = Column(Integer, nullable=False)
+    trader = Column(String)
+    asset_class = Column(String, nullable=False)
+    quantity = Column(Float, nullable=False)
+    price = Column(Float, nullable=False)
+
+    __table_args__ = (
+        # reads a snapshot back with an index seek, already in file order
+        Index("ix_position_snapshots_snapshot_row", "snapshot_id", "position_row", unique=True),
+    )
+
+    def __repr__(self) -> str:
+        return f"<PositionSnapshot {self.asset_class} of snapshot {self.snapshot_id}>"
+
+class SchedulerLease(Base):
+    """
+    model for the lease a process holds while it leads the scheduler
+    used where postgres advisory locks are not available, e.g. sqlite
+    attributes:
+        id: unique identifier
+        name: what the lease is held on
+        owner: host, pid and instance of the leading process
+        expires_at: when another process may take the lease over, in utc
+        updated_at: when the lease was last taken or renewed
+    """
+    __tablename__ = "scheduler_leases"
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, unique=True, nullable=False)
+    owner = Column(String, nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    def __repr__(self) -> str:
+        return f"<SchedulerLease {self.name} held by {self.owner} until {self.expires_at}>"
+
 class OperationalLog(Base):
     """
     model for storing operational messages
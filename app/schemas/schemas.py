@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field, validator
-from datetime import datetime
+from datetime import date, datetime
 from typing import Optional, List, Dict
 from app.models.models import TradeStatus, ReconciliationStatus
 import json
@@ -61,22 +61,244 @@ class Trade(TradeBase):
         """
         from_attributes = True
 
+class BulkTradeRowResult(BaseModel):
+    """
+    schema for the outcome of a single row in a bulk trade insert
+    attributes:
+        index: position of the row in the submitted batch
+        trade_id: trade identifier of the row, if one was supplied
+        accepted: whether the row was inserted
+        reason: why the row was rejected
+    """
+    index: int
+    trade_id: Optional[str] = None
+    accepted: bool
+    reason: Optional[str] = None
+
+class BulkTradeResult(BaseModel):
+    """
+    schema for bulk trade insert response
+    attributes:
+        total: number of rows submitted
+        accepted: number of rows inserted
+        rejected: number of rows rejected
+        elapsed_seconds: wall time spent validating and inserting
+        rows_per_second: throughput over all submitted rows
+        results: per-row outcome in submission order
+    """
+    total: int
+    accepted: int
+    rejected: int
+    elapsed_seconds: float
+    rows_per_second: float
+    results: List[BulkTradeRowResult]
+
+class ColumnarTradeResult(BaseModel):
+    """
+    schema for columnar (arrow / parquet) trade ingest response
+    attributes:
+        total: number of rows in the file
+        accepted: number of rows inserted
+        rejected: number of rows rejected
+        elapsed_seconds: wall time spent validating and inserting
+        rows_per_second: throughput over all rows
+        rejection_counts: number of rejected rows per reason
+        errors: first rejected rows with their reasons
+    """
+    total: int
+    accepted: int
+    rejected: int
+    elapsed_seconds: float
+    rows_per_second: float
+    rejection_counts: Dict[str, int]
+    errors: List[BulkTradeRowResult]
+
+class TradeUploadProgress(BaseModel):
+    """
+    schema for streaming trade upload progress
+    attributes:
+        upload_id: upload identifier, reusable to resume a failed load
+        status: running, completed or failed
+        resumed_from: number of leading rows skipped
+        rows_read: number of rows read in this run
+        committed_offset: number of rows durably processed, the resume point
+        accepted: number of rows inserted
+        rejected: number of rows rejected
+        rows_per_second: throughput of this run
+        errors: first rejected rows with their reasons
+        error: error that stopped the load
+    """
+    upload_id: str
+    status: str
+    resumed_from: int
+    rows_read: int
+    committed_offset: int
+    accepted: int
+    rejected: int
+    rows_per_second: float
+    errors: List[BulkTradeRowResult]
+    error: Optional[str] = None
+
+class TradeWriterMetrics(BaseModel):
+    """
+    schema for group commit writer metrics
+    attributes:
+        running: whether the writer is accepting trades
+        queue_depth: trades currently waiting to be written
+        queue_size: maximum number of queued trades
+        max_batch: maximum trades per commit
+        max_delay_ms: maximum time a batch waits to fill
+        batches_flushed: number of commits
+        trades_written: trades committed
+        trades_failed: trades rejected by the database
+        last_batch_size: size of the latest batch
+        max_batch_size: largest batch so far
+        avg_batch_size: mean batch size
+        last_flush_latency_ms: duration of the latest commit
+        max_flush_latency_ms: slowest commit so far
+        avg_flush_latency_ms: mean commit duration
+        avg_wait_ms: mean time from enqueue to commit
+    """
+    running: bool
+    queue_depth: int
+    queue_size: int
+    max_batch: int
+    max_delay_ms: float
+    batches_flushed: int
+    trades_written: int
+    trades_failed: int
+    last_batch_size: int
+    max_batch_size: int
+    avg_batch_size: float
+    last_flush_latency_ms: float
+    max_flush_latency_ms: float
+    avg_flush_latency_ms: float
+    avg_wait_ms: float
+
+class QueryPlanReport(BaseModel):
+    """
+    schema for the query plan of one trade listing filter combination
+    attributes:
+        filters: filters applied to the query
+        cursor: whether the query continues from a cursor
+        plan: plan lines reported by the database
+        problems: plan lines that scan or sort instead of seeking an index
+        flagged: whether any problem was found
+    """
+    filters: List[str]
+    cursor: bool
+    plan: List[str]
+    problems: List[str]
+    flagged: bool
+
+class DailyTradeStats(BaseModel):
+    """
+    schema for trade totals of one day
+    attributes:
+        date: trading day
+        trade_count: number of trades
+        total_volume: summed trade quantity
+    """
+    date: date
+    trade_count: int
+    total_volume: float
+
+class GroupTradeStats(BaseModel):
+    """
+    schema for trade totals of one asset class or trader
+    attributes:
+        key: asset class or trader name
+        trade_count: number of trades
+        total_volume: summed trade quantity
+        avg_trade_size: average trade quantity
+    """
+    key: str
+    trade_count: int
+    total_volume: float
+    avg_trade_size: float
+
+class TradeStats(BaseModel):
+    """
+    schema for aggregated trade statistics over a time range
+    attributes:
+        start: start of the range, inclusive
+        end: end of the range, exclusive
+        total_trades: number of trades
+        total_volume: summed trade quantity
+        avg_trade_size: average trade quantity
+        active_traders: number of distinct traders
+        daily: totals per day, oldest first
+        by_asset_class: totals per asset class
+        by_trader: totals per trader
+    """
+    start: Optional[datetime] = None
+    end: Optional[datetime] = None
+    total_trades: int
+    total_volume: float
+    avg_trade_size: float
+    active_traders: int
+    daily: List[DailyTradeStats]
+    by_asset_class: List[GroupTradeStats]
+    by_trader: List[GroupTradeStats]
+
 class Discrepancy(BaseModel):
     """
     schema for reconciliation discrepancy
     attributes:
         asset_class: type of asset
+        trader: name of the trader, when reconciling by trader
         type: type of discrepancy (quantity or price)
         position_value: value from positions
         trade_value: value from trades
         difference: difference between values
     """
     asset_class: str
+    trader: Optional[str] = None
     type: str
     position_value: float
     trade_value: float
     difference: float
 
+class ReconciliationDiscrepancy(Discrepancy):
+    """
+    schema for a stored reconciliation discrepancy
+    inherits from Discrepancy
+    attributes:
+        id: unique identifier
+        reconciliation_log_id: run that found the discrepancy
+        run_time: when the run happened
+    """
+    asset_class: Optional[str] = None
+    id: int
+    reconciliation_log_id: int
+    run_time: datetime
+
+    class Config:
+        """
+        pydantic configuration
+        """
+        from_attributes = True
+
+class ReconciliationRunStage(BaseModel):
+    """
+    schema for the profile of one stage of a reconciliation run
+    attributes:
+        stage: stage name
+        seconds: wall time spent in the stage
+        rows: rows the stage processed
+        peak_memory_bytes: peak traced python memory above the stage's starting level
+    """
+    stage: str
+    seconds: float
+    rows: Optional[int] = None
+    peak_memory_bytes: Optional[int] = None
+
+    class Config:
+        """
+        pydantic configuration
+        """
+        from_attributes = True
+
 class ReconciliationLogBase(BaseModel):
     """
     base reconciliation log schema
@@ -103,9 +325,11 @@ class ReconciliationLog(ReconciliationLogBase):
     attributes:
         id: unique identifier
         run_time: when the reconciliation was run
+        stages: timing and memory profile of each stage, in execution order
     """
     id: int
     run_time: datetime
+    stages: List[ReconciliationRunStage] = []
 
     @property
     def discrepancies_list(self) -> Optional[List[Discrepancy]]:
@@ -127,6 +351,112 @@ class ReconciliationLog(ReconciliationLogBase):
         """
         from_attributes = True
 
+class ReconciliationJob(BaseModel):
+    """
+    schema for a background reconciliation job
+    attributes:
+        job_id: job identifier to poll
+        status: queued, running, completed or failed
+        stage: current stage of the run
+        progress: completed fraction of the run, 0 to 1
+        cutoff: only trades booked at or before this time are reconciled
+        rebuild: whether the incremental trade aggregates are rebuilt
+        key: comma separated columns reconciled by
+        as_of: past business date reconciled
+        snapshot_id: stored positions snapshot reconciled
+        submitted_at: when the job was submitted
+        started_at: when the job started running
+        finished_at: when the job completed or failed
+        error: error message of a failed job
+        reconciliation_log_id: id of the reconciliation log of a completed job
+        result: reconciliation log of a completed job
+    """
+    job_id: str
+    status: str
+    stage: Optional[str] = None
+    progress: float = 0.0
+    cutoff: Optional[datetime] = None
+    rebuild: bool = False
+    key: str
+    as_of: Optional[date] = None
+    snapshot_id: Optional[int] = None
+    submitted_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    error: Optional[str] = None
+    reconciliation_log_id: Optional[int] = None
+    result: Optional[ReconciliationLog] = None
+
+class StreamingReconciliationState(BaseModel):
+    """
+    schema for the state of streaming reconciliation
+    attributes:
+        running: whether trade events are being reconciled
+        key: comma separated columns reconciled by
+        positions: number of positions in the loaded snapshot
+        positions_fingerprint: fingerprint of the positions file the snapshot was loaded from
+        max_trade_id: highest trade row id folded in
+        trade_count: number of trades folded in
+        events: trade events and caught up trades processed since loading
+        loaded_at: when the snapshot was loaded
+        updated_at: when the last event was processed
+        last_error: latest error while processing an event
+        breaks: current discrepancies, in position order
+    """
+    running: bool
+    key: str
+    positions: int
+    positions_fingerprint: Optional[str] = None
+    max_trade_id: int
+    trade_count: int
+    events: int
+    loaded_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    last_error: Optional[str] = None
+    breaks: List[Discrepancy]
+
+class StreamingReconciliationCheck(BaseModel):
+    """
+    schema for a consistency check of streaming against full reconciliation
+    attributes:
+        consistent: whether both found the same discrepancies
+        checked_at: when the check ran
+        breaks: number of discrepancies held by the stream
+        missing: discrepancies only the full reconciliation found
+        unexpected: discrepancies only the stream holds
+    """
+    consistent: bool
+    checked_at: datetime
+    breaks: int
+    missing: List[Discrepancy]
+    unexpected: List[Discrepancy]
+
+class PositionSnapshotVersion(BaseModel):
+    """
+    schema for a stored positions snapshot
+    attributes:
+        id: snapshot id, pass it to reconciliation runs as snapshot_id
+        as_of: business date of the positions
+        version: number of the version among the snapshots of the date
+        source: name of the file the snapshot was loaded from
+        key_columns: comma separated key columns the snapshot carries
+        row_count: number of positions
+        created_at: when the snapshot was loaded
+    """
+    id: int
+    as_of: date
+    version: int
+    source: Optional[str] = None
+    key_columns: str
+    row_count: int
+    created_at: Optional[datetime] = None
+
+    class Config:
+        """
+        pydantic configuration
+        """
+        from_attributes = True
+
 class OperationalLogBase(BaseModel):
     """
     base operational log schema
@@ -0,0 +1,73 @@
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.models import OperationalLog, ReconciliationLog
+from typing import Any, List, Optional, Sequence
+
+async def get_operational_logs(
+    db: AsyncSession,
+    skip: int = 0,
+    limit: int = 100,
+    columns: Optional[Sequence[Any]] = None
+) -> List[Any]:
+    """
+    get operational logs, newest first
+    args:
+        db (AsyncSession): async database session
+        skip (int): number of records to skip
+        limit (int): maximum number of records to return
+        columns (Optional[Sequence[Any]]): select only these columns and return
+            plain rows instead of OperationalLog objects
+    returns:
+        List[Any]: list of operational logs (or rows)
+    """
+    query = select(*columns) if columns else select(OperationalLog)
+    result = await db.execute(
+        query.order_by(OperationalLog.timestamp.desc()).offset(skip).limit(limit)
+    )
+    return list(result.all() if columns else result.scalars().all())
+
+async def create_operational_log(db: AsyncSession, message: str) -> OperationalLog:
+    """
+    create a new operational log
+    args:
+        db (AsyncSession): async database session
+        message (str): message to log
+    returns:
+        OperationalLog: created log entry
+    raises:
+        ValueError: if log creation fails
+    """
+    try:
+        log = OperationalLog(message=message)
+        db.add(log)
+        await db.commit()
+        await db.refresh(log)
+        return log
+    except Exception as e:
+        await db.rollback()
+        raise ValueError(f"error creating operational log: {str(e)}")
+
+async def get_reconciliation_logs(
+    db: AsyncSession,
+    skip: int = 0,
+    limit: int = 100,
+    newest_first: bool = True,
+    columns: Optional[Sequence[Any]] = None
+) -> List[Any]:
+    """
+    get reconciliation logs
+    args:
+        db (AsyncSession): async database session
+        skip (int): number of records to skip
+        limit (int): maximum number of records to return
+        newest_first (bool): order by run time descending
+        columns (Optional[Sequence[Any]]): select only these columns and return
+            plain rows instead of ReconciliationLog objects
+    returns:
+        List[Any]: list of reconciliation logs (or rows)
+    """
+    query = select(*columns) if columns else select(ReconciliationLog)
+    if newest_first:
+        query = query.order_by(ReconciliationLog.run_time.desc())
+    result = await db.execute(query.offset(skip).limit(limit))
+    return list(result.all() if columns else result.scalars().all())
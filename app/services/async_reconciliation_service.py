@@ -0,0 +1,38 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.services.reconciliation_service import discrepancies_query
+from typing import Any, List, Optional, Sequence
+from datetime import datetime
+
+async def get_discrepancies(
+    db: AsyncSession,
+    asset_class: Optional[str] = None,
+    trader: Optional[str] = None,
+    discrepancy_type: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    reconciliation_log_id: Optional[int] = None,
+    skip: int = 0,
+    limit: int = 100,
+    columns: Optional[Sequence[Any]] = None
+) -> List[Any]:
+    """
+    get one page of discrepancies across reconciliation runs, newest run first
+    args:
+        db (AsyncSession): async database session
+        asset_class (Optional[str]): filter by asset class
+        trader (Optional[str]): filter by trader name
+        discrepancy_type (Optional[str]): filter by type (quantity or price)
+        start (Optional[datetime]): only runs at or after this time
+        end (Optional[datetime]): only runs at or before this time
+        reconciliation_log_id (Optional[int]): only this run
+        skip (int): number of records to skip
+        limit (int): maximum number of records to return
+        columns (Optional[Sequence[Any]]): select only these columns and return
+            plain rows instead of ReconciliationDiscrepancy objects
+    returns:
+        List[Any]: discrepancies (or rows)
+    """
+    result = await db.execute(discrepancies_query(
+        asset_class, trader, discrepancy_type, start, end, reconciliation_log_id, skip, limit, columns
+    ))
+    return list(result.all() if columns else result.scalars().all())
@@ -0,0 +1,115 @@
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.models import Trade, TradeStatus
+from app.schemas.schemas import TradeCreate
+from app.services.streaming_reconciliation_service import notify_trade_status_changed, notify_trades_created
+from app.services.trade_service import split_trades_page, trades_page_query, validate_trade_data
+from typing import Any, List, Optional, Sequence, Tuple
+from datetime import datetime
+
+async def create_trade(db: AsyncSession, trade_data: TradeCreate) -> Trade:
+    """
+    create a new trade in the database
+    args:
+        db (AsyncSession): async database session
+        trade_data (TradeCreate): trade data to create
+    returns:
+        Trade: created trade
+    raises:
+        ValueError: if trade data is invalid
+    """
+    # validate trade data
+    validate_trade_data(trade_data)
+
+    # create trade
+    trade = Trade(
+        trade_id=trade_data.trade_id,
+        trader=trade_data.trader,
+        asset_class=trade_data.asset_class,
+        quantity=trade_data.quantity,
+        price=trade_data.price,
+        timestamp=datetime.now().replace(microsecond=0),
+        status=TradeStatus.PENDING
+    )
+
+    try:
+        db.add(trade)
+        await db.commit()
+        await db.refresh(trade)
+    except Exception as e:
+        await db.rollback()
+        raise ValueError(f"error creating trade: {str(e)}")
+    # the reconciler may run a blocking catch-up under its lock, keep it off the event loop
+    await run_in_threadpool(notify_trades_created, [trade])
+    return trade
+
+async def get_trades_page(
+    db: AsyncSession,
+    trader: Optional[str] = None,
+    asset_class: Optional[str] = None,
+    cursor: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 100,
+    status: Optional[TradeStatus] = None,
+    columns: Optional[Sequence[Any]] = None
+) -> Tuple[List[Any], Optional[str]]:
+    """
+    get one page of trades with keyset pagination
+    args:
+        db (AsyncSession): async database session
+        trader (Optional[str]): filter by trader name
+        asset_class (Optional[str]): filter by asset class
+        cursor (Optional[str]): cursor returned with the previous page
+        skip (int): number of records to skip when no cursor is given
+        limit (int): maximum number of records to return
+        status (Optional[TradeStatus]): filter by trade status
+        columns (Optional[Sequence[Any]]): select only these trade columns and
+            return plain rows instead of Trade objects
+    returns:
+        Tuple[List[Any], Optional[str]]: trades (or rows) of the page and the
+        cursor for the next page, None on the last page
+    raises:
+        ValueError: if the cursor is malformed
+    """
+    result = await db.execute(trades_page_query(trader, asset_class, cursor, skip, limit, status, columns))
+    return split_trades_page(list(result.all() if columns else result.scalars().all()), limit)
+
+async def get_trade_by_id(db: AsyncSession, trade_id: str) -> Optional[Trade]:
+    """
+    get a trade by its id
+    args:
+        db (AsyncSession): async database session
+        trade_id (str): trade id to search for
+    returns:
+        Optional[Trade]: trade if found, None otherwise
+    """
+    result = await db.execute(select(Trade).where(Trade.trade_id == trade_id).limit(1))
+    return result.scalars().first()
+
+async def update_trade_status(
+    db: AsyncSession,
+    trade_id: str,
+    new_status: TradeStatus
+) -> Optional[Trade]:
+    """
+    update a trade's status
+    args:
+        db (AsyncSession): async database session
+        trade_id (str): trade id to update
+        new_status (TradeStatus): new status to set
+    returns:
+        Optional[Trade]: updated trade if found, None otherwise
+    """
+    trade = await get_trade_by_id(db, trade_id)
+    if trade:
+        trade.status = new_status
+        try:
+            await db.commit()
+            await db.refresh(trade)
+        except Exception as e:
+            await db.rollback()
+            raise ValueError(f"error updating trade status: {str(e)}")
+        await run_in_threadpool(notify_trade_status_changed, trade)
+        return trade
+    return None
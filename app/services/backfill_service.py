@@ -0,0 +1,255 @@
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import func, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from app.db.base import SessionLocal
+from app.models.models import Trade, ReconciliationLog, ReconciliationStatus
+from app.services.position_snapshot_service import latest_position_snapshot_ids, read_position_snapshot
+from app.services.profiling_service import StageProfiler
+from app.services.reconciliation_service import (
+    RECONCILIATION_KEY,
+    RECONCILIATION_KEY_COLUMNS,
+    TRADE_TOTAL_COLUMNS,
+    as_of_cutoff,
+    find_discrepancies,
+    log_reconciliation,
+    parse_reconciliation_key,
+    read_positions_from_csv,
+    reconciliation_scope,
+    save_run_stages
+)
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+from datetime import date, datetime, time, timedelta
+import argparse
+import os
+import pandas as pd
+
+# business dates of a backfill reconciled at the same time
+BACKFILL_WORKERS = int(os.getenv("BACKFILL_WORKERS", "4"))
+
+# longest range of dates one backfill accepts
+BACKFILL_MAX_DAYS = int(os.getenv("BACKFILL_MAX_DAYS", "366"))
+
+TRADE_SUM_COLUMNS = ['quantity_sum', 'price_sum', 'trade_count']
+
+def backfill_dates(start: date, end: date, include_weekends: bool = False) -> List[date]:
+    """
+    list the dates a backfill reconciles
+    args:
+        start (date): first date, inclusive
+        end (date): last date, inclusive
+        include_weekends (bool): also reconcile saturdays and sundays
+    returns:
+        List[date]: dates in order
+    raises:
+        ValueError: if the range is empty or longer than BACKFILL_MAX_DAYS
+    """
+    if end < start:
+        raise ValueError("backfill end is before its start")
+    if (end - start).days + 1 > BACKFILL_MAX_DAYS:
+        raise ValueError(f"backfill covers more than {BACKFILL_MAX_DAYS} days")
+    days = [start + timedelta(days=offset) for offset in range((end - start).days + 1)]
+    dates = [day for day in days if include_weekends or day.weekday() < 5]
+    if not dates:
+        raise ValueError("backfill range has no business dates")
+    return dates
+
+def daily_trade_totals(db: Session, key: Sequence[str], dates: Sequence[date]) -> Dict[date, pd.DataFrame]:
+    """
+    get the per key trade totals at the end of every date with two queries
+    trades booked before the first date are aggregated once; trades booked
+    from the first date to the end of the last are read with a range on the
+    timestamp, summed per booking day and key, and accumulated day by day.
+    the trades table is scanned once for the whole range instead of once
+    per date
+    args:
+        db (Session): database session
+        key (Sequence[str]): key columns
+        dates (Sequence[date]): dates in order
+    returns:
+        Dict[date, pd.DataFrame]: per key totals shaped like aggregate_trades output for every date
+    """
+    key = list(key)
+    columns = [RECONCILIATION_KEY_COLUMNS[column] for column in key]
+    sums = [func.sum(Trade.quantity), func.sum(Trade.price), func.count(Trade.id)]
+    start = datetime.combine(dates[0], time.min)
+    dtypes = {'quantity_sum': float, 'price_sum': float, 'trade_count': 'int64'}
+
+    running = pd.DataFrame(
+        db.execute(select(*columns, *sums).where(Trade.timestamp < start).group_by(*columns)).all(),
+        columns=[*key, *TRADE_SUM_COLUMNS]
+    ).astype(dtypes)
+    booking_day = func.date(Trade.timestamp)
+    booked = pd.DataFrame(
+        db.execute(
+            select(booking_day, *columns, *sums)
+            .where(Trade.timestamp >= start, Trade.timestamp <= as_of_cutoff(dates[-1]))
+            .group_by(booking_day, *columns)
+        ).all(),
+        columns=['booking_day', *key, *TRADE_SUM_COLUMNS]
+    ).astype(dtypes)
+    # sqlite returns the day as text, postgres as a date
+    booked['booking_day'] = pd.to_datetime(booked['booking_day']).dt.date
+
+    totals = {}
+    previous = None
+    for as_of in dates:
+        booked_since = booked['booking_day'] <= as_of
+        if previous is not None:
+            booked_since &= booked['booking_day'] > previous
+        running = pd.concat(
+            [running, booked.loc[booked_since, [*key, *TRADE_SUM_COLUMNS]]], ignore_index=True
+        ).groupby(key, sort=False, as_index=False)[TRADE_SUM_COLUMNS].sum()
+        totals[as_of] = pd.DataFrame({
+            **{column: running[column] for column in key},
+            TRADE_TOTAL_COLUMNS[1]: running['quantity_sum'],
+            TRADE_TOTAL_COLUMNS[2]: running['price_sum'] / running['trade_count'],
+            TRADE_TOTAL_COLUMNS[3]: running['trade_count']
+        })
+        previous = as_of
+    return totals
+
+def reconcile_date(
+    as_of: date,
+    trade_totals: pd.DataFrame,
+    key: Sequence[str],
+    snapshot_id: Optional[int] = None,
+    bind: Optional[Engine] = None
+) -> Tuple[List[Dict], StageProfiler]:
+    """
+    compare the positions snapshot of one date with the trade totals at its end
+    args:
+        as_of (date): business date
+        trade_totals (pd.DataFrame): per key trade totals at the end of the date
+        key (Sequence[str]): key columns
+        snapshot_id (Optional[int]): stored snapshot of the date, None reads the date's snapshot file
+        bind (Optional[Engine]): engine the stored snapshot is read with, in a session of its own
+    returns:
+        Tuple[List[Dict], StageProfiler]: discrepancies found and the profile of the run
+    raises:
+        FileNotFoundError: if the date has no positions snapshot
+        ValueError: if the snapshot is invalid
+    """
+    with StageProfiler() as profiler:
+        with profiler.stage("positions") as stage:
+            if snapshot_id:
+                with Session(bind=bind) as db:
+                    positions_df = read_position_snapshot(db, snapshot_id, key)
+            else:
+                positions_df = read_positions_from_csv(as_of)
+            stage['rows'] = len(positions_df)
+        with profiler.stage("compare") as stage:
+            discrepancies = find_discrepancies(positions_df, trade_totals, key)
+            stage['rows'] = len(positions_df)
+    return discrepancies, profiler
+
+def backfill_reconciliation(
+    db: Session,
+    start: date,
+    end: date,
+    key: Optional[Union[str, Sequence[str]]] = None,
+    workers: Optional[int] = None,
+    include_weekends: bool = False
+) -> List[Dict[str, Any]]:
+    """
+    reconcile a range of past business dates, one reconciliation log per date
+    each date compares its positions snapshot with the trades booked up to
+    its end, as run_reconciliation with as_of does, reading the latest stored
+    snapshot of the date or else its snapshot file. the trade totals of every
+    date come from one pass over the trades (see daily_trade_totals), then
+    the dates are compared in a thread pool and logged in date order. a date
+    that cannot be reconciled, e.g. because its snapshot is missing, gets a
+    failed log and the others go ahead. the shared trades stage is recorded
+    with every date's profile
+    args:
+        db (Session): database session
+        start (date): first date, inclusive
+        end (date): last date, inclusive
+        key (Optional[Union[str, Sequence[str]]]): columns to reconcile by, defaults to RECONCILIATION_KEY
+        workers (Optional[int]): dates compared at the same time, defaults to BACKFILL_WORKERS
+        include_weekends (bool): also reconcile saturdays and sundays
+    returns:
+        List[Dict[str, Any]]: per date as_of, reconciliation_log_id, status,
+        discrepancies (count) and error
+    raises:
+        ValueError: if the range or key is invalid or the backfill fails
+    """
+    dates = backfill_dates(start, end, include_weekends)
+    key = parse_reconciliation_key(RECONCILIATION_KEY if key is None else key)
+    try:
+        with StageProfiler() as profiler:
+            with profiler.stage("trades") as trades_stage:
+                totals = daily_trade_totals(db, key, dates)
+                trades_stage['rows'] = int(totals[dates[-1]]['trade_count'].sum())
+        snapshot_ids = latest_position_snapshot_ids(db, dates)
+        bind = db.get_bind()
+
+        results = []
+        with ThreadPoolExecutor(max_workers=workers or BACKFILL_WORKERS, thread_name_prefix="backfill") as executor:
+            futures = {as_of: executor.submit(
+                    reconcile_date, as_of, totals[as_of], key, snapshot_ids.get(as_of), bind
+                ) for as_of in dates}
+            for as_of in dates:
+                try:
+                    discrepancies, day_profiler = futures[as_of].result()
+                except Exception as e:
+                    reconciliation_log = ReconciliationLog(
+                        run_time=datetime.now().replace(microsecond=0),
+                        status=ReconciliationStatus.FAILED,
+                        summary=f"{reconciliation_scope(as_of)} failed: {str(e)}"
+                    )
+                    db.add(reconciliation_log)
+                    db.commit()
+                    results.append({
+                        'as_of': as_of,
+                        'reconciliation_log_id': reconciliation_log.id,
+                        'status': ReconciliationStatus.FAILED,
+                        'discrepancies': 0,
+                        'error': str(e)
+                    })
+                    continue
+                with day_profiler.stage("save") as stage:
+                    reconciliation_log = log_reconciliation(db, discrepancies, as_of)
+                    db.commit()
+                    stage['rows'] = len(discrepancies)
+                day_profiler.stages.insert(0, dict(trades_stage))
+                save_run_stages(db, reconciliation_log, day_profiler)
+                results.append({
+                    'as_of': as_of,
+                    'reconciliation_log_id': reconciliation_log.id,
+                    'status': reconciliation_log.status,
+                    'discrepancies': len(discrepancies),
+                    'error': None
+                })
+        return results
+    except Exception as e:
+        db.rollback()
+        raise ValueError(f"error running reconciliation backfill: {str(e)}")
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    """
+    command line entry point, reconciles the dates given as arguments
+    args:
+        argv (Optional[Sequence[str]]): arguments, defaults to sys.argv
+    """
+    parser = argparse.ArgumentParser(description="reconcile a range of past business dates")
+    parser.add_argument("start", type=date.fromisoformat, help="first date, YYYY-MM-DD")
+    parser.add_argument("end", type=date.fromisoformat, help="last date, YYYY-MM-DD")
+    parser.add_argument("--key", default=None, help="columns to reconcile by, e.g. trader,asset_class")
+    parser.add_argument("--workers", type=int, default=None, help="dates compared at the same time")
+    parser.add_argument("--include-weekends", action="store_true", help="also reconcile weekends")
+    args = parser.parse_args(argv)
+
+    db = SessionLocal()
+    try:
+        results = backfill_reconciliation(
+            db, args.start, args.end, args.key, args.workers, args.include_weekends
+        )
+    finally:
+        db.close()
+    for result in results:
+        outcome = result['error'] or f"{result['discrepancies']} discrepancies"
+        print(f"{result['as_of']}: log {result['reconciliation_log_id']}, {result['status'].value}, {outcome}")
+
+if __name__ == "__main__":
+    main()
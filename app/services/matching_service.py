@@ -0,0 +1,370 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, Sequence, Tuple
+import math
+import os
+
+# largest absolute quantity difference between records that still match
+MATCHING_QUANTITY_TOLERANCE = float(os.getenv("MATCHING_QUANTITY_TOLERANCE", "0.01"))
+
+# largest absolute price difference between records that still match
+MATCHING_PRICE_TOLERANCE = float(os.getenv("MATCHING_PRICE_TOLERANCE", "0.01"))
+
+# rounds of nearest neighbour matching for records the bucket join left over
+MATCHING_NEAREST_ROUNDS = int(os.getenv("MATCHING_NEAREST_ROUNDS", "3"))
+
+# columns records must agree on exactly before quantities and prices are compared
+DEFAULT_MATCH_KEY = ('trader', 'asset_class')
+
+MATCH_LINK_COLUMNS = ['match_id', 'match_type', 'left_id', 'right_id']
+
+def encode_match_key(left: pd.DataFrame, right: pd.DataFrame, by: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    encode the key columns of both sides as one integer per record
+    args:
+        left (pd.DataFrame): left records
+        right (pd.DataFrame): right records
+        by (Sequence[str]): key columns
+    returns:
+        Tuple[np.ndarray, np.ndarray]: int64 key codes of the left and right records
+    """
+    codes = np.zeros(len(left) + len(right), dtype=np.int64)
+    for column in by:
+        column_codes, uniques = pd.factorize(
+            np.concatenate([left[column].to_numpy(dtype=object), right[column].to_numpy(dtype=object)])
+        )
+        codes = codes * (len(uniques) + 1) + column_codes
+    return codes[:len(left)], codes[len(left):]
+
+def bucket(values: np.ndarray, tolerance: float) -> np.ndarray:
+    """
+    bucket values so that values sharing a bucket are less than the tolerance apart
+    args:
+        values (np.ndarray): values to bucket
+        tolerance (float): bucket width, 0 buckets by exact value
+    returns:
+        np.ndarray: int64 bucket of each value, buckets sort like their values
+    """
+    if tolerance <= 0:
+        return pd.factorize(values, sort=True)[0].astype(np.int64)
+    # buckets are centred on multiples of the tolerance, where quantities and
+    # prices quoted in ticks of the tolerance lie
+    return np.rint(values / tolerance).astype(np.int64)
+
+def combine_codes(columns: Sequence[np.ndarray]) -> np.ndarray:
+    """
+    combine integer columns into one int64 code per row that sorts like the columns in order
+    the columns are packed arithmetically when their ranges fit in 62 bits,
+    otherwise the rows are ranked with a lexsort
+    args:
+        columns (Sequence[np.ndarray]): int64 columns of equal length, most significant first
+    returns:
+        np.ndarray: int64 code of each row, equal rows share a code
+    """
+    size = len(columns[0])
+    if size == 0:
+        return np.zeros(0, dtype=np.int64)
+    lows = [int(column.min()) for column in columns]
+    spans = [int(column.max()) - low + 1 for column, low in zip(columns, lows)]
+    if math.prod(spans) < 2 ** 62:
+        code = np.zeros(size, dtype=np.int64)
+        for column, low, span in zip(columns, lows, spans):
+            code = code * span + (column - low)
+        return code
+    order = np.lexsort(columns[::-1])
+    stacked = np.stack([column[order] for column in columns])
+    changed = np.concatenate([[False], (np.diff(stacked, axis=1) != 0).any(axis=0)])
+    code = np.empty(size, dtype=np.int64)
+    code[order] = np.cumsum(changed)
+    return code
+
+def match_buckets(left: pd.DataFrame, right: pd.DataFrame, quantity_tolerance: float, price_tolerance: float) -> pd.DataFrame:
+    """
+    pair records one-to-one on key, quantity bucket and price bucket
+    each side is sorted by bucket and its records numbered within their
+    bucket; the n-th left record of a bucket is looked up among the right
+    records with a binary search and pairs with the n-th right record of the
+    same bucket, a sort-merge join instead of a hash join on numbered records
+    args:
+        left (pd.DataFrame): left records with row, key, quantity and price
+        right (pd.DataFrame): right records with row, key, quantity and price
+        quantity_tolerance (float): quantity bucket width
+        price_tolerance (float): price bucket width
+    returns:
+        pd.DataFrame: left_row and right_row of each pair
+    """
+    if left.empty or right.empty:
+        return pd.DataFrame({'left_row': [], 'right_row': []}, dtype=np.int64)
+    codes = combine_codes([
+        np.concatenate([left['key'].to_numpy(), right['key'].to_numpy()]),
+        bucket(np.concatenate([left['quantity'].to_numpy(), right['quantity'].to_numpy()]), quantity_tolerance),
+        bucket(np.concatenate([left['price'].to_numpy(), right['price'].to_numpy()]), price_tolerance)
+    ])
+    left_order = np.argsort(codes[:len(left)])
+    right_order = np.argsort(codes[len(left):])
+    left_codes = codes[:len(left)][left_order]
+    right_codes = codes[len(left):][right_order]
+
+    # number the left records within their bucket, then find the right record
+    # with the same number in the same bucket
+    index = np.arange(len(left_codes))
+    first = np.concatenate([[True], left_codes[1:] != left_codes[:-1]])
+    occurrence = index - np.maximum.accumulate(np.where(first, index, 0))
+    position = np.searchsorted(right_codes, left_codes, side='left') + occurrence
+    paired = position < np.searchsorted(right_codes, left_codes, side='right')
+    return pd.DataFrame({
+        'left_row': left['row'].to_numpy()[left_order[paired]],
+        'right_row': right['row'].to_numpy()[right_order[position[paired]]]
+    })
+
+def match_nearest(
+    left: pd.DataFrame,
+    right: pd.DataFrame,
+    quantity_tolerance: float,
+    price_tolerance: float,
+    rounds: int = MATCHING_NEAREST_ROUNDS
+) -> pd.DataFrame:
+    """
+    pair records one-to-one with a sort-merge on quantity within each key
+    both sides are sorted together by key and quantity and each record is
+    compared with its neighbours only. a left and a right neighbour within
+    both tolerances pair when neither has a closer valid neighbour; paired
+    records drop out and the next round looks at the new neighbours. catches
+    pairs that straddle a bucket boundary of match_buckets
+    args:
+        left (pd.DataFrame): unmatched left records with row, key, quantity and price
+        right (pd.DataFrame): unmatched right records with row, key, quantity and price
+        quantity_tolerance (float): largest quantity difference
+        price_tolerance (float): largest price difference
+        rounds (int): most rounds, matching stops early once a round pairs nothing
+    returns:
+        pd.DataFrame: left_row and right_row of each pair
+    """
+    if left.empty or right.empty:
+        return pd.DataFrame({'left_row': [], 'right_row': []}, dtype=np.int64)
+    side = np.repeat(np.array([0, 1], dtype=np.int64), [len(left), len(right)])
+    rows = np.concatenate([left['row'].to_numpy(), right['row'].to_numpy()])
+    key = np.concatenate([left['key'].to_numpy(), right['key'].to_numpy()])
+    quantity = np.concatenate([left['quantity'].to_numpy(), right['quantity'].to_numpy()])
+    price = np.concatenate([left['price'].to_numpy(), right['price'].to_numpy()])
+    # a fine quantity grid keeps the sort to one int64 argsort, the exact
+    # differences are checked below
+    order = np.argsort(combine_codes([key, bucket(quantity, quantity_tolerance / 16)]))
+    side, rows, key, quantity, price = side[order], rows[order], key[order], quantity[order], price[order]
+
+    pair_frames = []
+    for _ in range(rounds):
+        quantity_gap = np.abs(np.diff(quantity))
+        price_gap = np.abs(np.diff(price))
+        valid = (
+            (key[1:] == key[:-1]) & (side[1:] != side[:-1])
+            & (quantity_gap <= quantity_tolerance) & (price_gap <= price_tolerance)
+        )
+        distance = np.where(valid, quantity_gap + price_gap, np.inf)
+        padded = np.concatenate([[np.inf], distance, [np.inf]])
+        # neighbour pair i links records i and i + 1; it wins over the pairs
+        # sharing one of its records when it is strictly closer than the one
+        # before and at least as close as the one after
+        chosen = np.flatnonzero(valid & (distance < padded[:-2]) & (distance <= padded[2:]))
+        if not len(chosen):
+            break
+        first, second = chosen, chosen + 1
+        first_left = side[first] == 0
+        pair_frames.append(pd.DataFrame({
+            'left_row': np.where(first_left, rows[first], rows[second]),
+            'right_row': np.where(first_left, rows[second], rows[first])
+        }))
+        remaining = np.ones(len(rows), dtype=bool)
+        remaining[first] = False
+        remaining[second] = False
+        side, rows, key, quantity, price = side[remaining], rows[remaining], key[remaining], quantity[remaining], price[remaining]
+        if len(rows) < 2:
+            break
+    if not pair_frames:
+        return pd.DataFrame({'left_row': [], 'right_row': []}, dtype=np.int64)
+    return pd.concat(pair_frames, ignore_index=True)
+
+def group_ids(rows: pd.Series, keys: pd.Series, ids: np.ndarray, index: pd.Index) -> np.ndarray:
+    """
+    collect the ids of records per key with one sort instead of a call per key
+    args:
+        rows (pd.Series): row of each record
+        keys (pd.Series): key of each record
+        ids (np.ndarray): ids of the side, indexed by row
+        index (pd.Index): keys to collect, in output order
+    returns:
+        np.ndarray: object array with the list of ids of every key of index
+    """
+    order = np.argsort(keys.to_numpy(), kind='stable')
+    sorted_keys = keys.to_numpy()[order]
+    starts = np.flatnonzero(np.concatenate([[True], sorted_keys[1:] != sorted_keys[:-1]])) if len(order) else []
+    values = ids[rows.to_numpy()[order]].tolist()
+    ends = [*starts[1:], len(values)]
+    collected = pd.Series(
+        [values[start:end] for start, end in zip(starts, ends)], index=sorted_keys[starts], dtype=object
+    )
+    return collected.reindex(index).to_numpy()
+
+def group_residuals(left: pd.DataFrame, right: pd.DataFrame) -> pd.DataFrame:
+    """
+    total the records left unpaired per key on each side
+    args:
+        left (pd.DataFrame): unmatched left records with key, quantity and price
+        right (pd.DataFrame): unmatched right records with key, quantity and price
+    returns:
+        pd.DataFrame: per key record count, quantity and quantity weighted price of
+        each side, for keys present on both sides
+    """
+    totals = []
+    for side, suffix in ((left, 'left'), (right, 'right')):
+        grouped = side.assign(notional=side['quantity'] * side['price']).groupby('key', sort=False).agg(
+            count=('row', 'size'), quantity=('quantity', 'sum'), notional=('notional', 'sum')
+        )
+        grouped['price'] = grouped['notional'] / grouped['quantity'].where(grouped['quantity'] != 0)
+        totals.append(grouped.drop(columns='notional').add_suffix(f'_{suffix}'))
+    return totals[0].join(totals[1], how='inner')
+
+def match_records(
+    left: pd.DataFrame,
+    right: pd.DataFrame,
+    by: Sequence[str] = DEFAULT_MATCH_KEY,
+    quantity_tolerance: float = MATCHING_QUANTITY_TOLERANCE,
+    price_tolerance: float = MATCHING_PRICE_TOLERANCE,
+    left_id: str = 'id',
+    right_id: str = 'id'
+) -> Dict[str, pd.DataFrame]:
+    """
+    match two record sets, e.g. booked trades and external confirmations
+    records must agree on the key columns; within a key they match when
+    quantity and price are within the tolerances. matching runs in passes,
+    none of which compares every record with every other:
+    1. one-to-one on key and quantity and price buckets, with one sort
+    2. one-to-one through a sort-merge on key and quantity between
+       neighbouring records, for pairs the buckets split, repeated while it
+       finds pairs
+    3. per key, a single record on one side against several on the other
+       (one-to-many / many-to-one) when the quantities sum within tolerance
+       and the quantity weighted prices agree
+    keys where both sides still hold records that do not add up are reported
+    as partial matches with their differences
+    args:
+        left (pd.DataFrame): left records with key columns, quantity, price and an id column
+        right (pd.DataFrame): right records with key columns, quantity, price and an id column
+        by (Sequence[str]): key columns
+        quantity_tolerance (float): largest absolute quantity difference
+        price_tolerance (float): largest absolute price difference
+        left_id (str): id column of the left records
+        right_id (str): id column of the right records
+    returns:
+        Dict[str, pd.DataFrame]:
+            matched: match_id, match_type, left_id, right_id, one row per linked
+                pair, so a one-to-many match has one row per record of the many side
+            partial: per key match_id, key columns, left_ids, right_ids and the
+                quantity and price of each side with their differences
+            unmatched_left / unmatched_right: records without a counterpart
+    raises:
+        ValueError: if a required column is missing
+    """
+    for name, side, id_column in (('left', left, left_id), ('right', right, right_id)):
+        missing = [column for column in [*by, 'quantity', 'price', id_column] if column not in side.columns]
+        if missing:
+            raise ValueError(f"{name} records have no {', '.join(missing)} column")
+
+    left_key, right_key = encode_match_key(left, right, by)
+    sides = [
+        pd.DataFrame({
+            'row': np.arange(len(side), dtype=np.int64),
+            'key': key,
+            'quantity': side['quantity'].to_numpy(dtype=float),
+            'price': side['price'].to_numpy(dtype=float)
+        })
+        for side, key in ((left, left_key), (right, right_key))
+    ]
+    left_open = np.ones(len(left), dtype=bool)
+    right_open = np.ones(len(right), dtype=bool)
+
+    # passes 1 and 2, one-to-one
+    pair_frames = [match_buckets(sides[0], sides[1], quantity_tolerance, price_tolerance)]
+    left_open[pair_frames[0]['left_row'].to_numpy()] = False
+    right_open[pair_frames[0]['right_row'].to_numpy()] = False
+    pairs = match_nearest(sides[0][left_open], sides[1][right_open], quantity_tolerance, price_tolerance)
+    pair_frames.append(pairs)
+    left_open[pairs['left_row'].to_numpy()] = False
+    right_open[pairs['right_row'].to_numpy()] = False
+    pairs = pd.concat(pair_frames, ignore_index=True)
+    left_ids = left[left_id].to_numpy()
+    right_ids = right[right_id].to_numpy()
+    links = [pd.DataFrame({
+        'match_id': np.arange(len(pairs), dtype=np.int64),
+        'match_type': 'one_to_one',
+        'left_id': left_ids[pairs['left_row'].to_numpy()],
+        'right_id': right_ids[pairs['right_row'].to_numpy()]
+    })]
+
+    # pass 3, one record against several on the other side of its key
+    residual_left, residual_right = sides[0][left_open], sides[1][right_open]
+    groups = group_residuals(residual_left, residual_right)
+    aggregated = (
+        ((groups['count_left'] == 1) | (groups['count_right'] == 1))
+        & ((groups['count_left'] > 1) | (groups['count_right'] > 1))
+        & (np.abs(groups['quantity_left'] - groups['quantity_right']) <= quantity_tolerance)
+        & (np.abs(groups['price_left'] - groups['price_right']) <= price_tolerance)
+    )
+    match_ids = pd.Series(np.arange(len(groups), dtype=np.int64) + len(pairs), index=groups.index)
+    grouped_keys = groups.index[aggregated.to_numpy()]
+    grouped_left = residual_left[residual_left['key'].isin(grouped_keys)]
+    grouped_right = residual_right[residual_right['key'].isin(grouped_keys)]
+    if len(grouped_keys):
+        one_to_many = groups.loc[grouped_keys, 'count_left'] == 1
+        single = pd.concat([
+            grouped_left[grouped_left['key'].isin(grouped_keys[one_to_many.to_numpy()])].set_index('key')['row'].rename('left_row'),
+            grouped_right[grouped_right['key'].isin(grouped_keys[~one_to_many.to_numpy()])].set_index('key')['row'].rename('right_row')
+        ], axis=1)
+        many_right = grouped_right[grouped_right['key'].isin(grouped_keys[one_to_many.to_numpy()])]
+        many_left = grouped_left[grouped_left['key'].isin(grouped_keys[~one_to_many.to_numpy()])]
+        links.append(pd.DataFrame({
+            'match_id': match_ids.loc[many_right['key']].to_numpy(),
+            'match_type': 'one_to_many',
+            'left_id': left_ids[single.loc[many_right['key'], 'left_row'].to_numpy(dtype=np.int64)],
+            'right_id': right_ids[many_right['row'].to_numpy()]
+        }))
+        links.append(pd.DataFrame({
+            'match_id': match_ids.loc[many_left['key']].to_numpy(),
+            'match_type': 'many_to_one',
+            'left_id': left_ids[many_left['row'].to_numpy()],
+            'right_id': right_ids[single.loc[many_left['key'], 'right_row'].to_numpy(dtype=np.int64)]
+        }))
+        left_open[grouped_left['row'].to_numpy()] = False
+        right_open[grouped_right['row'].to_numpy()] = False
+
+    # keys with records on both sides that do not add up
+    partial_groups = groups[~aggregated.to_numpy()]
+    partial_left = residual_left[residual_left['key'].isin(partial_groups.index)]
+    partial_right = residual_right[residual_right['key'].isin(partial_groups.index)]
+    partial = pd.DataFrame({'match_id': match_ids.loc[partial_groups.index].to_numpy()})
+    # key columns are read from the first record of the key, left side first
+    first_left = partial_left.groupby('key', sort=False)['row'].first().reindex(partial_groups.index)
+    first_right = partial_right.groupby('key', sort=False)['row'].first().reindex(partial_groups.index)
+    from_left = first_left.notna().to_numpy()
+    for column in by:
+        partial[column] = np.where(
+            from_left,
+            left[column].to_numpy(dtype=object)[first_left.fillna(0).to_numpy(dtype=np.int64)],
+            right[column].to_numpy(dtype=object)[first_right.fillna(0).to_numpy(dtype=np.int64)]
+        ) if len(partial_groups) else []
+    partial['left_ids'] = group_ids(partial_left['row'], partial_left['key'], left_ids, partial_groups.index)
+    partial['right_ids'] = group_ids(partial_right['row'], partial_right['key'], right_ids, partial_groups.index)
+    for side in ('left', 'right'):
+        partial[f'{side}_quantity'] = partial_groups[f'quantity_{side}'].to_numpy()
+        partial[f'{side}_price'] = partial_groups[f'price_{side}'].to_numpy()
+    partial['quantity_difference'] = partial['left_quantity'] - partial['right_quantity']
+    partial['price_difference'] = partial['left_price'] - partial['right_price']
+    left_open[partial_left['row'].to_numpy()] = False
+    right_open[partial_right['row'].to_numpy()] = False
+
+    return {
+        'matched': pd.concat(links, ignore_index=True)[MATCH_LINK_COLUMNS],
+        'partial': partial,
+        'unmatched_left': left[left_open],
+        'unmatched_right': right[right_open]
+    }
@@ -0,0 +1,300 @@
+import pandas as pd
+from sqlalchemy import func, insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.models.models import PositionSnapshot, PositionSnapshotVersion
+from app.services.positions_service import POSITIONS_DTYPES
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Sequence, Union
+from datetime import date
+import io
+import os
+
+# positions written per COPY (postgres) or executemany (other databases) batch
+POSITION_SNAPSHOT_BATCH_SIZE = int(os.getenv("POSITION_SNAPSHOT_BATCH_SIZE", "50000"))
+
+# attempts at numbering a snapshot version when concurrent uploads of its date race
+POSITION_SNAPSHOT_VERSION_ATTEMPTS = 3
+
+# key columns a snapshot can carry, asset_class is required
+SNAPSHOT_KEY_COLUMNS = ('trader', 'asset_class')
+
+# columns of position_snapshots written by the bulk loader, in COPY order
+SNAPSHOT_ROW_COLUMNS = ['snapshot_id', 'as_of', 'position_row', 'trader', 'asset_class', 'quantity', 'price']
+
+def parse_positions_file(positions_file: Union[str, BinaryIO]) -> pd.DataFrame:
+    """
+    parse and validate a positions csv for loading as a snapshot
+    args:
+        positions_file (Union[str, BinaryIO]): path or binary file of the csv
+    returns:
+        pd.DataFrame: positions with the key columns present, quantity and price
+    raises:
+        ValueError: if the file cannot be parsed, lacks a required column or
+            has positions without an asset class, quantity or price
+    """
+    try:
+        positions_df = pd.read_csv(positions_file, dtype=POSITIONS_DTYPES)
+    except Exception as e:
+        raise ValueError(f"error reading positions file: {str(e)}")
+    missing = [column for column in ('asset_class', 'quantity', 'price') if column not in positions_df.columns]
+    if missing:
+        raise ValueError(f"positions file has no {', '.join(missing)} column")
+    columns = [column for column in SNAPSHOT_KEY_COLUMNS if column in positions_df.columns]
+    positions_df = positions_df[[*columns, 'quantity', 'price']]
+    incomplete = positions_df[['asset_class', 'quantity', 'price']].isna().any(axis=1)
+    if incomplete.any():
+        rows = ", ".join(str(row) for row in incomplete[incomplete].index[:10].tolist())
+        raise ValueError(f"{int(incomplete.sum())} positions lack an asset class, quantity or price, rows {rows}")
+    return positions_df
+
+def copy_snapshot_rows(db: Session, rows: pd.DataFrame) -> None:
+    """
+    write snapshot rows with COPY ... FROM STDIN on the session's postgres connection
+    args:
+        db (Session): database session, the rows join its transaction
+        rows (pd.DataFrame): rows with SNAPSHOT_ROW_COLUMNS
+    """
+    buffer = io.StringIO()
+    # csv COPY reads unquoted empty fields, the missing traders, as NULL
+    rows.to_csv(buffer, index=False, header=False)
+    buffer.seek(0)
+    cursor = db.connection().connection.cursor()
+    try:
+        cursor.copy_expert(
+            f"COPY {PositionSnapshot.__tablename__} ({', '.join(SNAPSHOT_ROW_COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+            buffer
+        )
+    finally:
+        cursor.close()
+
+def insert_snapshot_rows(db: Session, rows: pd.DataFrame) -> None:
+    """
+    write snapshot rows with executemany
+    args:
+        db (Session): database session
+        rows (pd.DataFrame): rows with SNAPSHOT_ROW_COLUMNS
+    """
+    records = rows.astype(object).where(rows.notna(), None).to_dict('records')
+    db.execute(insert(PositionSnapshot), records)
+
+def store_position_snapshot(
+    db: Session,
+    positions_df: pd.DataFrame,
+    as_of: date,
+    source: Optional[str],
+    batch_size: int
+) -> PositionSnapshotVersion:
+    """
+    write one snapshot version with the next free version number of its date
+    args:
+        db (Session): database session
+        positions_df (pd.DataFrame): validated positions
+        as_of (date): business date of the positions
+        source (Optional[str]): name of the file the positions came from
+        batch_size (int): positions per COPY or executemany batch
+    returns:
+        PositionSnapshotVersion: the stored snapshot version
+    raises:
+        IntegrityError: if another upload took the version number first
+    """
+    version = db.execute(
+        select(func.coalesce(func.max(PositionSnapshotVersion.version), 0))
+        .where(PositionSnapshotVersion.as_of == as_of)
+    ).scalar_one() + 1
+    snapshot = PositionSnapshotVersion(
+        as_of=as_of,
+        version=version,
+        source=source,
+        key_columns=",".join(column for column in SNAPSHOT_KEY_COLUMNS if column in positions_df.columns),
+        row_count=len(positions_df)
+    )
+    db.add(snapshot)
+    db.flush()
+
+    rows = pd.DataFrame({
+        'snapshot_id': snapshot.id,
+        'as_of': as_of,
+        'position_row': range(len(positions_df)),
+        'trader': positions_df['trader'].to_numpy() if 'trader' in positions_df.columns else None,
+        'asset_class': positions_df['asset_class'].to_numpy(),
+        'quantity': positions_df['quantity'].to_numpy(dtype=float),
+        'price': positions_df['price'].to_numpy(dtype=float)
+    }, columns=SNAPSHOT_ROW_COLUMNS)
+    write = copy_snapshot_rows if db.get_bind().dialect.name == "postgresql" else insert_snapshot_rows
+    for start in range(0, len(rows), batch_size):
+        write(db, rows.iloc[start:start + batch_size])
+    db.commit()
+    db.refresh(snapshot)
+    return snapshot
+
+def create_position_snapshot(
+    db: Session,
+    positions_df: pd.DataFrame,
+    as_of: date,
+    source: Optional[str] = None,
+    batch_size: int = POSITION_SNAPSHOT_BATCH_SIZE
+) -> PositionSnapshotVersion:
+    """
+    store positions as a new snapshot version of their business date
+    rows are bulk loaded in batches, with COPY on postgres and executemany
+    elsewhere, and committed once with the version, so a failed load leaves
+    no partial snapshot. earlier versions of the date are kept; a version
+    number taken by a concurrent upload of the date is retried with the next
+    args:
+        db (Session): database session
+        positions_df (pd.DataFrame): validated positions, see parse_positions_file
+        as_of (date): business date of the positions
+        source (Optional[str]): name of the file the positions came from
+        batch_size (int): positions per COPY or executemany batch
+    returns:
+        PositionSnapshotVersion: the stored snapshot version
+    raises:
+        ValueError: if the load fails
+    """
+    for attempt in range(POSITION_SNAPSHOT_VERSION_ATTEMPTS):
+        try:
+            return store_position_snapshot(db, positions_df, as_of, source, batch_size)
+        except IntegrityError as e:
+            # a concurrent upload of the same date took the version, number it again
+            db.rollback()
+            if attempt == POSITION_SNAPSHOT_VERSION_ATTEMPTS - 1:
+                raise ValueError(f"error loading positions snapshot: {str(e)}")
+        except Exception as e:
+            db.rollback()
+            raise ValueError(f"error loading positions snapshot: {str(e)}")
+
+def get_position_snapshot(db: Session, snapshot_id: int) -> Optional[PositionSnapshotVersion]:
+    """
+    get a positions snapshot version
+    args:
+        db (Session): database session
+        snapshot_id (int): snapshot id
+    returns:
+        Optional[PositionSnapshotVersion]: the snapshot, None if unknown
+    """
+    return db.get(PositionSnapshotVersion, snapshot_id)
+
+def count_position_snapshot(db: Session, snapshot_id: int) -> int:
+    """
+    count the positions of a snapshot
+    args:
+        db (Session): database session
+        snapshot_id (int): snapshot id
+    returns:
+        int: number of positions
+    raises:
+        ValueError: if the snapshot is unknown
+    """
+    snapshot = get_position_snapshot(db, snapshot_id)
+    if snapshot is None:
+        raise ValueError(f"positions snapshot {snapshot_id} not found")
+    return snapshot.row_count
+
+def get_position_snapshots(
+    db: Session,
+    as_of: Optional[date] = None,
+    skip: int = 0,
+    limit: int = 100
+) -> List[PositionSnapshotVersion]:
+    """
+    list positions snapshots, latest date and version first
+    args:
+        db (Session): database session
+        as_of (Optional[date]): only list the versions of this business date
+        skip (int): number of snapshots to skip
+        limit (int): maximum number of snapshots
+    returns:
+        List[PositionSnapshotVersion]: snapshot versions
+    """
+    query = select(PositionSnapshotVersion)
+    if as_of:
+        query = query.where(PositionSnapshotVersion.as_of == as_of)
+    query = query.order_by(
+        PositionSnapshotVersion.as_of.desc(), PositionSnapshotVersion.version.desc()
+    ).offset(skip).limit(limit)
+    return db.execute(query).scalars().all()
+
+def latest_position_snapshot_ids(db: Session, dates: Sequence[date]) -> Dict[date, int]:
+    """
+    get the latest snapshot version of each business date
+    args:
+        db (Session): database session
+        dates (Sequence[date]): business dates
+    returns:
+        Dict[date, int]: snapshot id per date, dates without snapshots are left out
+    """
+    latest = (
+        select(PositionSnapshotVersion.as_of, func.max(PositionSnapshotVersion.version).label('version'))
+        .where(PositionSnapshotVersion.as_of.in_(list(dates)))
+        .group_by(PositionSnapshotVersion.as_of)
+        .subquery()
+    )
+    rows = db.execute(
+        select(PositionSnapshotVersion.as_of, PositionSnapshotVersion.id).join(
+            latest,
+            (PositionSnapshotVersion.as_of == latest.c.as_of) & (PositionSnapshotVersion.version == latest.c.version)
+        )
+    ).all()
+    return {as_of: snapshot_id for as_of, snapshot_id in rows}
+
+def position_snapshot_query(db: Session, snapshot_id: int, key: Sequence[str]) -> Any:
+    """
+    build the query reading a snapshot back in file order
+    args:
+        db (Session): database session
+        snapshot_id (int): snapshot to read
+        key (Sequence[str]): key columns to select
+    returns:
+        Select: query over the (snapshot_id, position_row) index
+    raises:
+        ValueError: if the snapshot is unknown or lacks a key column
+    """
+    snapshot = get_position_snapshot(db, snapshot_id)
+    if snapshot is None:
+        raise ValueError(f"positions snapshot {snapshot_id} not found")
+    missing = [column for column in key if column not in snapshot.key_columns.split(",")]
+    if missing:
+        raise ValueError(f"positions snapshot {snapshot_id} has no {', '.join(missing)} column")
+    return select(
+        *[getattr(PositionSnapshot, column) for column in key],
+        PositionSnapshot.quantity,
+        PositionSnapshot.price
+    ).where(PositionSnapshot.snapshot_id == snapshot_id).order_by(PositionSnapshot.position_row)
+
+def read_position_snapshot(db: Session, snapshot_id: int, key: Sequence[str]) -> pd.DataFrame:
+    """
+    read a positions snapshot
+    args:
+        db (Session): database session
+        snapshot_id (int): snapshot to read
+        key (Sequence[str]): key columns to read
+    returns:
+        pd.DataFrame: positions with the key columns, quantity and price, in file order
+    raises:
+        ValueError: if the snapshot is unknown or lacks a key column
+    """
+    query = position_snapshot_query(db, snapshot_id, key)
+    return pd.DataFrame(db.execute(query).all(), columns=[*key, 'quantity', 'price'])
+
+def iter_position_snapshot_chunks(
+    db: Session,
+    snapshot_id: int,
+    key: Sequence[str],
+    chunk_size: int
+) -> Iterator[pd.DataFrame]:
+    """
+    read a positions snapshot a chunk at a time
+    args:
+        db (Session): database session
+        snapshot_id (int): snapshot to read
+        key (Sequence[str]): key columns to read
+        chunk_size (int): positions per chunk
+    returns:
+        Iterator[pd.DataFrame]: chunks of positions in file order
+    raises:
+        ValueError: if the snapshot is unknown or lacks a key column
+    """
+    query = position_snapshot_query(db, snapshot_id, key)
+    result = db.execute(query, execution_options={"yield_per": chunk_size})
+    for partition in result.partitions():
+        yield pd.DataFrame(partition, columns=[*key, 'quantity', 'price'])
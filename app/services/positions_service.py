@@ -0,0 +1,162 @@
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+from typing import Dict, Optional, Tuple
+import hashlib
+import os
+import threading
+
+# keep parsed positions files in memory until the file changes
+POSITIONS_CACHE_ENABLED = os.getenv("POSITIONS_CACHE", "true").lower() in ("1", "true", "yes")
+
+# write a feather sidecar next to the csv and memory-map it on later loads
+POSITIONS_SIDECAR_ENABLED = os.getenv("POSITIONS_SIDECAR", "true").lower() in ("1", "true", "yes")
+
+# fingerprint files by a sha256 of their content instead of mtime and size
+POSITIONS_HASH_CONTENT = os.getenv("POSITIONS_HASH_CONTENT", "false").lower() in ("1", "true", "yes")
+
+# rows parsed at a time from large csv files
+POSITIONS_CSV_CHUNK_SIZE = int(os.getenv("POSITIONS_CSV_CHUNK_SIZE", "500000"))
+
+# dtypes of the known positions columns, other columns are inferred
+POSITIONS_DTYPES = {
+    'trader': str,
+    'asset_class': str,
+    'quantity': 'float64',
+    'price': 'float64'
+}
+
+# schema metadata key holding the fingerprint of the csv a sidecar was built from
+SIDECAR_FINGERPRINT_KEY = b"tradeops.positions.fingerprint"
+
+_cache: Dict[str, Tuple[str, pd.DataFrame]] = {}
+_cache_lock = threading.Lock()
+
+def positions_fingerprint(path: str, hash_content: bool = POSITIONS_HASH_CONTENT) -> str:
+    """
+    fingerprint a positions file
+    args:
+        path (str): path of the positions file
+        hash_content (bool): hash the file content instead of using mtime and size
+    returns:
+        str: fingerprint that changes whenever the file does
+    raises:
+        FileNotFoundError: if the file does not exist
+    """
+    if hash_content:
+        digest = hashlib.sha256()
+        with open(path, 'rb') as positions_file:
+            for block in iter(lambda: positions_file.read(1 << 20), b''):
+                digest.update(block)
+        return f"sha256:{digest.hexdigest()}"
+    stat = os.stat(path)
+    return f"stat:{stat.st_mtime_ns}:{stat.st_size}"
+
+def sidecar_path(path: str) -> str:
+    """
+    get the path of the feather sidecar of a positions file
+    args:
+        path (str): path of the positions file
+    returns:
+        str: path of the sidecar
+    """
+    return f"{path}.feather"
+
+def parse_positions_csv(path: str, chunk_size: int = POSITIONS_CSV_CHUNK_SIZE) -> pd.DataFrame:
+    """
+    parse a positions csv in chunks with explicit dtypes
+    args:
+        path (str): path of the positions file
+        chunk_size (int): rows parsed at a time
+    returns:
+        pd.DataFrame: positions data
+    """
+    chunks = list(pd.read_csv(path, dtype=POSITIONS_DTYPES, chunksize=chunk_size))
+    if len(chunks) == 1:
+        return chunks[0]
+    return pd.concat(chunks, ignore_index=True)
+
+def read_sidecar(path: str, fingerprint: str) -> Optional[pd.DataFrame]:
+    """
+    memory-map the sidecar of a positions file if it was built from the current file
+    args:
+        path (str): path of the positions file
+        fingerprint (str): fingerprint of the current file
+    returns:
+        Optional[pd.DataFrame]: positions data, None if there is no current sidecar
+    """
+    try:
+        table = feather.read_table(sidecar_path(path), memory_map=True)
+    except (FileNotFoundError, pa.ArrowInvalid, OSError):
+        return None
+    metadata = table.schema.metadata or {}
+    if metadata.get(SIDECAR_FINGERPRINT_KEY) != fingerprint.encode():
+        return None
+    return table.to_pandas()
+
+def write_sidecar(path: str, fingerprint: str, positions_df: pd.DataFrame) -> None:
+    """
+    write the feather sidecar of a positions file, skipped if the directory is read-only
+    args:
+        path (str): path of the positions file
+        fingerprint (str): fingerprint of the file the data was parsed from
+        positions_df (pd.DataFrame): parsed positions data
+    """
+    table = pa.Table.from_pandas(positions_df, preserve_index=False)
+    table = table.replace_schema_metadata({
+        **(table.schema.metadata or {}),
+        SIDECAR_FINGERPRINT_KEY: fingerprint.encode()
+    })
+    temporary = f"{sidecar_path(path)}.{os.getpid()}.tmp"
+    try:
+        # uncompressed so later loads can map the columns without decoding them
+        feather.write_feather(table, temporary, compression="uncompressed")
+        os.replace(temporary, sidecar_path(path))
+    except OSError:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+
+def load_positions(
+    path: str,
+    use_cache: bool = POSITIONS_CACHE_ENABLED,
+    use_sidecar: bool = POSITIONS_SIDECAR_ENABLED
+) -> pd.DataFrame:
+    """
+    load a positions csv, reusing earlier parses while the file is unchanged
+    the parsed frame is cached in memory under the file's fingerprint; with a
+    sidecar, a fresh process memory-maps the feather copy instead of parsing
+    the csv again. callers get a shallow copy and must not modify its values
+    args:
+        path (str): path of the positions file
+        use_cache (bool): keep the parsed frame in memory
+        use_sidecar (bool): read and write the feather sidecar
+    returns:
+        pd.DataFrame: positions data
+    raises:
+        FileNotFoundError: if the file does not exist
+    """
+    path = os.path.abspath(path)
+    fingerprint = positions_fingerprint(path)
+    if use_cache:
+        with _cache_lock:
+            cached = _cache.get(path)
+        if cached and cached[0] == fingerprint:
+            return cached[1].copy(deep=False)
+
+    positions_df = read_sidecar(path, fingerprint) if use_sidecar else None
+    if positions_df is None:
+        positions_df = parse_positions_csv(path)
+        if use_sidecar:
+            write_sidecar(path, fingerprint, positions_df)
+
+    if use_cache:
+        with _cache_lock:
+            _cache[path] = (fingerprint, positions_df)
+    return positions_df.copy(deep=False)
+
+def clear_positions_cache() -> None:
+    """
+    drop every cached positions frame
+    """
+    with _cache_lock:
+        _cache.clear()
@@ -0,0 +1,89 @@
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List
+import os
+import threading
+import time
+import tracemalloc
+
+# track peak python memory per stage with tracemalloc, off by default since
+# tracing is process wide and slows allocation heavy code in every thread while
+# a run is in flight; enable it with PROFILE_MEMORY or for one run with
+# run_reconciliation(profile_memory=True)
+PROFILE_MEMORY = os.getenv("PROFILE_MEMORY", "false").lower() in ("1", "true", "yes")
+
+_tracing_lock = threading.Lock()
+_tracing_users = 0
+_tracing_started = False
+
+def start_memory_tracing() -> None:
+    """
+    start tracemalloc for one more profiler, unless it is already running
+    """
+    global _tracing_users, _tracing_started
+    with _tracing_lock:
+        if _tracing_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _tracing_started = True
+        _tracing_users += 1
+
+def stop_memory_tracing() -> None:
+    """
+    release tracemalloc for one profiler, stopping it once the last one is done
+    tracing started outside the profilers is left running
+    """
+    global _tracing_users, _tracing_started
+    with _tracing_lock:
+        _tracing_users = max(_tracing_users - 1, 0)
+        if _tracing_users == 0 and _tracing_started:
+            tracemalloc.stop()
+            _tracing_started = False
+
+class StageProfiler:
+    """
+    record wall time, rows processed and peak memory of consecutive stages
+    peak memory is the python heap traced by tracemalloc above its level when
+    the stage started; the tracer is process wide, so stages of runs that
+    overlap in other threads share their peaks, and memory of worker
+    processes is not traced
+    """
+
+    def __init__(self, trace_memory: bool = PROFILE_MEMORY):
+        """
+        create a profiler
+        args:
+            trace_memory (bool): track peak memory per stage
+        """
+        self.trace_memory = trace_memory
+        self.stages: List[Dict[str, Any]] = []
+
+    def __enter__(self) -> "StageProfiler":
+        if self.trace_memory:
+            start_memory_tracing()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        if self.trace_memory:
+            stop_memory_tracing()
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[Dict[str, Any]]:
+        """
+        profile one stage, the caller may set "rows" on the yielded record
+        args:
+            name (str): stage name
+        returns:
+            Iterator[Dict[str, Any]]: stage record, filled in when the stage ends
+        """
+        record: Dict[str, Any] = {'stage': name, 'seconds': 0.0, 'rows': None, 'peak_memory_bytes': None}
+        tracing = self.trace_memory and tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+        started = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record['seconds'] = time.perf_counter() - started
+            if tracing:
+                record['peak_memory_bytes'] = max(tracemalloc.get_traced_memory()[1] - baseline, 0)
+            self.stages.append(record)
@@ -0,0 +1,192 @@
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy.orm import Session
+from app.services.reconciliation_service import parse_reconciliation_key, RECONCILIATION_KEY, run_reconciliation
+from typing import Any, Callable, Dict, Optional, Sequence, Union
+from datetime import date, datetime
+import os
+import queue
+import threading
+import uuid
+
+# reconciliations running at the same time, further jobs wait in the executor queue
+RECONCILIATION_JOB_WORKERS = int(os.getenv("RECONCILIATION_JOB_WORKERS", "1"))
+
+# queued plus running jobs accepted before new submissions are rejected
+RECONCILIATION_JOB_QUEUE_SIZE = int(os.getenv("RECONCILIATION_JOB_QUEUE_SIZE", "10"))
+
+# finished jobs kept for status polling, oldest are dropped first
+RECONCILIATION_JOB_HISTORY = int(os.getenv("RECONCILIATION_JOB_HISTORY", "100"))
+
+# job records by job id, in submission order
+reconciliation_jobs: Dict[str, Dict[str, Any]] = {}
+reconciliation_jobs_lock = threading.Lock()
+
+_executor: Optional[ThreadPoolExecutor] = None
+
+ACTIVE_STATUSES = ("queued", "running")
+
+def get_job_executor() -> ThreadPoolExecutor:
+    """
+    get the executor running reconciliation jobs, created on first use
+    returns:
+        ThreadPoolExecutor: executor bounded to RECONCILIATION_JOB_WORKERS threads
+    """
+    global _executor
+    with reconciliation_jobs_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=RECONCILIATION_JOB_WORKERS,
+                thread_name_prefix="reconciliation-job"
+            )
+        return _executor
+
+def shutdown_reconciliation_jobs(wait: bool = True) -> None:
+    """
+    stop the job executor, running jobs finish when wait is set
+    args:
+        wait (bool): wait for queued and running jobs
+    """
+    global _executor
+    with reconciliation_jobs_lock:
+        executor, _executor = _executor, None
+    if executor:
+        executor.shutdown(wait=wait, cancel_futures=not wait)
+
+def get_reconciliation_job(job_id: str) -> Optional[Dict[str, Any]]:
+    """
+    get a reconciliation job
+    args:
+        job_id (str): job id returned on submission
+    returns:
+        Optional[Dict[str, Any]]: copy of the job record, None if unknown
+    """
+    with reconciliation_jobs_lock:
+        job = reconciliation_jobs.get(job_id)
+        return dict(job) if job else None
+
+def update_reconciliation_job(job_id: str, **fields: Any) -> None:
+    """
+    update fields of a job record
+    args:
+        job_id (str): job to update
+        fields (Any): fields to set
+    """
+    with reconciliation_jobs_lock:
+        if job_id in reconciliation_jobs:
+            reconciliation_jobs[job_id].update(fields)
+
+def prune_reconciliation_jobs() -> None:
+    """
+    drop the oldest finished jobs beyond RECONCILIATION_JOB_HISTORY, caller holds the lock
+    """
+    finished = [job_id for job_id, job in reconciliation_jobs.items() if job["status"] not in ACTIVE_STATUSES]
+    for job_id in finished[:max(len(finished) - RECONCILIATION_JOB_HISTORY, 0)]:
+        del reconciliation_jobs[job_id]
+
+def submit_reconciliation_job(
+    session_factory: Callable[[], Session],
+    cutoff: Optional[datetime] = None,
+    rebuild: bool = False,
+    key: Optional[Union[str, Sequence[str]]] = None,
+    as_of: Optional[date] = None,
+    snapshot_id: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    queue a reconciliation run on the background executor
+    a run with the same parameters as a queued or running job is not queued
+    again, its submitter gets the job already in flight
+    args:
+        session_factory (Callable[[], Session]): factory for the job's session
+        cutoff (Optional[datetime]): only reconcile trades booked at or before this time
+        rebuild (bool): rebuild the incremental trade aggregates from every trade
+        key (Optional[Union[str, Sequence[str]]]): columns to reconcile by
+        as_of (Optional[date]): reconcile this past business date
+        snapshot_id (Optional[int]): read positions from this stored snapshot
+    returns:
+        Dict[str, Any]: job record
+    raises:
+        ValueError: if the key is invalid or both cutoff and as_of are given
+        queue.Full: if RECONCILIATION_JOB_QUEUE_SIZE jobs are already queued or running
+    """
+    key = ",".join(parse_reconciliation_key(RECONCILIATION_KEY if key is None else key))
+    if cutoff and as_of:
+        raise ValueError("pass either cutoff or as_of, not both")
+    executor = get_job_executor()
+    with reconciliation_jobs_lock:
+        for job in reconciliation_jobs.values():
+            if (
+                job["status"] in ACTIVE_STATUSES
+                and job["cutoff"] == cutoff
+                and job["rebuild"] == rebuild
+                and job["key"] == key
+                and job["as_of"] == as_of
+                and job["snapshot_id"] == snapshot_id
+            ):
+                return dict(job)
+        active = sum(1 for job in reconciliation_jobs.values() if job["status"] in ACTIVE_STATUSES)
+        if active >= RECONCILIATION_JOB_QUEUE_SIZE:
+            raise queue.Full(f"{active} reconciliation jobs are already queued or running")
+        job = {
+            "job_id": uuid.uuid4().hex,
+            "status": "queued",
+            "stage": None,
+            "progress": 0.0,
+            "cutoff": cutoff,
+            "rebuild": rebuild,
+            "key": key,
+            "as_of": as_of,
+            "snapshot_id": snapshot_id,
+            "submitted_at": datetime.now(),
+            "started_at": None,
+            "finished_at": None,
+            "error": None,
+            "reconciliation_log_id": None
+        }
+        reconciliation_jobs[job["job_id"]] = job
+        prune_reconciliation_jobs()
+        submitted = dict(job)
+    executor.submit(run_reconciliation_job, job["job_id"], session_factory, cutoff, rebuild, key, as_of, snapshot_id)
+    return submitted
+
+def run_reconciliation_job(
+    job_id: str,
+    session_factory: Callable[[], Session],
+    cutoff: Optional[datetime],
+    rebuild: bool,
+    key: str,
+    as_of: Optional[date] = None,
+    snapshot_id: Optional[int] = None
+) -> None:
+    """
+    run a queued reconciliation job and record its outcome
+    args:
+        job_id (str): job to run
+        session_factory (Callable[[], Session]): factory for the job's session
+        cutoff (Optional[datetime]): only reconcile trades booked at or before this time
+        rebuild (bool): rebuild the incremental trade aggregates from every trade
+        key (str): columns to reconcile by
+        as_of (Optional[date]): reconcile this past business date
+        snapshot_id (Optional[int]): read positions from this stored snapshot
+    """
+    update_reconciliation_job(job_id, status="running", started_at=datetime.now())
+
+    def progress(stage: str, fraction: float) -> None:
+        update_reconciliation_job(job_id, stage=stage, progress=round(fraction, 4))
+
+    db = session_factory()
+    try:
+        reconciliation_log = run_reconciliation(
+            db, cutoff, rebuild=rebuild, key=key, progress_callback=progress, as_of=as_of, snapshot_id=snapshot_id
+        )
+        update_reconciliation_job(
+            job_id,
+            status="completed",
+            stage="completed",
+            progress=1.0,
+            reconciliation_log_id=reconciliation_log.id,
+            finished_at=datetime.now()
+        )
+    except Exception as e:
+        update_reconciliation_job(job_id, status="failed", error=str(e), finished_at=datetime.now())
+    finally:
+        db.close()
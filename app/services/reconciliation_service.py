@@ -1,17 +1,106 @@
+import numpy as np
 import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from sqlalchemy import create_engine, func, insert, literal, select
+from sqlalchemy.sql import Select
 from sqlalchemy.orm import Session
-from app.models.models import Trade, ReconciliationLog, ReconciliationStatus
-from typing import Dict, List, Optional
+from app.models.models import (
+    Trade,
+    ReconciliationAggregate,
+    ReconciliationDiscrepancy,
+    ReconciliationFingerprint,
+    ReconciliationLog,
+    ReconciliationRunStage,
+    ReconciliationStatus,
+    ReconciliationWatermark,
+    TradeChangeStamp
+)
+from app.services.position_snapshot_service import (
+    count_position_snapshot,
+    iter_position_snapshot_chunks,
+    latest_position_snapshot_ids,
+    read_position_snapshot
+)
+from app.services.positions_service import POSITIONS_DTYPES, load_positions, positions_fingerprint
+from app.services.profiling_service import PROFILE_MEMORY, StageProfiler
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+import hashlib
 import json
-from datetime import datetime
+import math
+import pickle
+import tempfile
+from datetime import date, datetime, time
 import os
 
-# default path for positions file
-POSITIONS_FILE = 'positions.csv'
+# positions file, relative paths are resolved against the data directory
+POSITIONS_FILE = os.getenv("POSITIONS_FILE", 'positions.csv')
 
-def read_positions_from_csv() -> pd.DataFrame:
+# end of day positions snapshot for as-of runs, {date} is replaced by the business date
+POSITIONS_SNAPSHOT_FILE = os.getenv("POSITIONS_SNAPSHOT_FILE", 'positions_{date}.csv')
+
+# aggregate the trade side with one group by query instead of loading every trade
+RECONCILIATION_SQL_AGGREGATES = os.getenv("RECONCILIATION_SQL_AGGREGATES", "true").lower() in ("1", "true", "yes")
+
+# fold only the trades booked since the last run into persisted running totals
+RECONCILIATION_INCREMENTAL = os.getenv("RECONCILIATION_INCREMENTAL", "true").lower() in ("1", "true", "yes")
+
+# watermark row tracking the per asset class aggregates
+AGGREGATE_WATERMARK = "asset_class"
+
+# columns of the per asset class trade totals compared against positions
+TRADE_TOTAL_COLUMNS = ['asset_class', 'trade_quantity', 'trade_price', 'trade_count']
+
+# trade columns reconciliation can key on; positions files carry the ones in use
+RECONCILIATION_KEY_COLUMNS = {
+    'trader': Trade.trader,
+    'asset_class': Trade.asset_class
+}
+
+# key of the original per asset class reconciliation
+DEFAULT_RECONCILIATION_KEY = ('asset_class',)
+
+# comma separated key columns used when a run does not pass its own, e.g. "trader,asset_class"
+RECONCILIATION_KEY = os.getenv("RECONCILIATION_KEY", "asset_class")
+
+# number of keys held in memory at once by the partitioned reconciliation join
+RECONCILIATION_CHUNK_SIZE = int(os.getenv("RECONCILIATION_CHUNK_SIZE", "100000"))
+
+# worker processes reconciling key partitions in parallel, 1 reconciles in-process
+RECONCILIATION_WORKERS = int(os.getenv("RECONCILIATION_WORKERS", "1"))
+
+# reuse the previous run's result when positions, trades and parameters are unchanged
+RECONCILIATION_CACHE = os.getenv("RECONCILIATION_CACHE", "true").lower() in ("1", "true", "yes")
+
+def positions_path(as_of: Optional[date] = None) -> str:
+    """
+    get the path of the positions csv file
+    args:
+        as_of (Optional[date]): business date of the snapshot, None for current positions
+    returns:
+        str: POSITIONS_FILE, or POSITIONS_SNAPSHOT_FILE for the date, resolved
+        against the data directory when relative
+    """
+    data_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'data')
+    if as_of:
+        return os.path.join(data_dir, POSITIONS_SNAPSHOT_FILE.format(date=as_of.isoformat()))
+    return os.path.join(data_dir, POSITIONS_FILE)
+
+def as_of_cutoff(as_of: date) -> datetime:
+    """
+    get the trade cutoff of a business date
+    args:
+        as_of (date): business date
+    returns:
+        datetime: last instant of the date, trades booked at or before it count
+    """
+    return datetime.combine(as_of, time.max)
+
+def read_positions_from_csv(as_of: Optional[date] = None) -> pd.DataFrame:
     """
     read positions from the csv file
+    unchanged files are served from the positions cache, see load_positions
+    args:
+        as_of (Optional[date]): read the snapshot of this business date
     returns:
         pd.DataFrame: positions data
     raises:
@@ -19,28 +108,110 @@ def read_positions_from_csv() -> pd.DataFrame:
         ValueError: if positions file is invalid
     """
     try:
-        csv_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'data', 'positions.csv')
-        return pd.read_csv(csv_path)
+        return load_positions(positions_path(as_of))
     except FileNotFoundError:
-        raise FileNotFoundError("positions file not found")
+        raise FileNotFoundError(f"positions snapshot for {as_of} not found" if as_of else "positions file not found")
     except Exception as e:
         raise ValueError(f"error reading positions file: {str(e)}")
 
-def get_trades_dataframe(db: Session) -> pd.DataFrame:
+def iter_position_chunks(
+    chunk_size: int,
+    key: Sequence[str] = DEFAULT_RECONCILIATION_KEY,
+    as_of: Optional[date] = None
+) -> Iterator[pd.DataFrame]:
+    """
+    read positions from the csv file a chunk at a time
+    args:
+        chunk_size (int): number of positions per chunk
+        key (Sequence[str]): key columns, read as strings
+        as_of (Optional[date]): read the snapshot of this business date
+    returns:
+        Iterator[pd.DataFrame]: chunks of positions data
+    raises:
+        FileNotFoundError: if positions file is not found
+        ValueError: if positions file is invalid or lacks a key column
+    """
+    try:
+        chunks = pd.read_csv(
+            positions_path(as_of),
+            chunksize=chunk_size,
+            dtype={**POSITIONS_DTYPES, **{column: str for column in key}}
+        )
+        for chunk in chunks:
+            missing = [column for column in (*key, 'quantity', 'price') if column not in chunk.columns]
+            if missing:
+                raise ValueError(f"positions file has no {', '.join(missing)} column")
+            yield chunk
+    except FileNotFoundError:
+        raise FileNotFoundError(f"positions snapshot for {as_of} not found" if as_of else "positions file not found")
+    except ValueError:
+        raise
+    except Exception as e:
+        raise ValueError(f"error reading positions file: {str(e)}")
+
+def parse_reconciliation_key(key: Union[str, Sequence[str]]) -> Tuple[str, ...]:
+    """
+    validate a composite reconciliation key
+    args:
+        key (Union[str, Sequence[str]]): key columns, or a comma separated string of them
+    returns:
+        Tuple[str, ...]: key columns
+    raises:
+        ValueError: if a column is unknown or repeated, or asset_class is missing
+    """
+    columns = tuple(column.strip() for column in key.split(',')) if isinstance(key, str) else tuple(key)
+    unknown = [column for column in columns if column not in RECONCILIATION_KEY_COLUMNS]
+    if unknown:
+        raise ValueError(
+            f"unsupported reconciliation key column {', '.join(unknown)}, "
+            f"expected some of {', '.join(RECONCILIATION_KEY_COLUMNS)}"
+        )
+    if len(set(columns)) != len(columns):
+        raise ValueError("reconciliation key columns must not repeat")
+    if 'asset_class' not in columns:
+        raise ValueError("reconciliation key must include asset_class")
+    return columns
+
+def get_trades_dataframe(db: Session, cutoff: Optional[datetime] = None) -> pd.DataFrame:
     """
     get trades from database as dataframe
     args:
         db (Session): database session
+        cutoff (Optional[datetime]): only include trades booked at or before this time
     returns:
         pd.DataFrame: trades data
     """
-    trades = db.query(Trade).all()
+    query = db.query(Trade)
+    if cutoff:
+        query = query.filter(Trade.timestamp <= cutoff)
+    trades = query.all()
     return pd.DataFrame([{
         'asset_class': t.asset_class,
         'quantity': float(t.quantity),
         'price': float(t.price)
     } for t in trades])
 
+def get_trade_totals(db: Session, cutoff: Optional[datetime] = None) -> pd.DataFrame:
+    """
+    aggregate trades per asset class in the database
+    only one row per asset class is fetched, so memory does not grow with the
+    number of trades
+    args:
+        db (Session): database session
+        cutoff (Optional[datetime]): only include trades booked at or before this time
+    returns:
+        pd.DataFrame: per asset class totals shaped like aggregate_trades output
+    """
+    query = select(
+        Trade.asset_class,
+        func.sum(Trade.quantity),
+        func.avg(Trade.price),
+        func.count(Trade.id)
+    ).group_by(Trade.asset_class)
+    if cutoff:
+        query = query.where(Trade.timestamp <= cutoff)
+    return pd.DataFrame(db.execute(query).all(), columns=TRADE_TOTAL_COLUMNS)
+
 def check_quantity_discrepancy(
     asset_class: str,
     position_quantity: float,
@@ -91,63 +262,985 @@ def check_price_discrepancy(
         }
     return None
 
-def run_reconciliation(db: Session) -> ReconciliationLog:
+def fold_new_trades(db: Session) -> int:
+    """
+    fold the trades booked since the watermark into the running aggregates
+    new trades are found by row id above the watermark and summed per asset
+    class in the database; nothing is committed, so the aggregates and the
+    watermark only move together with the caller's transaction. trades are
+    reconciled whatever their status, so status changes never alter the totals
+    args:
+        db (Session): database session
+    returns:
+        int: number of trades folded in
+    """
+    watermark = db.query(ReconciliationWatermark).filter(
+        ReconciliationWatermark.name == AGGREGATE_WATERMARK
+    ).first()
+    if watermark is None:
+        # read before the trades, so a change made while folding still shows as stale
+        watermark = ReconciliationWatermark(
+            name=AGGREGATE_WATERMARK, max_trade_id=0, trade_count=0, trade_generation=trade_generation(db)
+        )
+        db.add(watermark)
+
+    rows = db.execute(
+        select(
+            Trade.asset_class,
+            func.sum(Trade.quantity),
+            func.sum(Trade.price),
+            func.sum(Trade.quantity * Trade.price),
+            func.count(Trade.id),
+            func.max(Trade.id),
+            func.max(Trade.timestamp)
+        ).where(Trade.id > watermark.max_trade_id).group_by(Trade.asset_class)
+    ).all()
+    if not rows:
+        return 0
+
+    aggregates = {
+        aggregate.asset_class: aggregate
+        for aggregate in db.query(ReconciliationAggregate).filter(
+            ReconciliationAggregate.asset_class.in_([row[0] for row in rows])
+        )
+    }
+    folded = 0
+    for asset_class, quantity_sum, price_sum, notional_sum, count, max_id, max_timestamp in rows:
+        aggregate = aggregates.get(asset_class)
+        if aggregate is None:
+            aggregate = ReconciliationAggregate(
+                asset_class=asset_class, quantity_sum=0.0, price_sum=0.0, notional_sum=0.0, trade_count=0
+            )
+            db.add(aggregate)
+        aggregate.quantity_sum += quantity_sum
+        aggregate.price_sum += price_sum
+        aggregate.notional_sum += notional_sum
+        aggregate.trade_count += count
+        folded += count
+        watermark.max_trade_id = max(watermark.max_trade_id, max_id)
+        if max_timestamp and (watermark.max_timestamp is None or max_timestamp > watermark.max_timestamp):
+            watermark.max_timestamp = max_timestamp
+    watermark.trade_count += folded
+    db.flush()
+    return folded
+
+def trade_generation(db: Session) -> int:
+    """
+    get how often booked trades were deleted or edited, see TradeChangeStamp
+    args:
+        db (Session): database session
+    returns:
+        int: current generation, 0 if trades never changed
+    """
+    return db.execute(select(TradeChangeStamp.generation).where(TradeChangeStamp.id == 1)).scalar() or 0
+
+def incremental_aggregates_stale(db: Session, watermark: ReconciliationWatermark) -> bool:
+    """
+    check whether the trades below the watermark are still the ones folded in
+    the watermark only sees trades above its row id, so deleted or edited
+    trades, and trades that reuse the ids of deleted ones as sqlite does
+    after a reset, would otherwise go unnoticed. every such change moves the
+    trade generation, which is one row lookup; rebuild=True refolds every
+    trade whatever the generation
+    args:
+        db (Session): database session
+        watermark (ReconciliationWatermark): watermark of the aggregates
+    returns:
+        bool: True if the aggregates no longer match the trades and need a rebuild
+    """
+    return watermark.trade_generation != trade_generation(db)
+
+def get_incremental_trade_totals(db: Session, rebuild: bool = False) -> pd.DataFrame:
+    """
+    get per asset class trade totals from the running aggregates
+    the aggregates are rebuilt on their own when trades they folded in were
+    deleted or replaced, see incremental_aggregates_stale
+    args:
+        db (Session): database session
+        rebuild (bool): drop the aggregates and watermark and fold every trade again
+    returns:
+        pd.DataFrame: per asset class totals shaped like aggregate_trades output
+    """
+    if not rebuild:
+        watermark = db.query(ReconciliationWatermark).filter(
+            ReconciliationWatermark.name == AGGREGATE_WATERMARK
+        ).first()
+        rebuild = watermark is not None and incremental_aggregates_stale(db, watermark)
+    if rebuild:
+        # fetch drops the deleted rows from the session, so the fold below
+        # adds fresh objects instead of reusing stale identities
+        db.query(ReconciliationAggregate).delete(synchronize_session="fetch")
+        db.query(ReconciliationWatermark).filter(
+            ReconciliationWatermark.name == AGGREGATE_WATERMARK
+        ).delete(synchronize_session="fetch")
+        db.flush()
+    fold_new_trades(db)
+    rows = db.query(
+        ReconciliationAggregate.asset_class,
+        ReconciliationAggregate.quantity_sum,
+        ReconciliationAggregate.price_sum,
+        ReconciliationAggregate.trade_count
+    ).filter(ReconciliationAggregate.trade_count > 0).all()
+    return pd.DataFrame(
+        [(asset_class, quantity, price / count, count) for asset_class, quantity, price, count in rows],
+        columns=TRADE_TOTAL_COLUMNS
+    )
+
+def aggregate_trades(trades_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    aggregate trades per asset class in one grouped pass
+    args:
+        trades_df (pd.DataFrame): trades with asset_class, quantity and price
+    returns:
+        pd.DataFrame: one row per asset class with trade_quantity (sum),
+        trade_price (mean) and trade_count
+    """
+    if trades_df.empty:
+        return pd.DataFrame(columns=TRADE_TOTAL_COLUMNS)
+    return trades_df.groupby('asset_class', sort=False).agg(
+        trade_quantity=('quantity', 'sum'),
+        trade_price=('price', 'mean'),
+        trade_count=('quantity', 'size')
+    ).reset_index()
+
+def compare_positions(merged: pd.DataFrame, key: Sequence[str] = DEFAULT_RECONCILIATION_KEY) -> Iterator[Tuple[int, Dict]]:
+    """
+    run the quantity and price checks over positions merged with trade totals
+    both checks run as column comparisons and records are only built for rows
+    that break, matching check_quantity_discrepancy / check_price_discrepancy
+    field for field with the key columns in front of the type
+    args:
+        merged (pd.DataFrame): positions left-merged with trade totals on key
+        key (Sequence[str]): key columns
+    returns:
+        Iterator[Tuple[int, Dict]]: row of merged and discrepancy, in row order
+        with the quantity break before the price break
+    """
+    has_trades = merged['trade_count'].notna().to_numpy()
+    position_quantity = merged['quantity'].to_numpy(dtype=float)
+    position_price = merged['price'].to_numpy(dtype=float)
+    trade_quantity = merged['trade_quantity'].to_numpy(dtype=float, na_value=0.0)
+    trade_price = merged['trade_price'].to_numpy(dtype=float, na_value=0.0)
+
+    quantity_difference = position_quantity - trade_quantity
+    price_difference = position_price - trade_price
+    quantity_breaks = np.abs(quantity_difference) > 0.01
+    price_breaks = (trade_quantity > 0) & (np.abs(price_difference) > 0.01)
+
+    key_values = [merged[column].tolist() for column in key]
+    for row in np.flatnonzero(quantity_breaks | price_breaks).tolist():
+        fields = {column: values[row] for column, values in zip(key, key_values)}
+        if quantity_breaks[row]:
+            yield row, {
+                **fields,
+                'type': 'quantity',
+                'position_value': float(position_quantity[row]),
+                # keys without trades report the integer 0, as the per row check did
+                'trade_value': float(trade_quantity[row]) if has_trades[row] else 0,
+                'difference': float(quantity_difference[row])
+            }
+        if price_breaks[row]:
+            yield row, {
+                **fields,
+                'type': 'price',
+                'position_value': float(position_price[row]),
+                'trade_value': float(trade_price[row]),
+                'difference': float(price_difference[row])
+            }
+
+def find_discrepancies(
+    positions_df: pd.DataFrame,
+    trade_totals: pd.DataFrame,
+    key: Sequence[str] = DEFAULT_RECONCILIATION_KEY
+) -> List[Dict]:
+    """
+    compare positions against aggregated trades
+    positions are merged with the per key totals and checked column-wise, see
+    compare_positions
+    args:
+        positions_df (pd.DataFrame): positions with the key columns, quantity and price
+        trade_totals (pd.DataFrame): output of aggregate_trades
+        key (Sequence[str]): key columns
+    returns:
+        List[Dict]: discrepancies found, in position order
+    """
+    merged = positions_df[[*key, 'quantity', 'price']].merge(trade_totals, on=list(key), how='left')
+    return [discrepancy for _, discrepancy in compare_positions(merged, key)]
+
+def iter_trade_total_chunks(
+    db: Session,
+    key: Sequence[str],
+    cutoff: Optional[datetime] = None,
+    chunk_size: int = RECONCILIATION_CHUNK_SIZE,
+    max_trade_id: Optional[int] = None
+) -> Iterator[pd.DataFrame]:
+    """
+    stream per key trade totals from a group by query in chunks
+    args:
+        db (Session): database session
+        key (Sequence[str]): key columns
+        cutoff (Optional[datetime]): only include trades booked at or before this time
+        chunk_size (int): number of keys per chunk
+        max_trade_id (Optional[int]): only include trades up to this row id
+    returns:
+        Iterator[pd.DataFrame]: per key totals with trade_quantity, trade_price and trade_count
+    """
+    columns = [RECONCILIATION_KEY_COLUMNS[column] for column in key]
+    query = select(
+        *columns,
+        func.sum(Trade.quantity),
+        func.avg(Trade.price),
+        func.count(Trade.id)
+    ).group_by(*columns)
+    if cutoff:
+        query = query.where(Trade.timestamp <= cutoff)
+    if max_trade_id is not None:
+        query = query.where(Trade.id <= max_trade_id)
+    result = db.execute(query, execution_options={"yield_per": chunk_size})
+    for partition in result.partitions():
+        yield pd.DataFrame(partition, columns=[*key, *TRADE_TOTAL_COLUMNS[1:]])
+
+def count_trade_keys(
+    db: Session,
+    key: Sequence[str],
+    cutoff: Optional[datetime] = None,
+    max_trade_id: Optional[int] = None
+) -> int:
+    """
+    count the distinct keys among trades
+    args:
+        db (Session): database session
+        key (Sequence[str]): key columns
+        cutoff (Optional[datetime]): only include trades booked at or before this time
+        max_trade_id (Optional[int]): only include trades up to this row id
+    returns:
+        int: number of distinct keys
+    """
+    keys = select(*[RECONCILIATION_KEY_COLUMNS[column] for column in key]).distinct()
+    if cutoff:
+        keys = keys.where(Trade.timestamp <= cutoff)
+    if max_trade_id is not None:
+        keys = keys.where(Trade.id <= max_trade_id)
+    return db.execute(select(func.count()).select_from(keys.subquery())).scalar_one()
+
+def count_positions(as_of: Optional[date] = None) -> int:
+    """
+    count the positions in the csv file without parsing it
+    args:
+        as_of (Optional[date]): count the snapshot of this business date
+    returns:
+        int: number of data lines in the positions file
+    raises:
+        FileNotFoundError: if positions file is not found
+    """
+    try:
+        with open(positions_path(as_of), 'rb') as positions_file:
+            return max(sum(1 for line in positions_file if line.strip()) - 1, 0)
+    except FileNotFoundError:
+        raise FileNotFoundError(f"positions snapshot for {as_of} not found" if as_of else "positions file not found")
+
+def spill_partitions(frame: pd.DataFrame, key: Sequence[str], partitions: int, directory: str, side: str) -> None:
+    """
+    append the rows of a frame to per partition spill files by key hash
+    args:
+        frame (pd.DataFrame): positions or trade totals
+        key (Sequence[str]): key columns
+        partitions (int): number of partitions
+        directory (str): spill directory
+        side (str): "positions" or "trades"
+    """
+    buckets = pd.util.hash_pandas_object(frame[list(key)], index=False).to_numpy() % partitions
+    for bucket, part in frame.groupby(buckets, sort=False):
+        with open(os.path.join(directory, f"{side}-{bucket}.pkl"), 'ab') as spill:
+            pickle.dump(part, spill, protocol=pickle.HIGHEST_PROTOCOL)
+
+def read_partition(directory: str, side: str, bucket: int) -> List[pd.DataFrame]:
+    """
+    read back the frames spilled to one partition
+    args:
+        directory (str): spill directory
+        side (str): "positions" or "trades"
+        bucket (int): partition number
+    returns:
+        List[pd.DataFrame]: frames in the order they were spilled
+    """
+    path = os.path.join(directory, f"{side}-{bucket}.pkl")
+    frames = []
+    if os.path.exists(path):
+        with open(path, 'rb') as spill:
+            while True:
+                try:
+                    frames.append(pickle.load(spill))
+                except EOFError:
+                    break
+    return frames
+
+def find_discrepancies_partitioned(
+    db: Session,
+    key: Sequence[str],
+    cutoff: Optional[datetime] = None,
+    chunk_size: int = RECONCILIATION_CHUNK_SIZE,
+    progress_callback: Optional[Callable[[float], None]] = None,
+    as_of: Optional[date] = None,
+    snapshot_id: Optional[int] = None,
+    max_trade_id: Optional[int] = None
+) -> List[Dict]:
+    """
+    reconcile positions against trades per composite key with a partitioned hash join
+    positions and per key trade totals are streamed in chunks and spilled to
+    temporary files by key hash, with enough partitions that each holds about
+    chunk_size keys; partitions are then joined one at a time, so memory is
+    bounded by the chunk size rather than the total number of keys. with a
+    single partition nothing is spilled
+    args:
+        db (Session): database session
+        key (Sequence[str]): key columns
+        cutoff (Optional[datetime]): only include trades booked at or before this time
+        chunk_size (int): number of keys held in memory at once
+        progress_callback (Optional[Callable[[float], None]]): called with the
+            fraction of partitions joined
+        as_of (Optional[date]): read the positions snapshot of this business date
+        snapshot_id (Optional[int]): read positions from this stored snapshot
+            instead of a file
+        max_trade_id (Optional[int]): only include trades up to this row id
+    returns:
+        List[Dict]: discrepancies found, in position order
+    raises:
+        FileNotFoundError: if positions file is not found
+        ValueError: if positions file is invalid
+    """
+    key = list(key)
+    position_count = count_position_snapshot(db, snapshot_id) if snapshot_id else count_positions(as_of)
+    partitions = max(1, math.ceil(max(position_count, count_trade_keys(db, key, cutoff, max_trade_id)) / chunk_size))
+
+    def join(positions_frames: List[pd.DataFrame], trade_frames: List[pd.DataFrame]) -> Iterator[Tuple[int, Dict]]:
+        if not positions_frames:
+            return
+        positions_df = pd.concat(positions_frames, ignore_index=True)
+        trade_totals = (
+            pd.concat(trade_frames, ignore_index=True) if trade_frames
+            else pd.DataFrame(columns=[*key, *TRADE_TOTAL_COLUMNS[1:]])
+        )
+        merged = positions_df[['position_row', *key, 'quantity', 'price']].merge(trade_totals, on=key, how='left')
+        rows = merged['position_row'].to_numpy()
+        for row, discrepancy in compare_positions(merged, key):
+            yield int(rows[row]), discrepancy
+
+    def numbered_positions() -> Iterator[pd.DataFrame]:
+        offset = 0
+        chunks = (
+            iter_position_snapshot_chunks(db, snapshot_id, key, chunk_size) if snapshot_id
+            else iter_position_chunks(chunk_size, key, as_of)
+        )
+        for chunk in chunks:
+            chunk = chunk.assign(position_row=np.arange(offset, offset + len(chunk)))
+            offset += len(chunk)
+            yield chunk
+
+    if partitions == 1:
+        found = list(join(list(numbered_positions()), list(iter_trade_total_chunks(db, key, cutoff, chunk_size, max_trade_id))))
+    else:
+        found = []
+        with tempfile.TemporaryDirectory(prefix="reconciliation-") as directory:
+            for chunk in numbered_positions():
+                spill_partitions(chunk, key, partitions, directory, "positions")
+            for chunk in iter_trade_total_chunks(db, key, cutoff, chunk_size, max_trade_id):
+                spill_partitions(chunk, key, partitions, directory, "trades")
+            for bucket in range(partitions):
+                found.extend(join(
+                    read_partition(directory, "positions", bucket),
+                    read_partition(directory, "trades", bucket)
+                ))
+                if progress_callback:
+                    progress_callback((bucket + 1) / partitions)
+        # restore position order, the sort is stable so quantity stays ahead of price
+        found.sort(key=lambda item: item[0])
+    return [discrepancy for _, discrepancy in found]
+
+def partition_ranges(positions_df: pd.DataFrame, column: str, partitions: int) -> List[Tuple[str, str]]:
+    """
+    split the values of a key column into contiguous ranges of about equal position counts
+    ranges rather than hashes let each worker select its trades with an index
+    range on the column instead of scanning every trade
+    args:
+        positions_df (pd.DataFrame): positions with the key column
+        column (str): key column to split on
+        partitions (int): maximum number of ranges
+    returns:
+        List[Tuple[str, str]]: first and last value of each range, in order
+    """
+    counts = positions_df[column].value_counts().sort_index()
+    values = counts.index.tolist()
+    bounds = np.searchsorted(
+        counts.cumsum().to_numpy(),
+        [len(positions_df) * part / partitions for part in range(1, partitions)],
+        side='left'
+    )
+    ranges = []
+    start = 0
+    for end in [*bounds.tolist(), len(values) - 1]:
+        if end >= start:
+            ranges.append((values[start], values[end]))
+            start = end + 1
+    return ranges
+
+def reconcile_partition(
+    database_url: str,
+    positions_df: pd.DataFrame,
+    key: Sequence[str],
+    value_range: Tuple[str, str],
+    cutoff: Optional[datetime] = None
+) -> List[Tuple[int, Dict]]:
+    """
+    reconcile one key partition, run in a worker process with its own connection
+    args:
+        database_url (str): url of the trades database
+        positions_df (pd.DataFrame): positions of the partition, with position_row
+        key (Sequence[str]): key columns
+        value_range (Tuple[str, str]): first and last value of the leading key column
+        cutoff (Optional[datetime]): only include trades booked at or before this time
+    returns:
+        List[Tuple[int, Dict]]: position row and discrepancy of every break
+    """
+    key = list(key)
+    engine = create_engine(database_url)
+    columns = [RECONCILIATION_KEY_COLUMNS[column] for column in key]
+    # the ranges follow python's code point order, which postgres only uses under the C collation
+    leading = columns[0].collate("C") if engine.dialect.name == "postgresql" else columns[0]
+    query = select(
+        *columns,
+        func.sum(Trade.quantity),
+        func.avg(Trade.price),
+        func.count(Trade.id)
+    ).where(leading.between(*value_range)).group_by(*columns)
+    if cutoff:
+        query = query.where(Trade.timestamp <= cutoff)
+    try:
+        with Session(engine) as db:
+            trade_totals = pd.DataFrame(db.execute(query).all(), columns=[*key, *TRADE_TOTAL_COLUMNS[1:]])
+    finally:
+        engine.dispose()
+    merged = positions_df[['position_row', *key, 'quantity', 'price']].merge(trade_totals, on=key, how='left')
+    rows = merged['position_row'].to_numpy()
+    return [(int(rows[row]), discrepancy) for row, discrepancy in compare_positions(merged, key)]
+
+def find_discrepancies_parallel(
+    db: Session,
+    key: Sequence[str],
+    cutoff: Optional[datetime] = None,
+    workers: int = RECONCILIATION_WORKERS,
+    progress_callback: Optional[Callable[[float], None]] = None,
+    as_of: Optional[date] = None,
+    snapshot_id: Optional[int] = None
+) -> List[Dict]:
+    """
+    reconcile key partitions in parallel worker processes
+    positions are split into one partition per worker by contiguous ranges of
+    the leading key column; each worker opens its own database connection,
+    aggregates only the trades in its range and compares them, and the
+    discrepancy lists are merged back into position order. only committed
+    trades are visible to the workers
+    args:
+        db (Session): database session, its url is handed to the workers
+        key (Sequence[str]): key columns, the first one is split into ranges
+        cutoff (Optional[datetime]): only include trades booked at or before this time
+        workers (int): number of worker processes
+        progress_callback (Optional[Callable[[float], None]]): called with the
+            fraction of partitions finished
+        as_of (Optional[date]): read the positions snapshot of this business date
+        snapshot_id (Optional[int]): read positions from this stored snapshot
+            instead of a file
+    returns:
+        List[Dict]: discrepancies found, in position order
+    raises:
+        FileNotFoundError: if positions file is not found
+        ValueError: if positions file is invalid
+    """
+    key = list(key)
+    if snapshot_id:
+        positions_df = read_position_snapshot(db, snapshot_id, key)
+    else:
+        positions_df = pd.concat(list(iter_position_chunks(RECONCILIATION_CHUNK_SIZE, key, as_of)), ignore_index=True)
+    positions_df['position_row'] = np.arange(len(positions_df))
+    database_url = db.get_bind().url.render_as_string(hide_password=False)
+
+    found = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(
+                reconcile_partition,
+                database_url,
+                positions_df[positions_df[key[0]].between(*value_range)],
+                key,
+                value_range,
+                cutoff
+            )
+            for value_range in partition_ranges(positions_df, key[0], workers)
+        ]
+        for finished, future in enumerate(as_completed(futures), 1):
+            found.extend(future.result())
+            if progress_callback:
+                progress_callback(finished / len(futures))
+    # restore position order, the sort is stable so quantity stays ahead of price
+    found.sort(key=lambda item: item[0])
+    return [discrepancy for _, discrepancy in found]
+
+def save_discrepancies(db: Session, reconciliation_log: ReconciliationLog, discrepancies: List[Dict]) -> None:
+    """
+    bulk insert the discrepancies of a run into reconciliation_discrepancies
+    args:
+        db (Session): database session, the log must already be flushed
+        reconciliation_log (ReconciliationLog): run that found the discrepancies
+        discrepancies (List[Dict]): discrepancy records
+    """
+    if not discrepancies:
+        return
+    db.execute(insert(ReconciliationDiscrepancy), [
+        {
+            'reconciliation_log_id': reconciliation_log.id,
+            'run_time': reconciliation_log.run_time,
+            'asset_class': discrepancy.get('asset_class'),
+            'trader': discrepancy.get('trader'),
+            'type': discrepancy['type'],
+            'position_value': discrepancy['position_value'],
+            'trade_value': discrepancy['trade_value'],
+            'difference': discrepancy['difference'],
+            # the checks report keys without trades with an integer 0
+            'no_trades': type(discrepancy['trade_value']) is int
+        }
+        for discrepancy in discrepancies
+    ])
+
+def migrate_legacy_discrepancies(db: Session) -> int:
+    """
+    copy the discrepancies of logs that only kept them as json into reconciliation_discrepancies
+    logs written before the discrepancies table stored their records in the
+    json column alone, so discrepancy queries did not see them. the json is
+    kept, it stays the log's own record; logs that already have rows are skipped
+    args:
+        db (Session): database session
+    returns:
+        int: number of logs migrated
+    raises:
+        ValueError: if the migration fails
+    """
+    has_rows = select(ReconciliationDiscrepancy.id).where(
+        ReconciliationDiscrepancy.reconciliation_log_id == ReconciliationLog.id
+    ).exists()
+    try:
+        legacy = db.execute(
+            select(ReconciliationLog).where(ReconciliationLog.discrepancies_json.is_not(None), ~has_rows)
+            .order_by(ReconciliationLog.id)
+        ).scalars().all()
+        for reconciliation_log in legacy:
+            save_discrepancies(db, reconciliation_log, json.loads(reconciliation_log.discrepancies_json))
+        db.commit()
+        return len(legacy)
+    except Exception as e:
+        db.rollback()
+        raise ValueError(f"error migrating legacy discrepancies: {str(e)}")
+
+def discrepancies_query(
+    asset_class: Optional[str] = None,
+    trader: Optional[str] = None,
+    discrepancy_type: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    reconciliation_log_id: Optional[int] = None,
+    skip: int = 0,
+    limit: int = 100,
+    columns: Optional[Sequence[Any]] = None
+) -> Select:
+    """
+    build the query for one page of discrepancies, newest run first
+    every filter is a seek on one of the reconciliation_discrepancies indexes
+    args:
+        asset_class (Optional[str]): filter by asset class
+        trader (Optional[str]): filter by trader name
+        discrepancy_type (Optional[str]): filter by type (quantity or price)
+        start (Optional[datetime]): only runs at or after this time
+        end (Optional[datetime]): only runs at or before this time
+        reconciliation_log_id (Optional[int]): only this run
+        skip (int): number of records to skip
+        limit (int): maximum number of records to return
+        columns (Optional[Sequence[Any]]): select only these columns
+    returns:
+        Select: discrepancies query
+    """
+    query = select(*columns) if columns else select(ReconciliationDiscrepancy)
+    if asset_class:
+        query = query.where(ReconciliationDiscrepancy.asset_class == asset_class)
+    if trader:
+        query = query.where(ReconciliationDiscrepancy.trader == trader)
+    if discrepancy_type:
+        query = query.where(ReconciliationDiscrepancy.type == discrepancy_type)
+    if start:
+        query = query.where(ReconciliationDiscrepancy.run_time >= start)
+    if end:
+        query = query.where(ReconciliationDiscrepancy.run_time <= end)
+    if reconciliation_log_id is not None:
+        query = query.where(ReconciliationDiscrepancy.reconciliation_log_id == reconciliation_log_id)
+    return query.order_by(
+        ReconciliationDiscrepancy.run_time.desc(), ReconciliationDiscrepancy.id.desc()
+    ).offset(skip).limit(limit)
+
+def fill_discrepancies_json(db: Session, rows: Sequence[Any]) -> List[Tuple]:
+    """
+    build the legacy discrepancies json for reconciliation log rows that have none stored
+    the discrepancies of every such row on the page are read with one query
+    args:
+        db (Session): database session
+        rows (Sequence[Any]): rows selected with id and discrepancies columns
+    returns:
+        List[Tuple]: the rows with their discrepancies json filled in
+    """
+    missing = [row.id for row in rows if row.discrepancies is None]
+    if not missing:
+        return [tuple(row) for row in rows]
+    records: Dict[int, List[Dict]] = {log_id: [] for log_id in missing}
+    for discrepancy in db.execute(
+        select(ReconciliationDiscrepancy)
+        .where(ReconciliationDiscrepancy.reconciliation_log_id.in_(missing))
+        .order_by(ReconciliationDiscrepancy.id)
+    ).scalars():
+        records[discrepancy.reconciliation_log_id].append(discrepancy.to_dict())
+    position = list(rows[0]._fields).index('discrepancies')
+    filled = []
+    for row in rows:
+        values = tuple(row)
+        if row.discrepancies is None:
+            values = values[:position] + (json.dumps(records[row.id]),) + values[position + 1:]
+        filled.append(values)
+    return filled
+
+def reconciliation_fingerprint(
+    db: Session,
+    cutoff: Optional[datetime],
+    key: Sequence[str],
+    as_of: Optional[date] = None,
+    snapshot_id: Optional[int] = None
+) -> Optional[str]:
+    """
+    fingerprint the inputs of a reconciliation run
+    the trades table is versioned by its highest row id and row count, which
+    change with every insert, and by its trade generation, which changes
+    with every delete or edit, so trades deleted and replaced by the same
+    number under reused ids are told apart; status changes do not move the
+    generation because the trade totals do not depend on status
+    args:
+        db (Session): database session
+        cutoff (Optional[datetime]): only trades booked at or before this time
+        key (Sequence[str]): key columns
+        as_of (Optional[date]): business date whose positions snapshot is reconciled
+        snapshot_id (Optional[int]): stored positions snapshot reconciled, snapshots never change
+    returns:
+        Optional[str]: sha256 fingerprint, None if the positions file cannot be identified
+    """
+    try:
+        positions = f"snapshot:{snapshot_id}" if snapshot_id else positions_fingerprint(positions_path(as_of))
+    except OSError:
+        return None
+    max_trade_id, trade_count = db.execute(select(func.max(Trade.id), func.count(Trade.id))).one()
+    inputs = json.dumps({
+        'positions': positions,
+        'max_trade_id': max_trade_id,
+        'trade_count': trade_count,
+        'trade_generation': trade_generation(db),
+        'cutoff': cutoff.isoformat() if cutoff else None,
+        'as_of': as_of.isoformat() if as_of else None,
+        'key': list(key)
+    }, sort_keys=True)
+    return hashlib.sha256(inputs.encode()).hexdigest()
+
+def get_cached_reconciliation(db: Session, fingerprint: str) -> Optional[ReconciliationLog]:
+    """
+    get the previous run if it saw the same inputs
+    args:
+        db (Session): database session
+        fingerprint (str): fingerprint of the current inputs
+    returns:
+        Optional[ReconciliationLog]: latest run, None if its inputs differ or were not recorded
+    """
+    latest = select(func.max(ReconciliationLog.id)).scalar_subquery()
+    previous = db.execute(
+        select(ReconciliationFingerprint).where(ReconciliationFingerprint.reconciliation_log_id == latest)
+    ).scalars().first()
+    if previous is None or previous.fingerprint != fingerprint:
+        return None
+    return db.get(ReconciliationLog, previous.source_log_id or previous.reconciliation_log_id)
+
+def reconciliation_scope(as_of: Optional[date] = None) -> str:
+    """
+    describe what a run reconciled, for its summary
+    args:
+        as_of (Optional[date]): business date the run reconciled
+    returns:
+        str: "reconciliation", or "reconciliation as of <date>"
+    """
+    return f"reconciliation as of {as_of.isoformat()}" if as_of else "reconciliation"
+
+def copy_reconciliation(db: Session, source: ReconciliationLog, as_of: Optional[date] = None) -> ReconciliationLog:
+    """
+    log a run that reuses the result of an earlier one
+    the discrepancies are copied inside the database, they are not read back
+    args:
+        db (Session): database session
+        source (ReconciliationLog): run whose result is reused
+        as_of (Optional[date]): business date the run reconciled
+    returns:
+        ReconciliationLog: new run, flushed but not committed
+    """
+    run_time = datetime.now().replace(microsecond=0)
+    count = db.execute(
+        select(func.count(ReconciliationDiscrepancy.id))
+        .where(ReconciliationDiscrepancy.reconciliation_log_id == source.id)
+    ).scalar()
+    if source.discrepancies_json is not None:
+        count = len(json.loads(source.discrepancies_json))
+    reconciliation_log = ReconciliationLog(
+        run_time=run_time,
+        status=source.status,
+        summary=(
+            f"{reconciliation_scope(as_of)} completed with status {source.status}. found {count} discrepancies. "
+            f"served from cache of run {source.id}, positions and trades are unchanged."
+        ),
+        discrepancies_json=source.discrepancies_json
+    )
+    db.add(reconciliation_log)
+    db.flush()
+    copied = [
+        ReconciliationDiscrepancy.asset_class,
+        ReconciliationDiscrepancy.trader,
+        ReconciliationDiscrepancy.type,
+        ReconciliationDiscrepancy.position_value,
+        ReconciliationDiscrepancy.trade_value,
+        ReconciliationDiscrepancy.difference,
+        ReconciliationDiscrepancy.no_trades
+    ]
+    db.execute(insert(ReconciliationDiscrepancy).from_select(
+        ['reconciliation_log_id', 'run_time'] + [column.key for column in copied],
+        select(literal(reconciliation_log.id), literal(run_time), *copied)
+        .where(ReconciliationDiscrepancy.reconciliation_log_id == source.id)
+        .order_by(ReconciliationDiscrepancy.id)
+    ))
+    return reconciliation_log
+
+def reconciliation_log_rows(db: Session, rows: Sequence[Any]) -> List[Tuple]:
+    """
+    complete reconciliation log rows for the list endpoints
+    fills the discrepancies json and appends the list of stage profiles, both
+    read for the whole page with one query each
+    args:
+        db (Session): database session
+        rows (Sequence[Any]): rows selected with RECONCILIATION_LOG_COLUMNS
+    returns:
+        List[Tuple]: the rows followed by their stages
+    """
+    stages: Dict[int, List[Dict]] = {row.id: [] for row in rows}
+    if not stages:
+        return []
+    for stage in db.execute(
+        select(ReconciliationRunStage)
+        .where(ReconciliationRunStage.reconciliation_log_id.in_(list(stages)))
+        .order_by(ReconciliationRunStage.id)
+    ).scalars():
+        stages[stage.reconciliation_log_id].append({
+            'stage': stage.stage,
+            'seconds': stage.seconds,
+            'rows': stage.rows,
+            'peak_memory_bytes': stage.peak_memory_bytes
+        })
+    return [
+        values + (stages[row.id],)
+        for row, values in zip(rows, fill_discrepancies_json(db, rows))
+    ]
+
+def save_run_stages(db: Session, reconciliation_log: ReconciliationLog, profiler: StageProfiler) -> ReconciliationLog:
+    """
+    store the stage profiles of a committed run
+    written in a second transaction so the save stage can include its own commit
+    args:
+        db (Session): database session
+        reconciliation_log (ReconciliationLog): committed run
+        profiler (StageProfiler): profiler that timed the run
+    returns:
+        ReconciliationLog: the run, refreshed
+    """
+    db.execute(insert(ReconciliationRunStage), [
+        {'reconciliation_log_id': reconciliation_log.id, **stage} for stage in profiler.stages
+    ])
+    db.commit()
+    db.refresh(reconciliation_log)
+    return reconciliation_log
+
+def log_reconciliation(db: Session, discrepancies: List[Dict], as_of: Optional[date] = None) -> ReconciliationLog:
+    """
+    add the log of a finished run and its discrepancies, without committing
+    args:
+        db (Session): database session
+        discrepancies (List[Dict]): discrepancies found
+        as_of (Optional[date]): business date the run reconciled
+    returns:
+        ReconciliationLog: flushed reconciliation log
+    """
+    status = ReconciliationStatus.SUCCESS if not discrepancies else ReconciliationStatus.PARTIAL
+    summary = f"{reconciliation_scope(as_of)} completed with status {status}. found {len(discrepancies)} discrepancies."
+    
+    reconciliation_log = ReconciliationLog(
+        run_time=datetime.now().replace(microsecond=0),
+        status=status,
+        summary=summary
+    )
+    
+    db.add(reconciliation_log)
+    db.flush()
+    save_discrepancies(db, reconciliation_log, discrepancies)
+    return reconciliation_log
+
+def run_reconciliation(
+    db: Session,
+    cutoff: Optional[datetime] = None,
+    aggregate_in_sql: Optional[bool] = None,
+    incremental: Optional[bool] = None,
+    rebuild: bool = False,
+    key: Optional[Union[str, Sequence[str]]] = None,
+    chunk_size: Optional[int] = None,
+    workers: Optional[int] = None,
+    progress_callback: Optional[Callable[[str, float], None]] = None,
+    use_cache: Optional[bool] = None,
+    as_of: Optional[date] = None,
+    snapshot_id: Optional[int] = None,
+    profile_memory: Optional[bool] = None
+) -> ReconciliationLog:
     """
     run reconciliation between positions and trades
+    when the positions file, the trades table and the run parameters match
+    the previous run, its result is logged again without re-reading trades
+    wall time and rows of each stage, and peak memory when traced, are stored
+    with the run in reconciliation_run_stages
     args:
         db (Session): database session
+        cutoff (Optional[datetime]): only reconcile trades booked at or before this time
+        aggregate_in_sql (Optional[bool]): aggregate trades with a group by query
+            instead of in pandas, defaults to RECONCILIATION_SQL_AGGREGATES
+        incremental (Optional[bool]): fold only new trades into the persisted
+            aggregates, defaults to RECONCILIATION_INCREMENTAL; runs with a
+            cutoff or pandas aggregation always aggregate every trade
+        rebuild (bool): rebuild the persisted aggregates from every trade first
+        key (Optional[Union[str, Sequence[str]]]): columns to reconcile by, e.g.
+            "trader,asset_class", defaults to RECONCILIATION_KEY; keys other than
+            asset_class alone run as a partitioned join
+        chunk_size (Optional[int]): keys held in memory at once by the partitioned
+            join, defaults to RECONCILIATION_CHUNK_SIZE; passing it also sends
+            asset_class reconciliation through the join
+        workers (Optional[int]): reconcile key partitions in this many worker
+            processes, defaults to RECONCILIATION_WORKERS; 1 runs in-process
+        progress_callback (Optional[Callable[[str, float], None]]): called with
+            the current stage and the overall fraction done
+        use_cache (Optional[bool]): reuse the previous run's result when the
+            inputs are unchanged, defaults to RECONCILIATION_CACHE; rebuild runs
+            always recompute
+        as_of (Optional[date]): reconcile a past business date, the positions
+            snapshot of the date against the trades booked up to its end;
+            excludes cutoff. the latest stored snapshot of the date is read
+            when there is one, else the date's POSITIONS_SNAPSHOT_FILE
+        snapshot_id (Optional[int]): read positions from this stored snapshot
+            with an indexed query instead of the positions file
+        profile_memory (Optional[bool]): trace peak memory of each stage,
+            defaults to PROFILE_MEMORY
     returns:
         ReconciliationLog: reconciliation results
     raises:
-        ValueError: if reconciliation fails
+        ValueError: if reconciliation fails or both cutoff and as_of are given
     """
+    if aggregate_in_sql is None:
+        aggregate_in_sql = RECONCILIATION_SQL_AGGREGATES
+    if incremental is None:
+        incremental = RECONCILIATION_INCREMENTAL
+    if use_cache is None:
+        use_cache = RECONCILIATION_CACHE and not rebuild
+
+    def report(stage: str, fraction: float) -> None:
+        if progress_callback:
+            progress_callback(stage, fraction)
+
+    def report_partitions(fraction: float) -> None:
+        report("comparing", 0.1 + 0.8 * fraction)
+
     try:
-        # read positions and trades
-        positions_df = read_positions_from_csv()
-        trades_df = get_trades_dataframe(db)
-        
-        discrepancies = []
-        
-        # compare positions with trades
-        for _, position in positions_df.iterrows():
-            asset_class = position['asset_class']
-            position_quantity = float(position['quantity'])
-            position_price = float(position['price'])
-            
-            # get trades for this asset class
-            asset_trades = trades_df[trades_df['asset_class'] == asset_class]
-            trade_quantity = float(asset_trades['quantity'].sum()) if not asset_trades.empty else 0
-            trade_price = float(asset_trades['price'].mean()) if not asset_trades.empty else 0
-            
-            # check for discrepancies
-            quantity_discrepancy = check_quantity_discrepancy(
-                asset_class, position_quantity, trade_quantity
-            )
-            if quantity_discrepancy:
-                discrepancies.append(quantity_discrepancy)
+        if as_of and cutoff:
+            raise ValueError("pass either cutoff or as_of, not both")
+        if as_of:
+            cutoff = as_of_cutoff(as_of)
+            if snapshot_id is None:
+                snapshot_id = latest_position_snapshot_ids(db, [as_of]).get(as_of)
+        key = parse_reconciliation_key(RECONCILIATION_KEY if key is None else key)
+        workers = RECONCILIATION_WORKERS if workers is None else workers
+        with StageProfiler(PROFILE_MEMORY if profile_memory is None else profile_memory) as profiler:
+            report("loading", 0.0)
+            fingerprint = None
+            if use_cache:
+                with profiler.stage("fingerprint"):
+                    fingerprint = reconciliation_fingerprint(db, cutoff, key, as_of, snapshot_id)
+                    cached = get_cached_reconciliation(db, fingerprint) if fingerprint else None
+                if cached is not None:
+                    report("saving", 0.9)
+                    with profiler.stage("save"):
+                        reconciliation_log = copy_reconciliation(db, cached, as_of)
+                        db.add(ReconciliationFingerprint(
+                            reconciliation_log_id=reconciliation_log.id,
+                            fingerprint=fingerprint,
+                            source_log_id=cached.id
+                        ))
+                        db.commit()
+                    return save_run_stages(db, reconciliation_log, profiler)
+
+            if workers > 1:
+                # reconcile key partitions in worker processes
+                with profiler.stage("parallel_join"):
+                    discrepancies = find_discrepancies_parallel(
+                        db, key, cutoff, workers, report_partitions, as_of, snapshot_id
+                    )
+            elif key != DEFAULT_RECONCILIATION_KEY or chunk_size:
+                # stream positions and per key trade totals through a partitioned join
+                with profiler.stage("partitioned_join"):
+                    discrepancies = find_discrepancies_partitioned(
+                        db, key, cutoff, chunk_size or RECONCILIATION_CHUNK_SIZE, report_partitions, as_of, snapshot_id
+                    )
+            else:
+                # read positions and the per asset class trade totals
+                with profiler.stage("positions") as stage:
+                    if snapshot_id:
+                        positions_df = read_position_snapshot(db, snapshot_id, key)
+                    else:
+                        positions_df = read_positions_from_csv(as_of)
+                    stage['rows'] = len(positions_df)
+                report("aggregating", 0.1)
+                with profiler.stage("trades") as stage:
+                    if aggregate_in_sql and cutoff is None and (incremental or rebuild):
+                        trade_totals = get_incremental_trade_totals(db, rebuild)
+                    elif aggregate_in_sql:
+                        trade_totals = get_trade_totals(db, cutoff)
+                    else:
+                        trade_totals = aggregate_trades(get_trades_dataframe(db, cutoff))
+                    # trades covered by the totals
+                    stage['rows'] = int(trade_totals['trade_count'].sum())
+                
+                # compare positions with the trade totals
+                report("comparing", 0.6)
+                with profiler.stage("compare") as stage:
+                    discrepancies = find_discrepancies(positions_df, trade_totals)
+                    stage['rows'] = len(positions_df)
             
-            price_discrepancy = check_price_discrepancy(
-                asset_class, position_price, trade_price, trade_quantity
-            )
-            if price_discrepancy:
-                discrepancies.append(price_discrepancy)
-        
-        # create reconciliation log
-        status = ReconciliationStatus.SUCCESS if not discrepancies else ReconciliationStatus.PARTIAL
-        summary = f"reconciliation completed with status {status}. found {len(discrepancies)} discrepancies."
-        
-        reconciliation_log = ReconciliationLog(
-            run_time=datetime.now().replace(microsecond=0),
-            status=status,
-            summary=summary,
-            discrepancies=json.dumps(discrepancies)
-        )
-        
-        db.add(reconciliation_log)
-        db.commit()
-        db.refresh(reconciliation_log)
+            report("saving", 0.9)
+            with profiler.stage("save") as stage:
+                reconciliation_log = log_reconciliation(db, discrepancies, as_of)
+                if fingerprint:
+                    db.add(ReconciliationFingerprint(reconciliation_log_id=reconciliation_log.id, fingerprint=fingerprint))
+                db.commit()
+                stage['rows'] = len(discrepancies)
         
-        return reconciliation_log
+        return save_run_stages(db, reconciliation_log, profiler)
         
     except Exception as e:
         db.rollback()
@@ -1,15 +1,205 @@
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
+from sqlalchemy import or_, text, update
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from app.services.reconciliation_service import run_reconciliation
-from app.models.models import OperationalLog
-from typing import Optional
+from app.models.models import OperationalLog, SchedulerLease
+from typing import Any, Callable, Optional
+import hashlib
 import os
-from datetime import datetime
+import socket
+import threading
+import uuid
+from datetime import datetime, timedelta, timezone
+
+# seconds a scheduler lease lasts without renewal, a leader that dies without
+# releasing it is replaced after at most this long (databases without advisory locks)
+SCHEDULER_LEASE_SECONDS = int(os.getenv("SCHEDULER_LEASE_SECONDS", "30"))
+
+# seconds between leadership renewals and takeover attempts of every process
+SCHEDULER_HEARTBEAT_SECONDS = int(os.getenv("SCHEDULER_HEARTBEAT_SECONDS", "10"))
+
+# name of the scheduler lease, also hashed into the postgres advisory lock key
+SCHEDULER_LEASE_NAME = "scheduler"
 
 # create scheduler instance
 scheduler = BackgroundScheduler()
 
+class SchedulerLeader:
+    """
+    elects one process, e.g. among uvicorn workers, to run the scheduled jobs
+    every process runs the scheduler and calls refresh on a heartbeat; only
+    the leader runs jobs. on postgres the leader holds a session advisory lock
+    on a connection of its own, which the server releases as soon as that
+    connection drops, so another process takes over on its next heartbeat.
+    elsewhere the leader holds a lease row it renews on every heartbeat, and
+    another process takes over once the lease has run out
+    """
+
+    def __init__(
+        self,
+        bind: Engine,
+        name: str = SCHEDULER_LEASE_NAME,
+        lease_seconds: int = SCHEDULER_LEASE_SECONDS
+    ):
+        """
+        args:
+            bind (Engine): engine of the database the processes share
+            name (str): what leadership is held on
+            lease_seconds (int): how long a lease lasts without renewal
+        """
+        self.bind = bind
+        self.name = name
+        self.lease_seconds = lease_seconds
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.is_leader = False
+        self._connection: Optional[Connection] = None
+        self._lock = threading.Lock()
+
+    @property
+    def lock_key(self) -> int:
+        """
+        postgres advisory lock key of the name, a signed 64 bit integer
+        """
+        digest = hashlib.blake2b(self.name.encode(), digest_size=8).digest()
+        return int.from_bytes(digest, "big", signed=True)
+
+    def refresh(self) -> bool:
+        """
+        renew leadership, or try to take it over if no live process holds it
+        returns:
+            bool: whether this process leads
+        """
+        with self._lock:
+            was_leader = self.is_leader
+            try:
+                if self.bind.dialect.name == "postgresql":
+                    self.is_leader = self._refresh_advisory_lock()
+                else:
+                    self.is_leader = self._refresh_lease()
+            except Exception:
+                # an unreachable database cannot confirm leadership
+                self._drop_connection()
+                self.is_leader = False
+            if self.is_leader != was_leader:
+                self._log_transition()
+            return self.is_leader
+
+    def release(self) -> None:
+        """
+        give leadership up so another process takes over on its next heartbeat
+        """
+        with self._lock:
+            if not self.is_leader:
+                return
+            try:
+                if self._connection is not None:
+                    self._connection.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": self.lock_key})
+                    self._connection.commit()
+                else:
+                    with Session(bind=self.bind) as db:
+                        db.query(SchedulerLease).filter(
+                            SchedulerLease.name == self.name, SchedulerLease.owner == self.owner
+                        ).delete(synchronize_session=False)
+                        db.commit()
+            except Exception:
+                # an expired lease or dropped connection frees leadership anyway
+                pass
+            finally:
+                self._drop_connection()
+                self.is_leader = False
+
+    def _refresh_advisory_lock(self) -> bool:
+        if self._connection is not None:
+            # the lock lives as long as the connection holding it
+            self._connection.execute(text("SELECT 1"))
+            self._connection.commit()
+            return True
+        connection = self.bind.connect()
+        try:
+            acquired = connection.execute(
+                text("SELECT pg_try_advisory_lock(:key)"), {"key": self.lock_key}
+            ).scalar()
+            connection.commit()
+        except Exception:
+            # the lock may have been taken before the error
+            connection.invalidate()
+            raise
+        if not acquired:
+            connection.close()
+            return False
+        self._connection = connection
+        return True
+
+    def _refresh_lease(self) -> bool:
+        # utc, so processes with different local time zones agree on expiry
+        now = datetime.now(timezone.utc)
+        expires_at = now + timedelta(seconds=self.lease_seconds)
+        with Session(bind=self.bind) as db:
+            # renew our own lease or take over an expired one in one statement
+            renewed = db.execute(
+                update(SchedulerLease)
+                .where(
+                    SchedulerLease.name == self.name,
+                    or_(SchedulerLease.owner == self.owner, SchedulerLease.expires_at < now)
+                )
+                .values(owner=self.owner, expires_at=expires_at)
+            ).rowcount
+            if renewed:
+                db.commit()
+                return True
+            db.add(SchedulerLease(name=self.name, owner=self.owner, expires_at=expires_at))
+            try:
+                db.commit()
+            except IntegrityError:
+                # another process holds a live lease
+                db.rollback()
+                return False
+            return True
+
+    def _drop_connection(self) -> None:
+        # invalidate rather than close: a closed connection goes back to the
+        # pool, which only rolls back, and the session level advisory lock
+        # would stay held by an idle pooled connection
+        if self._connection is not None:
+            try:
+                self._connection.invalidate()
+            except Exception:
+                pass
+            self._connection = None
+
+    def _log_transition(self) -> None:
+        message = (
+            f"scheduler leadership taken by {self.owner}" if self.is_leader
+            else f"scheduler leadership lost by {self.owner}"
+        )
+        try:
+            with Session(bind=self.bind) as db:
+                log_operational_message(db, message)
+        except ValueError:
+            pass
+
+# leader election of this process, set by start_scheduler
+scheduler_leader: Optional[SchedulerLeader] = None
+
+def run_as_leader(leader: SchedulerLeader, job: Callable[..., Any], *args: Any) -> Any:
+    """
+    run a scheduled job if this process leads the scheduler
+    leadership is confirmed right before the job runs, so a process whose
+    lease ran out while it was paused does not run it next to the new leader
+    args:
+        leader (SchedulerLeader): leader election of this process
+        job (Callable[..., Any]): scheduled job
+        *args (Any): job arguments
+    returns:
+        Any: result of the job, None if another process leads
+    """
+    if not leader.refresh():
+        return None
+    return job(*args)
+
 def log_operational_message(db: Session, message: str) -> OperationalLog:
     """
     log an operational message to the database
@@ -42,9 +232,9 @@ def schedule_reconciliation_job(db: Session) -> None:
     try:
         # schedule job for 6pm daily
         scheduler.add_job(
-            run_scheduled_reconciliation,
+            run_as_leader,
             trigger=CronTrigger(hour=18, minute=0),
-            args=[db],
+            args=[scheduler_leader or SchedulerLeader(db.get_bind()), run_scheduled_reconciliation, db],
             id='daily_reconciliation',
             replace_existing=True
         )
@@ -86,6 +276,8 @@ def run_scheduled_reconciliation(db: Session) -> Optional[OperationalLog]:
 def start_scheduler(db: Session) -> BackgroundScheduler:
     """
     start the scheduler and schedule all jobs
+    every process starts it; jobs only run in the one elected leader, see
+    SchedulerLeader, and the others take over if the leader dies
     args:
         db (Session): database session
     returns:
@@ -93,16 +285,29 @@ def start_scheduler(db: Session) -> BackgroundScheduler:
     raises:
         ValueError: if scheduler fails to start
     """
+    global scheduler_leader
     try:
         if not scheduler.running:
+            scheduler_leader = SchedulerLeader(db.get_bind())
+            scheduler_leader.refresh()
+
+            # renew leadership, or take it over from a dead leader
+            scheduler.add_job(
+                scheduler_leader.refresh,
+                'interval',
+                seconds=SCHEDULER_HEARTBEAT_SECONDS,
+                id='scheduler_leader_heartbeat',
+                replace_existing=True
+            )
+
             # schedule daily reconciliation
             scheduler.add_job(
-                run_scheduled_reconciliation,
+                run_as_leader,
                 'cron',
                 minute=0,
                 hour=18,
                 id='daily_reconciliation',
-                args=[db]
+                args=[scheduler_leader, run_scheduled_reconciliation, db]
             )
             
             # start scheduler
@@ -116,12 +321,14 @@ def start_scheduler(db: Session) -> BackgroundScheduler:
 
 def stop_scheduler() -> None:
     """
-    stop the scheduler
+    stop the scheduler and give up leadership
     raises:
         ValueError: if scheduler fails to stop
     """
     try:
         if scheduler.running:
             scheduler.shutdown()
+        if scheduler_leader is not None:
+            scheduler_leader.release()
     except Exception as e:
         raise ValueError(f"error stopping scheduler: {str(e)}") 
\ No newline at end of file
@@ -0,0 +1,364 @@
+from sqlalchemy import func, or_, select
+from sqlalchemy.orm import Session
+from app.models.models import Trade
+from app.services.reconciliation_service import (
+    RECONCILIATION_KEY,
+    find_discrepancies_partitioned,
+    parse_reconciliation_key,
+    positions_path,
+    read_positions_from_csv
+)
+from app.services.positions_service import positions_fingerprint
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+from datetime import datetime
+import math
+import os
+import threading
+
+# keep per key trade totals in memory and re-check positions as trades arrive
+STREAMING_RECONCILIATION_ENABLED = os.getenv("STREAMING_RECONCILIATION", "false").lower() in ("1", "true", "yes")
+
+# skipped trade ids re-checked on catch-up, for trades that commit after a higher id
+STREAMING_MAX_GAPS = int(os.getenv("STREAMING_RECONCILIATION_MAX_GAPS", "1000"))
+
+Key = Tuple[str, ...]
+
+class StreamingReconciler:
+    """
+    continuously reconciled break set over a positions snapshot
+    per key trade totals (quantity sum, price sum, count) are seeded from the
+    database and then updated from trade events; every event re-checks the
+    positions of its key with the same rules as compare_positions, so the
+    break set matches a full run over the same trades. trades written without
+    an event (bulk and columnar loads) are folded in by catch_up, which scans
+    ids above the highest one seen plus ids skipped so far, so trades that
+    commit after a higher id are still counted
+    attributes:
+        key: key columns reconciled by
+    """
+
+    def __init__(self) -> None:
+        self.key: Key = ()
+        self._lock = threading.RLock()
+        self._session_factory: Optional[Callable[[], Session]] = None
+        self._running = False
+        self._reset()
+
+    def _reset(self) -> None:
+        self._positions: List[Tuple[Dict[str, Any], float, float]] = []
+        self._rows_by_key: Dict[Key, List[int]] = {}
+        self._totals: Dict[Key, List[float]] = {}
+        self._breaks: Dict[int, List[Dict]] = {}
+        self._max_trade_id = 0
+        self._gaps: Dict[int, None] = {}
+        self._positions_fingerprint: Optional[str] = None
+        self._events = 0
+        self._loaded_at: Optional[datetime] = None
+        self._updated_at: Optional[datetime] = None
+        self.last_error: Optional[str] = None
+
+    @property
+    def running(self) -> bool:
+        """
+        whether trade events are being reconciled
+        """
+        return self._running
+
+    def start(self, session_factory: Callable[[], Session], key: Optional[str] = None) -> None:
+        """
+        load the positions snapshot and seed the trade totals, replacing any earlier state
+        args:
+            session_factory (Callable[[], Session]): factory for catch-up sessions
+            key (Optional[str]): comma separated key columns, defaults to RECONCILIATION_KEY
+        raises:
+            FileNotFoundError: if positions file is not found
+            ValueError: if the key or positions file is invalid
+        """
+        key = parse_reconciliation_key(RECONCILIATION_KEY if key is None else key)
+        positions_df = read_positions_from_csv()
+        missing = [column for column in key if column not in positions_df.columns]
+        if missing:
+            raise ValueError(f"positions file has no {', '.join(missing)} column")
+        db = session_factory()
+        try:
+            with self._lock:
+                self._reset()
+                self.key = key
+                self._session_factory = session_factory
+                self._load_positions(positions_df)
+                self._seed_totals(db)
+                for row in range(len(self._positions)):
+                    self._check(row)
+                self._loaded_at = self._updated_at = datetime.now()
+                self._running = True
+        finally:
+            db.close()
+
+    def stop(self) -> None:
+        """
+        stop reconciling trade events and drop the state
+        """
+        with self._lock:
+            self._running = False
+            self._reset()
+
+    def _load_positions(self, positions_df: Any) -> None:
+        try:
+            self._positions_fingerprint = positions_fingerprint(positions_path())
+        except OSError:
+            self._positions_fingerprint = None
+        key_values = [positions_df[column].tolist() for column in self.key]
+        quantities = positions_df['quantity'].astype(float).tolist()
+        prices = positions_df['price'].astype(float).tolist()
+        for row, (quantity, price) in enumerate(zip(quantities, prices)):
+            fields = {column: values[row] for column, values in zip(self.key, key_values)}
+            self._positions.append((fields, quantity, price))
+            self._rows_by_key.setdefault(tuple(fields.values()), []).append(row)
+
+    def _seed_totals(self, db: Session) -> None:
+        max_trade_id = db.execute(select(func.max(Trade.id))).scalar() or 0
+        columns = [getattr(Trade, column) for column in self.key]
+        totals = db.execute(
+            select(*columns, func.sum(Trade.quantity), func.sum(Trade.price), func.count(Trade.id))
+            .where(Trade.id <= max_trade_id)
+            .group_by(*columns)
+        ).all()
+        for *key, quantity, price, count in totals:
+            self._totals[tuple(key)] = [float(quantity), float(price), count]
+        self._max_trade_id = max_trade_id
+
+    def _check(self, row: int) -> None:
+        # the per row form of compare_positions
+        fields, position_quantity, position_price = self._positions[row]
+        totals = self._totals.get(tuple(fields.values()))
+        trade_quantity = totals[0] if totals else 0.0
+        trade_price = totals[1] / totals[2] if totals else 0.0
+        breaks = []
+        if abs(position_quantity - trade_quantity) > 0.01:
+            breaks.append({
+                **fields,
+                'type': 'quantity',
+                'position_value': position_quantity,
+                'trade_value': trade_quantity if totals else 0,
+                'difference': position_quantity - trade_quantity
+            })
+        if trade_quantity > 0 and abs(position_price - trade_price) > 0.01:
+            breaks.append({
+                **fields,
+                'type': 'price',
+                'position_value': position_price,
+                'trade_value': trade_price,
+                'difference': position_price - trade_price
+            })
+        if breaks:
+            self._breaks[row] = breaks
+        else:
+            self._breaks.pop(row, None)
+
+    def _apply(self, trade_id: int, key: Key, quantity: float, price: float) -> None:
+        totals = self._totals.setdefault(key, [0.0, 0.0, 0])
+        totals[0] += quantity
+        totals[1] += price
+        totals[2] += 1
+        if trade_id > self._max_trade_id:
+            for skipped in range(self._max_trade_id + 1, min(trade_id, self._max_trade_id + STREAMING_MAX_GAPS + 1)):
+                self._gaps[skipped] = None
+            self._max_trade_id = trade_id
+        else:
+            self._gaps.pop(trade_id, None)
+        while len(self._gaps) > STREAMING_MAX_GAPS:
+            del self._gaps[next(iter(self._gaps))]
+        for row in self._rows_by_key.get(key, ()):
+            self._check(row)
+        self._events += 1
+        self._updated_at = datetime.now()
+
+    def on_trades(self, trades: Iterable[Trade]) -> None:
+        """
+        fold newly committed trades into the totals and re-check their keys
+        a trade that does not directly follow the highest id seen triggers a
+        catch-up first, so trades written without an event are not missed
+        args:
+            trades (Iterable[Trade]): committed trades
+        """
+        if not self._running:
+            return
+        with self._lock:
+            for trade in sorted(trades, key=lambda trade: trade.id):
+                if trade.id > self._max_trade_id + 1 and self._session_factory:
+                    db = self._session_factory()
+                    try:
+                        self.catch_up(db)
+                    finally:
+                        db.close()
+                if trade.id > self._max_trade_id or trade.id in self._gaps:
+                    key = tuple(getattr(trade, column) for column in self.key)
+                    self._apply(trade.id, key, float(trade.quantity), float(trade.price))
+
+    def on_status_change(self, trade: Trade) -> None:
+        """
+        record a trade status change
+        reconciliation counts trades of every status, so a status change does
+        not move the totals; the key is re-checked and the event counted
+        args:
+            trade (Trade): updated trade
+        """
+        if not self._running:
+            return
+        with self._lock:
+            for row in self._rows_by_key.get(tuple(getattr(trade, column) for column in self.key), ()):
+                self._check(row)
+            self._events += 1
+            self._updated_at = datetime.now()
+
+    def catch_up(self, db: Session) -> int:
+        """
+        fold trades committed without an event
+        args:
+            db (Session): database session
+        returns:
+            int: number of trades folded in
+        """
+        if not self._running:
+            return 0
+        with self._lock:
+            condition = Trade.id > self._max_trade_id
+            if self._gaps:
+                condition = or_(condition, Trade.id.in_(list(self._gaps)))
+            columns = [getattr(Trade, column) for column in self.key]
+            trades = db.execute(
+                select(Trade.id, Trade.quantity, Trade.price, *columns).where(condition).order_by(Trade.id)
+            ).all()
+            for trade_id, quantity, price, *key in trades:
+                self._apply(trade_id, tuple(key), float(quantity), float(price))
+            return len(trades)
+
+    def breaks(self) -> List[Dict]:
+        """
+        get the current break set
+        returns:
+            List[Dict]: discrepancies in position order, like find_discrepancies
+        """
+        with self._lock:
+            return [record for row in sorted(self._breaks) for record in self._breaks[row]]
+
+    def state(self) -> Dict[str, Any]:
+        """
+        get the reconciler state with the current break set
+        returns:
+            Dict[str, Any]: running flag, key, snapshot, counters and breaks
+        """
+        with self._lock:
+            return {
+                'running': self._running,
+                'key': ",".join(self.key),
+                'positions': len(self._positions),
+                'positions_fingerprint': self._positions_fingerprint,
+                'max_trade_id': self._max_trade_id,
+                'trade_count': int(sum(totals[2] for totals in self._totals.values())),
+                'events': self._events,
+                'loaded_at': self._loaded_at,
+                'updated_at': self._updated_at,
+                'last_error': self.last_error,
+                'breaks': self.breaks()
+            }
+
+    def verify(self, db: Session) -> Dict[str, Any]:
+        """
+        check the break set against a full reconciliation of the same trades
+        the full side runs the partitioned join over the database, nothing is
+        logged. only the catch up and the copy of the break set hold the lock,
+        so trade writes are not held up by the full run, which is bounded to
+        the trades the copied break set had seen
+        args:
+            db (Session): database session
+        returns:
+            Dict[str, Any]: consistent flag, breaks only the full run found
+            (missing) and breaks only the stream holds (unexpected)
+        """
+        with self._lock:
+            self.catch_up(db)
+            max_trade_id = self._max_trade_id
+            streamed = self.breaks()
+        expected = find_discrepancies_partitioned(db, self.key, max_trade_id=max_trade_id)
+        missing = unmatched_breaks(expected, streamed, self.key)
+        unexpected = unmatched_breaks(streamed, expected, self.key)
+        return {
+            'consistent': not missing and not unexpected,
+            'checked_at': datetime.now(),
+            'breaks': len(streamed),
+            'missing': missing,
+            'unexpected': unexpected
+        }
+
+def unmatched_breaks(breaks: Sequence[Dict], others: Sequence[Dict], key: Key) -> List[Dict]:
+    """
+    get the breaks without an equal break in another set
+    values are compared with a relative tolerance, the two sides sum the same
+    trades in a different order
+    args:
+        breaks (Sequence[Dict]): breaks to look up
+        others (Sequence[Dict]): breaks to look them up in
+        key (Key): key columns
+    returns:
+        List[Dict]: breaks of the first set that the second lacks
+    """
+    def identity(record: Dict) -> Tuple:
+        return tuple(record.get(column) for column in key) + (record['type'],)
+
+    def same(record: Dict, other: Dict) -> bool:
+        return all(
+            math.isclose(record[field], other[field], rel_tol=1e-9, abs_tol=1e-9)
+            for field in ('position_value', 'trade_value', 'difference')
+        )
+
+    indexed = {identity(record): record for record in others}
+    return [
+        record for record in breaks
+        if identity(record) not in indexed or not same(record, indexed[identity(record)])
+    ]
+
+# shared reconciler, started at application startup when streaming reconciliation is enabled
+streaming_reconciler = StreamingReconciler()
+
+def start_streaming_reconciliation(session_factory: Callable[[], Session], key: Optional[str] = None) -> StreamingReconciler:
+    """
+    start (or reload) the shared streaming reconciler
+    args:
+        session_factory (Callable[[], Session]): factory for catch-up sessions
+        key (Optional[str]): comma separated key columns, defaults to RECONCILIATION_KEY
+    returns:
+        StreamingReconciler: started reconciler
+    """
+    streaming_reconciler.start(session_factory, key)
+    return streaming_reconciler
+
+def stop_streaming_reconciliation() -> None:
+    """
+    stop the shared streaming reconciler
+    """
+    streaming_reconciler.stop()
+
+def notify_trades_created(trades: Iterable[Trade]) -> None:
+    """
+    pass committed trades to the shared reconciler
+    errors are recorded on the reconciler instead of failing the trade write;
+    the next catch-up or reload repairs the totals
+    args:
+        trades (Iterable[Trade]): committed trades
+    """
+    try:
+        streaming_reconciler.on_trades(trades)
+    except Exception as e:
+        streaming_reconciler.last_error = f"error folding trades: {str(e)}"
+
+def notify_trade_status_changed(trade: Trade) -> None:
+    """
+    pass a committed status change to the shared reconciler
+    args:
+        trade (Trade): updated trade
+    """
+    try:
+        streaming_reconciler.on_status_change(trade)
+    except Exception as e:
+        streaming_reconciler.last_error = f"error recording status change: {str(e)}"
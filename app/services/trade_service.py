@@ -1,8 +1,57 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from sqlalchemy import Select, and_, distinct, func, insert, or_, select
 from sqlalchemy.orm import Session
+from pydantic import ValidationError
 from app.models.models import Trade, TradeStatus
 from app.schemas.schemas import TradeCreate
-from typing import List, Optional
+from app.services.streaming_reconciliation_service import notify_trade_status_changed, notify_trades_created
+from typing import Any, BinaryIO, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple, Union
 from datetime import datetime
+import codecs
+import csv
+import base64
+import io
+import json
+import os
+import threading
+import time
+import uuid
+
+# number of rows sent per executemany batch during bulk inserts
+BULK_INSERT_CHUNK_SIZE = int(os.getenv("BULK_INSERT_CHUNK_SIZE", "5000"))
+
+# number of rows committed at a time during streaming uploads
+UPLOAD_COMMIT_EVERY = int(os.getenv("UPLOAD_COMMIT_EVERY", "10000"))
+
+# maximum number of rejected rows kept in an upload's progress record
+UPLOAD_MAX_REPORTED_ERRORS = 100
+
+# supported streaming upload formats
+UPLOAD_FORMATS = ("csv", "ndjson")
+
+# supported columnar ingest formats
+COLUMNAR_FORMATS = ("arrow", "parquet")
+
+# number of rows read per record batch from parquet files
+COLUMNAR_BATCH_SIZE = int(os.getenv("COLUMNAR_BATCH_SIZE", "65536"))
+
+# supported export formats and the rows fetched per database round trip
+EXPORT_FORMATS = ("csv", "ndjson", "parquet")
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "10000"))
+
+# columns written by trade exports, in order
+EXPORT_COLUMNS = ("id", "trade_id", "trader", "asset_class", "quantity", "price", "timestamp", "status")
+
+# finished uploads kept for progress polling and resuming, oldest are dropped first
+UPLOAD_PROGRESS_HISTORY = int(os.getenv("UPLOAD_PROGRESS_HISTORY", "100"))
+
+# progress of streaming uploads in this process, keyed by upload id
+upload_progress: Dict[str, Dict[str, Any]] = {}
+upload_progress_lock = threading.Lock()
 
 def validate_trade_data(trade_data: TradeCreate) -> None:
     """
@@ -48,17 +97,462 @@ def create_trade(db: Session, trade_data: TradeCreate) -> Trade:
         db.add(trade)
         db.commit()
         db.refresh(trade)
-        return trade
     except Exception as e:
         db.rollback()
         raise ValueError(f"error creating trade: {str(e)}")
+    notify_trades_created([trade])
+    return trade
+
+def format_validation_error(error: ValidationError) -> str:
+    """
+    flatten a pydantic validation error into a single line
+    args:
+        error (ValidationError): validation error to format
+    returns:
+        str: "field: message" pairs separated by semicolons
+    """
+    return "; ".join(
+        f"{'.'.join(str(loc) for loc in e['loc'])}: {e['msg']}" for e in error.errors()
+    )
+
+def find_existing_trade_ids(
+    db: Session,
+    trade_ids: Iterable[str],
+    chunk_size: int = BULK_INSERT_CHUNK_SIZE
+) -> Set[str]:
+    """
+    find which of the given trade ids are already stored
+    args:
+        db (Session): database session
+        trade_ids (Iterable[str]): trade ids to look up
+        chunk_size (int): number of ids per IN query
+    returns:
+        Set[str]: trade ids that already exist
+    """
+    trade_ids = list(trade_ids)
+    existing = set()
+    for start in range(0, len(trade_ids), chunk_size):
+        chunk = trade_ids[start:start + chunk_size]
+        existing.update(
+            row[0] for row in db.query(Trade.trade_id).filter(Trade.trade_id.in_(chunk))
+        )
+    return existing
+
+def insert_trade_rows(
+    db: Session,
+    rows: List[Dict[str, Any]],
+    chunk_size: int = BULK_INSERT_CHUNK_SIZE
+) -> None:
+    """
+    insert prepared trade rows with executemany, without committing
+    args:
+        db (Session): database session
+        rows (List[Dict[str, Any]]): column values for each trade
+        chunk_size (int): number of rows per executemany batch
+    """
+    for start in range(0, len(rows), chunk_size):
+        db.execute(insert(Trade), rows[start:start + chunk_size])
+
+def create_trades_bulk(
+    db: Session,
+    trades: Sequence[Union[TradeCreate, Dict[str, Any]]],
+    chunk_size: int = BULK_INSERT_CHUNK_SIZE
+) -> Dict[str, Any]:
+    """
+    validate and insert a batch of trades in a single transaction
+    rows that fail validation or reuse an existing trade id are rejected
+    individually; the remaining rows are inserted in chunks and committed once
+    args:
+        db (Session): database session
+        trades (Sequence[Union[TradeCreate, Dict[str, Any]]]): trades to create,
+            exceptions in the sequence are reported as rejected rows
+        chunk_size (int): number of rows per executemany batch
+    returns:
+        Dict[str, Any]: counts, throughput and per-row results
+    raises:
+        ValueError: if the insert fails
+    """
+    started = time.perf_counter()
+    timestamp = datetime.now().replace(microsecond=0)
+    results: List[Dict[str, Any]] = []
+    pending: List[Dict[str, Any]] = []
+    pending_indexes: List[int] = []
+    seen: Set[str] = set()
+
+    # validate every row before touching the database
+    for index, item in enumerate(trades):
+        if isinstance(item, Exception):
+            # row could not be parsed upstream, e.g. malformed ndjson line
+            results.append({"index": index, "trade_id": None, "accepted": False,
+                            "reason": str(item)})
+            continue
+        trade_id = item.get("trade_id") if isinstance(item, dict) else item.trade_id
+        try:
+            trade_data = item if isinstance(item, TradeCreate) else TradeCreate(**item)
+            validate_trade_data(trade_data)
+        except ValidationError as e:
+            results.append({"index": index, "trade_id": trade_id, "accepted": False,
+                            "reason": format_validation_error(e)})
+            continue
+        except (ValueError, TypeError) as e:
+            results.append({"index": index, "trade_id": trade_id, "accepted": False,
+                            "reason": str(e)})
+            continue
+        if trade_data.trade_id in seen:
+            results.append({"index": index, "trade_id": trade_id, "accepted": False,
+                            "reason": f"duplicate trade id {trade_id} in batch"})
+            continue
+        seen.add(trade_data.trade_id)
+        pending_indexes.append(index)
+        pending.append({
+            "trade_id": trade_data.trade_id,
+            "trader": trade_data.trader,
+            "asset_class": trade_data.asset_class,
+            "quantity": trade_data.quantity,
+            "price": trade_data.price,
+            "timestamp": timestamp,
+            "status": TradeStatus.PENDING
+        })
+
+    # reject rows whose trade id is already stored
+    existing = find_existing_trade_ids(db, seen, chunk_size)
+    rows = []
+    for index, row in zip(pending_indexes, pending):
+        if row["trade_id"] in existing:
+            results.append({"index": index, "trade_id": row["trade_id"], "accepted": False,
+                            "reason": f"trade id {row['trade_id']} already exists"})
+        else:
+            results.append({"index": index, "trade_id": row["trade_id"], "accepted": True,
+                            "reason": None})
+            rows.append(row)
+
+    try:
+        insert_trade_rows(db, rows, chunk_size)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        raise ValueError(f"error creating trades: {str(e)}")
+
+    elapsed = time.perf_counter() - started
+    results.sort(key=lambda r: r["index"])
+    return {
+        "total": len(results),
+        "accepted": len(rows),
+        "rejected": len(results) - len(rows),
+        "elapsed_seconds": elapsed,
+        "rows_per_second": len(results) / elapsed if elapsed > 0 else 0.0,
+        "results": results
+    }
+
+def iter_lines(chunks: Iterable[bytes], encoding: str = "utf-8") -> Iterator[str]:
+    """
+    split a stream of byte chunks into text lines without buffering the whole stream
+    args:
+        chunks (Iterable[bytes]): raw byte chunks
+        encoding (str): text encoding of the stream
+    yields:
+        str: lines including their line terminator
+    """
+    decoder = codecs.getincrementaldecoder(encoding)()
+    pending = ""
+    for chunk in chunks:
+        # the last piece may be an incomplete line, keep it for the next chunk
+        *lines, pending = (pending + decoder.decode(chunk)).split("\n")
+        for line in lines:
+            yield line + "\n"
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+def iter_trade_records(
+    lines: Iterable[str],
+    file_format: str
+) -> Iterator[Union[Dict[str, Any], ValueError]]:
+    """
+    lazily parse csv or ndjson lines into trade records
+    args:
+        lines (Iterable[str]): text lines of the file
+        file_format (str): "csv" (with header row) or "ndjson"
+    yields:
+        Union[Dict[str, Any], ValueError]: parsed record, or the error for a line
+        that could not be parsed
+    raises:
+        ValueError: if the format is not supported
+    """
+    if file_format == "csv":
+        yield from csv.DictReader(lines)
+    elif file_format == "ndjson":
+        for line_number, line in enumerate(lines, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                yield ValueError(f"invalid json on line {line_number}: {e.msg}")
+                continue
+            if not isinstance(record, dict):
+                yield ValueError(f"line {line_number} is not a json object")
+                continue
+            yield record
+    else:
+        raise ValueError(f"unsupported upload format {file_format}, expected one of {', '.join(UPLOAD_FORMATS)}")
+
+def prune_upload_progress() -> None:
+    """
+    drop the oldest finished uploads beyond UPLOAD_PROGRESS_HISTORY, caller holds the lock
+    """
+    finished = [upload_id for upload_id, progress in upload_progress.items() if progress["status"] != "running"]
+    for upload_id in finished[:max(len(finished) - UPLOAD_PROGRESS_HISTORY, 0)]:
+        del upload_progress[upload_id]
+
+def get_upload_progress(upload_id: str) -> Optional[Dict[str, Any]]:
+    """
+    get the progress of a streaming upload
+    args:
+        upload_id (str): upload identifier
+    returns:
+        Optional[Dict[str, Any]]: copy of the progress record if known, None otherwise
+    """
+    with upload_progress_lock:
+        progress = upload_progress.get(upload_id)
+        return dict(progress) if progress else None
+
+def ingest_trade_records(
+    db: Session,
+    records: Iterable[Union[Dict[str, Any], ValueError]],
+    commit_every: int = UPLOAD_COMMIT_EVERY,
+    resume_from: Optional[int] = None,
+    upload_id: Optional[str] = None,
+    progress_callback: Optional[Callable[[Dict[str, Any]], None]] = None
+) -> Dict[str, Any]:
+    """
+    insert a stream of trade records, committing every commit_every rows
+    only one batch is held in memory at a time; the committed offset is the
+    number of records fully processed, so a failed load can be resumed by
+    passing it back as resume_from. when resume_from is omitted and the upload
+    id belongs to an earlier failed load, that load's committed offset is used
+    args:
+        db (Session): database session
+        records (Iterable[Union[Dict[str, Any], ValueError]]): parsed trade records
+        commit_every (int): number of records per committed batch
+        resume_from (Optional[int]): number of leading records to skip
+        upload_id (Optional[str]): identifier to report progress under
+        progress_callback (Optional[Callable[[Dict[str, Any]], None]]): called
+            with the progress record after every commit
+    returns:
+        Dict[str, Any]: final progress record
+    raises:
+        ValueError: if a batch fails to commit
+    """
+    upload_id = upload_id or uuid.uuid4().hex
+    previous = get_upload_progress(upload_id)
+    if resume_from is None:
+        resume_from = previous["committed_offset"] if previous and previous["status"] == "failed" else 0
+
+    progress = {
+        "upload_id": upload_id,
+        "status": "running",
+        "resumed_from": resume_from,
+        "rows_read": 0,
+        "committed_offset": resume_from,
+        "accepted": 0,
+        "rejected": 0,
+        "rows_per_second": 0.0,
+        "errors": [],
+        "error": None
+    }
+    started = time.perf_counter()
+
+    def publish() -> None:
+        elapsed = time.perf_counter() - started
+        progress["rows_per_second"] = progress["rows_read"] / elapsed if elapsed > 0 else 0.0
+        with upload_progress_lock:
+            upload_progress[upload_id] = dict(progress, errors=list(progress["errors"]))
+            prune_upload_progress()
+        if progress_callback:
+            progress_callback(dict(progress))
+
+    def flush(batch: List[Union[Dict[str, Any], ValueError]]) -> None:
+        result = create_trades_bulk(db, batch)
+        offset = progress["committed_offset"]
+        progress["committed_offset"] = offset + len(batch)
+        progress["accepted"] += result["accepted"]
+        progress["rejected"] += result["rejected"]
+        for row in result["results"]:
+            if not row["accepted"] and len(progress["errors"]) < UPLOAD_MAX_REPORTED_ERRORS:
+                progress["errors"].append(dict(row, index=offset + row["index"]))
+        publish()
+
+    publish()
+    batch: List[Union[Dict[str, Any], ValueError]] = []
+    try:
+        for offset, record in enumerate(records):
+            if offset < resume_from:
+                continue
+            progress["rows_read"] += 1
+            batch.append(record)
+            if len(batch) >= commit_every:
+                flush(batch)
+                batch = []
+        if batch:
+            flush(batch)
+    except Exception as e:
+        progress["status"] = "failed"
+        progress["error"] = str(e)
+        publish()
+        raise ValueError(f"error ingesting trades at offset {progress['committed_offset']}: {str(e)}")
+
+    progress["status"] = "completed"
+    publish()
+    return dict(progress)
+
+def iter_columnar_batches(source: BinaryIO, file_format: str) -> Iterator[pa.RecordBatch]:
+    """
+    read an arrow ipc stream or parquet file one record batch at a time
+    args:
+        source (BinaryIO): seekable file object holding the data
+        file_format (str): "arrow" or "parquet"
+    yields:
+        pa.RecordBatch: next batch of rows
+    raises:
+        ValueError: if the format is not supported
+    """
+    if file_format == "arrow":
+        yield from pa.ipc.open_stream(source)
+    elif file_format == "parquet":
+        yield from pq.ParquetFile(source).iter_batches(batch_size=COLUMNAR_BATCH_SIZE)
+    else:
+        raise ValueError(f"unsupported columnar format {file_format}, expected one of {', '.join(COLUMNAR_FORMATS)}")
+
+def validate_trade_batch(batch: pa.RecordBatch) -> Dict[str, np.ndarray]:
+    """
+    validate a record batch of trades with whole-column masks
+    applies the TradeBase rules (non-empty ids, trader and asset class,
+    positive quantity and price) without building a model per row
+    args:
+        batch (pa.RecordBatch): batch with the TradeCreate columns
+    returns:
+        Dict[str, np.ndarray]: column arrays plus a "reason" array holding the
+        rejection reason of each row, or None for valid rows
+    raises:
+        ValueError: if a required column is missing
+    """
+    missing = [c for c in ("trade_id", "trader", "asset_class", "quantity", "price") if c not in batch.schema.names]
+    if missing:
+        raise ValueError(f"missing columns: {', '.join(missing)}")
+
+    columns: Dict[str, np.ndarray] = {}
+    checks = []
+    for name in ("trade_id", "trader", "asset_class"):
+        column = batch.column(name).cast(pa.string())
+        columns[name] = column.to_numpy(zero_copy_only=False)
+        checks.append((pc.fill_null(pc.utf8_length(column), 0).to_numpy() == 0, f"{name}: must not be empty"))
+    for name in ("quantity", "price"):
+        values = batch.column(name).cast(pa.float64()).to_numpy(zero_copy_only=False)
+        columns[name] = values
+        # nan marks nulls and fails the comparison, so it is rejected too
+        checks.append((~(values > 0), f"{name}: must be positive"))
+
+    # first failing rule wins, matching the order fields are validated in TradeBase
+    reason = np.full(batch.num_rows, None, dtype=object)
+    for mask, message in reversed(checks):
+        reason[mask] = message
+    columns["reason"] = reason
+    return columns
+
+def create_trades_columnar(
+    db: Session,
+    source: BinaryIO,
+    file_format: str,
+    chunk_size: int = BULK_INSERT_CHUNK_SIZE
+) -> Dict[str, Any]:
+    """
+    ingest an arrow ipc stream or parquet file of trades in a single transaction
+    each record batch is validated with vectorized masks and its surviving rows
+    are inserted with executemany, without creating Trade objects
+    args:
+        db (Session): database session
+        source (BinaryIO): seekable file object holding the data
+        file_format (str): "arrow" or "parquet"
+        chunk_size (int): number of rows per executemany batch
+    returns:
+        Dict[str, Any]: counts, throughput, rejection counts and first rejections
+    raises:
+        ValueError: if the file cannot be read or the insert fails
+    """
+    started = time.perf_counter()
+    timestamp = datetime.now().replace(microsecond=0)
+    total = 0
+    accepted = 0
+    rejection_counts: Dict[str, int] = {}
+    errors: List[Dict[str, Any]] = []
+
+    try:
+        for batch in iter_columnar_batches(source, file_format):
+            columns = validate_trade_batch(batch)
+            trade_ids = columns["trade_id"]
+            reason = columns["reason"]
+
+            # duplicates within the batch, then against stored rows (which
+            # includes earlier batches of this file, inserted in this transaction)
+            valid = pd.isna(reason)
+            duplicated = np.zeros(batch.num_rows, dtype=bool)
+            duplicated[valid] = pd.Series(trade_ids[valid]).duplicated().to_numpy()
+            reason[duplicated] = "duplicate trade id in batch"
+            valid &= ~duplicated
+            existing = find_existing_trade_ids(db, trade_ids[valid].tolist(), chunk_size)
+            if existing:
+                exists = valid & pd.Series(trade_ids).isin(existing).to_numpy()
+                reason[exists] = "trade id already exists"
+                valid &= ~exists
+
+            rows = [
+                {
+                    "trade_id": trade_id,
+                    "trader": trader,
+                    "asset_class": asset_class,
+                    "quantity": float(quantity),
+                    "price": float(price),
+                    "timestamp": timestamp,
+                    "status": TradeStatus.PENDING
+                }
+                for trade_id, trader, asset_class, quantity, price in zip(
+                    trade_ids[valid], columns["trader"][valid], columns["asset_class"][valid],
+                    columns["quantity"][valid], columns["price"][valid]
+                )
+            ]
+            insert_trade_rows(db, rows, chunk_size)
+
+            for index in np.flatnonzero(~valid):
+                rejection_counts[reason[index]] = rejection_counts.get(reason[index], 0) + 1
+                if len(errors) < UPLOAD_MAX_REPORTED_ERRORS:
+                    errors.append({"index": total + int(index), "trade_id": trade_ids[index],
+                                   "accepted": False, "reason": reason[index]})
+            total += batch.num_rows
+            accepted += len(rows)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        raise ValueError(f"error ingesting {file_format} trades: {str(e)}")
+
+    elapsed = time.perf_counter() - started
+    return {
+        "total": total,
+        "accepted": accepted,
+        "rejected": total - accepted,
+        "elapsed_seconds": elapsed,
+        "rows_per_second": total / elapsed if elapsed > 0 else 0.0,
+        "rejection_counts": rejection_counts,
+        "errors": errors
+    }
 
 def get_trades(
     db: Session,
     trader: Optional[str] = None,
     asset_class: Optional[str] = None,
     skip: int = 0,
-    limit: int = 100
+    limit: int = 100,
+    status: Optional[TradeStatus] = None
 ) -> List[Trade]:
     """
     get trades with optional filtering
@@ -68,6 +562,7 @@ def get_trades(
         asset_class (Optional[str]): filter by asset class
         skip (int): number of records to skip
         limit (int): maximum number of records to return
+        status (Optional[TradeStatus]): filter by trade status
     returns:
         List[Trade]: list of trades matching the criteria
     """
@@ -78,9 +573,205 @@ def get_trades(
         query = query.filter(Trade.trader == trader)
     if asset_class:
         query = query.filter(Trade.asset_class == asset_class)
+    if status:
+        query = query.filter(Trade.status == status)
     
+    # apply pagination, id breaks ties between trades booked in the same second
+    return query.order_by(Trade.timestamp.desc(), Trade.id.desc()).offset(skip).limit(limit).all()
+
+def encode_cursor(trade: Trade) -> str:
+    """
+    build an opaque pagination cursor pointing just past a trade
+    args:
+        trade (Trade): last trade of the current page
+    returns:
+        str: url-safe cursor
+    """
+    payload = json.dumps([trade.timestamp.isoformat(), trade.id])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """
+    decode a pagination cursor
+    args:
+        cursor (str): cursor produced by encode_cursor
+    returns:
+        Tuple[datetime, int]: timestamp and id of the last trade seen
+    raises:
+        ValueError: if the cursor is malformed
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        timestamp, trade_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(timestamp), int(trade_id)
+    except Exception:
+        raise ValueError("invalid cursor")
+
+def trades_page_query(
+    trader: Optional[str] = None,
+    asset_class: Optional[str] = None,
+    cursor: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 100,
+    status: Optional[TradeStatus] = None,
+    columns: Optional[Sequence[Any]] = None
+) -> Select:
+    """
+    build the query for one page of trades, newest first
+    with a cursor the page starts with a seek predicate on (timestamp, id),
+    which the composite index answers without walking the skipped rows;
+    without one it falls back to offset paging. one extra row is selected
+    so callers can tell whether another page follows
+    args:
+        trader (Optional[str]): filter by trader name
+        asset_class (Optional[str]): filter by asset class
+        cursor (Optional[str]): cursor returned with the previous page
+        skip (int): number of records to skip when no cursor is given
+        limit (int): maximum number of records to return
+        status (Optional[TradeStatus]): filter by trade status
+        columns (Optional[Sequence[Any]]): select only these trade columns, which
+            must include timestamp and id, instead of whole trades
+    returns:
+        Select: query selecting up to limit + 1 trades
+    raises:
+        ValueError: if the cursor is malformed
+    """
+    query = select(*columns) if columns else select(Trade)
+
+    # apply filters
+    if trader:
+        query = query.where(Trade.trader == trader)
+    if asset_class:
+        query = query.where(Trade.asset_class == asset_class)
+    if status:
+        query = query.where(Trade.status == status)
+
     # apply pagination
-    return query.order_by(Trade.timestamp.desc()).offset(skip).limit(limit).all()
+    if cursor:
+        timestamp, trade_id = decode_cursor(cursor)
+        # the redundant upper bound gives the planner an index range to seek to,
+        # the or-predicate alone is evaluated row by row
+        query = query.where(and_(
+            Trade.timestamp <= timestamp,
+            or_(Trade.timestamp < timestamp, Trade.id < trade_id)
+        ))
+    else:
+        query = query.offset(skip)
+    return query.order_by(Trade.timestamp.desc(), Trade.id.desc()).limit(limit + 1)
+
+def split_trades_page(trades: List[Any], limit: int) -> Tuple[List[Any], Optional[str]]:
+    """
+    split the rows of trades_page_query into the page and the next cursor
+    args:
+        trades (List[Any]): up to limit + 1 trades, or rows with timestamp and id
+        limit (int): page size
+    returns:
+        Tuple[List[Any], Optional[str]]: trades of the page and the cursor
+        for the next page, None on the last page
+    """
+    if len(trades) > limit:
+        trades = trades[:limit]
+        return trades, encode_cursor(trades[-1])
+    return trades, None
+
+def get_trades_page(
+    db: Session,
+    trader: Optional[str] = None,
+    asset_class: Optional[str] = None,
+    cursor: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 100,
+    status: Optional[TradeStatus] = None,
+    columns: Optional[Sequence[Any]] = None
+) -> Tuple[List[Any], Optional[str]]:
+    """
+    get one page of trades with keyset pagination
+    args:
+        db (Session): database session
+        trader (Optional[str]): filter by trader name
+        asset_class (Optional[str]): filter by asset class
+        cursor (Optional[str]): cursor returned with the previous page
+        skip (int): number of records to skip when no cursor is given
+        limit (int): maximum number of records to return
+        status (Optional[TradeStatus]): filter by trade status
+        columns (Optional[Sequence[Any]]): select only these trade columns and
+            return plain rows instead of Trade objects
+    returns:
+        Tuple[List[Any], Optional[str]]: trades (or rows) of the page and the
+        cursor for the next page, None on the last page
+    raises:
+        ValueError: if the cursor is malformed
+    """
+    query = trades_page_query(trader, asset_class, cursor, skip, limit, status, columns)
+    result = db.execute(query)
+    return split_trades_page(list(result.all() if columns else result.scalars()), limit)
+
+def get_trade_stats(
+    db: Session,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None
+) -> Dict[str, Any]:
+    """
+    aggregate trade totals in the database
+    counts, volumes and averages are computed with group by queries, so only
+    the aggregates leave the database however many trades are in the range
+    args:
+        db (Session): database session
+        start (Optional[datetime]): include trades at or after this time
+        end (Optional[datetime]): include trades before this time
+    returns:
+        Dict[str, Any]: totals plus per day, per asset class and per trader
+        breakdowns, shaped like schemas.TradeStats
+    """
+    conditions = []
+    if start:
+        conditions.append(Trade.timestamp >= start)
+    if end:
+        conditions.append(Trade.timestamp < end)
+
+    totals = db.execute(
+        select(
+            func.count(Trade.id),
+            func.coalesce(func.sum(Trade.quantity), 0.0),
+            func.coalesce(func.avg(Trade.quantity), 0.0),
+            func.count(distinct(Trade.trader))
+        ).where(*conditions)
+    ).one()
+
+    day = func.date(Trade.timestamp)
+    daily = db.execute(
+        select(day, func.count(Trade.id), func.sum(Trade.quantity))
+        .where(*conditions)
+        .group_by(day)
+        .order_by(day)
+    ).all()
+
+    def group_totals(column: Any) -> List[Dict[str, Any]]:
+        rows = db.execute(
+            select(column, func.count(Trade.id), func.sum(Trade.quantity), func.avg(Trade.quantity))
+            .where(*conditions)
+            .group_by(column)
+            .order_by(column)
+        ).all()
+        return [
+            {"key": key, "trade_count": count, "total_volume": volume, "avg_trade_size": average}
+            for key, count, volume, average in rows
+        ]
+
+    return {
+        "start": start,
+        "end": end,
+        "total_trades": totals[0],
+        "total_volume": totals[1],
+        "avg_trade_size": totals[2],
+        "active_traders": totals[3],
+        "daily": [
+            {"date": trading_day, "trade_count": count, "total_volume": volume}
+            for trading_day, count, volume in daily
+        ],
+        "by_asset_class": group_totals(Trade.asset_class),
+        "by_trader": group_totals(Trade.trader)
+    }
 
 def get_trade_by_id(db: Session, trade_id: str) -> Optional[Trade]:
     """
@@ -113,8 +804,155 @@ def update_trade_status(
         try:
             db.commit()
             db.refresh(trade)
-            return trade
         except Exception as e:
             db.rollback()
             raise ValueError(f"error updating trade status: {str(e)}")
-    return None 
\ No newline at end of file
+        notify_trade_status_changed(trade)
+        return trade
+    return None
+
+def iter_trade_export_batches(
+    db: Session,
+    trader: Optional[str] = None,
+    asset_class: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    batch_size: int = EXPORT_BATCH_SIZE
+) -> Iterator[List[Tuple]]:
+    """
+    stream trade rows as plain tuples, batch_size rows at a time
+    the query runs with yield_per, which uses a server-side cursor where the
+    driver supports one, so only one batch is held in memory at a time
+    args:
+        db (Session): database session
+        trader (Optional[str]): filter by trader name
+        asset_class (Optional[str]): filter by asset class
+        start (Optional[datetime]): include trades at or after this time
+        end (Optional[datetime]): include trades before this time
+        batch_size (int): rows per batch
+    yields:
+        List[Tuple]: rows with the EXPORT_COLUMNS values, oldest first
+    """
+    query = select(*(getattr(Trade, column) for column in EXPORT_COLUMNS))
+    if trader:
+        query = query.where(Trade.trader == trader)
+    if asset_class:
+        query = query.where(Trade.asset_class == asset_class)
+    if start:
+        query = query.where(Trade.timestamp >= start)
+    if end:
+        query = query.where(Trade.timestamp < end)
+    query = query.order_by(Trade.timestamp, Trade.id)
+
+    result = db.execute(query, execution_options={"yield_per": batch_size})
+    for partition in result.partitions():
+        yield partition
+
+class ChunkSink:
+    """
+    write-only file object that hands out what was written since the last drain
+    keeps the absolute position for tell(), which the parquet writer relies on
+    to record column chunk offsets in the footer
+    """
+
+    def __init__(self) -> None:
+        self.buffer = io.BytesIO()
+        self.position = 0
+        self.closed = False
+
+    def write(self, data: bytes) -> int:
+        self.buffer.write(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = self.buffer.getvalue()
+        self.buffer = io.BytesIO()
+        return data
+
+def export_trades(
+    db: Session,
+    file_format: str,
+    trader: Optional[str] = None,
+    asset_class: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    batch_size: int = EXPORT_BATCH_SIZE
+) -> Iterator[bytes]:
+    """
+    encode the filtered trade table as csv, ndjson or parquet, batch by batch
+    args:
+        db (Session): database session
+        file_format (str): "csv", "ndjson" or "parquet"
+        trader (Optional[str]): filter by trader name
+        asset_class (Optional[str]): filter by asset class
+        start (Optional[datetime]): include trades at or after this time
+        end (Optional[datetime]): include trades before this time
+        batch_size (int): rows per batch
+    yields:
+        bytes: next piece of the encoded file
+    raises:
+        ValueError: if the format is not supported
+    """
+    if file_format not in EXPORT_FORMATS:
+        raise ValueError(f"unsupported export format {file_format}, expected one of {', '.join(EXPORT_FORMATS)}")
+    batches = iter_trade_export_batches(db, trader, asset_class, start, end, batch_size)
+
+    if file_format == "csv":
+        text = io.StringIO()
+        writer = csv.writer(text, lineterminator="\n")
+        writer.writerow(EXPORT_COLUMNS)
+        for batch in batches:
+            writer.writerows(
+                row[:6] + (row[6].isoformat() if row[6] else None, row[7].value if row[7] else None)
+                for row in batch
+            )
+            yield text.getvalue().encode()
+            text.seek(0)
+            text.truncate()
+        if text.tell():
+            yield text.getvalue().encode()
+
+    elif file_format == "ndjson":
+        for batch in batches:
+            yield "".join(
+                json.dumps({
+                    **dict(zip(EXPORT_COLUMNS[:6], row[:6])),
+                    "timestamp": row[6].isoformat() if row[6] else None,
+                    "status": row[7].value if row[7] else None
+                }) + "\n"
+                for row in batch
+            ).encode()
+
+    else:
+        schema = pa.schema([
+            ("id", pa.int64()),
+            ("trade_id", pa.string()),
+            ("trader", pa.string()),
+            ("asset_class", pa.string()),
+            ("quantity", pa.float64()),
+            ("price", pa.float64()),
+            ("timestamp", pa.timestamp("us")),
+            ("status", pa.string())
+        ])
+        sink = ChunkSink()
+        # every batch becomes one row group, flushed to the client as soon as it is written
+        with pq.ParquetWriter(sink, schema) as writer:
+            for batch in batches:
+                columns = list(zip(*batch))
+                columns[7] = [status.value if status else None for status in columns[7]]
+                writer.write_table(pa.Table.from_arrays(
+                    [pa.array(values, type=field.type) for values, field in zip(columns, schema)],
+                    schema=schema
+                ))
+                yield sink.drain()
+        yield sink.drain()
@@ -0,0 +1,306 @@
+from concurrent.futures import Future, InvalidStateError
+from sqlalchemy.orm import Session
+from app.models.models import Trade, TradeStatus
+from app.schemas.schemas import TradeCreate
+from app.services.streaming_reconciliation_service import notify_trades_created
+from app.services.trade_service import validate_trade_data
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from datetime import datetime
+import os
+import queue
+import threading
+import time
+
+# group commit is opt-in, single trades are committed one by one otherwise
+GROUP_COMMIT_ENABLED = os.getenv("TRADE_GROUP_COMMIT", "false").lower() in ("1", "true", "yes")
+
+# flush when this many trades are waiting...
+GROUP_COMMIT_MAX_BATCH = int(os.getenv("TRADE_GROUP_COMMIT_MAX_BATCH", "500"))
+
+# ...or when the oldest waiting trade has waited this long
+GROUP_COMMIT_MAX_DELAY_MS = float(os.getenv("TRADE_GROUP_COMMIT_MAX_DELAY_MS", "5"))
+
+# bound on queued trades, submitters block (then fail) when it is full
+GROUP_COMMIT_QUEUE_SIZE = int(os.getenv("TRADE_GROUP_COMMIT_QUEUE_SIZE", "10000"))
+
+# how long a request waits for queue space and for its trade to be written
+GROUP_COMMIT_TIMEOUT_SECONDS = float(os.getenv("TRADE_GROUP_COMMIT_TIMEOUT_SECONDS", "30"))
+
+PendingTrade = Tuple[TradeCreate, Future, float]
+
+class GroupCommitWriter:
+    """
+    write-behind queue that commits single trade creations in groups
+    requests enqueue their trade and wait on a future; a writer thread drains
+    the queue and inserts everything waiting in one transaction, so many
+    requests share one commit instead of paying for their own
+    attributes:
+        max_batch: maximum number of trades per commit
+        max_delay: seconds to wait for a batch to fill before flushing
+        queue_size: maximum number of queued trades
+    """
+
+    def __init__(
+        self,
+        max_batch: int = GROUP_COMMIT_MAX_BATCH,
+        max_delay_ms: float = GROUP_COMMIT_MAX_DELAY_MS,
+        queue_size: int = GROUP_COMMIT_QUEUE_SIZE
+    ) -> None:
+        self.max_batch = max_batch
+        self.max_delay = max_delay_ms / 1000
+        self.queue_size = queue_size
+        self._queue: "queue.Queue[Optional[PendingTrade]]" = queue.Queue(maxsize=queue_size)
+        self._thread: Optional[threading.Thread] = None
+        self._session_factory: Optional[Callable[..., Session]] = None
+        self._metrics_lock = threading.Lock()
+        self._reset_metrics()
+
+    @property
+    def running(self) -> bool:
+        """
+        whether the writer thread is accepting trades
+        """
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, session_factory: Callable[..., Session]) -> None:
+        """
+        start the writer thread
+        args:
+            session_factory (Callable[..., Session]): factory for the writer's sessions
+        """
+        if self.running:
+            return
+        self._session_factory = session_factory
+        self._queue = queue.Queue(maxsize=self.queue_size)
+        self._reset_metrics()
+        self._thread = threading.Thread(target=self._run, name="trade-group-commit", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """
+        flush anything queued and stop the writer thread
+        trades the thread did not write, e.g. because it died or a submit
+        raced the stop, fail instead of waiting out their timeout
+        args:
+            timeout (Optional[float]): seconds to wait for queue space and for the thread to finish
+        """
+        thread = self._thread
+        if thread is None:
+            return
+        if thread.is_alive():
+            try:
+                self._queue.put(None, timeout=GROUP_COMMIT_TIMEOUT_SECONDS if timeout is None else timeout)
+            except queue.Full:
+                # the writer is stuck, whatever it has not taken is failed below once it exits
+                pass
+            thread.join(timeout)
+        self._thread = None
+        if not thread.is_alive():
+            self._fail_pending()
+
+    def submit(self, trade_data: TradeCreate, timeout: float = GROUP_COMMIT_TIMEOUT_SECONDS) -> Future:
+        """
+        validate a trade and queue it for the next group commit
+        args:
+            trade_data (TradeCreate): trade data to create
+            timeout (float): seconds to wait for queue space
+        returns:
+            Future: resolves to the created Trade or raises its error
+        raises:
+            ValueError: if trade data is invalid or the writer is not running
+            queue.Full: if the queue stays full for the whole timeout
+        """
+        validate_trade_data(trade_data)
+        if not self.running:
+            raise ValueError("trade writer is not running")
+        future: Future = Future()
+        self._queue.put((trade_data, future, time.perf_counter()), timeout=timeout)
+        if not self.running:
+            # the writer stopped while the trade was queued, nothing will take it
+            self._fail_pending()
+        return future
+
+    def create_trade(self, trade_data: TradeCreate, timeout: float = GROUP_COMMIT_TIMEOUT_SECONDS) -> Trade:
+        """
+        create a trade through the group commit queue and wait for it
+        args:
+            trade_data (TradeCreate): trade data to create
+            timeout (float): seconds to wait for queue space and for the commit
+        returns:
+            Trade: created trade, detached from any session
+        raises:
+            ValueError: if trade data is invalid or the insert fails
+            queue.Full: if the queue stays full for the whole timeout
+        """
+        return self.submit(trade_data, timeout).result(timeout)
+
+    def metrics(self) -> Dict[str, Any]:
+        """
+        get queue and flush metrics
+        returns:
+            Dict[str, Any]: queue depth, batch sizes and flush latencies
+        """
+        with self._metrics_lock:
+            metrics = dict(self._metrics)
+        flush_seconds = metrics.pop("flush_seconds_total")
+        wait_seconds = metrics.pop("wait_seconds_total")
+        batches = metrics["batches_flushed"]
+        processed = metrics["trades_written"] + metrics["trades_failed"]
+        metrics.update({
+            "running": self.running,
+            "queue_depth": self._queue.qsize(),
+            "queue_size": self.queue_size,
+            "max_batch": self.max_batch,
+            "max_delay_ms": self.max_delay * 1000,
+            "avg_batch_size": processed / batches if batches else 0.0,
+            "avg_flush_latency_ms": flush_seconds / batches * 1000 if batches else 0.0,
+            "avg_wait_ms": wait_seconds / processed * 1000 if processed else 0.0
+        })
+        return metrics
+
+    def _reset_metrics(self) -> None:
+        self._metrics = {
+            "batches_flushed": 0,
+            "trades_written": 0,
+            "trades_failed": 0,
+            "last_batch_size": 0,
+            "max_batch_size": 0,
+            "last_flush_latency_ms": 0.0,
+            "max_flush_latency_ms": 0.0,
+            "flush_seconds_total": 0.0,
+            "wait_seconds_total": 0.0
+        }
+
+    def _fail_pending(self) -> None:
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if item is None:
+                continue
+            _, future, _ = item
+            try:
+                future.set_exception(ValueError("trade writer stopped before the trade was written"))
+            except InvalidStateError:
+                pass
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is None:
+                break
+            batch = [item]
+            deadline = time.perf_counter() + self.max_delay
+            # keep collecting until the batch is full or the oldest trade has waited long enough
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._flush(batch)
+        # drain whatever was queued behind the stop marker
+        leftover = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None:
+                leftover.append(item)
+        if leftover:
+            self._flush(leftover)
+
+    def _flush(self, batch: List[PendingTrade]) -> None:
+        started = time.perf_counter()
+        timestamp = datetime.now().replace(microsecond=0)
+        db: Optional[Session] = None
+        failed = 0
+        try:
+            # inside the try, so a failing factory fails this batch instead of the writer thread
+            db = self._session_factory(expire_on_commit=False)
+            trades = [self._build_trade(trade_data, timestamp) for trade_data, _, _ in batch]
+            try:
+                db.add_all(trades)
+                db.commit()
+                outcomes: List[Any] = trades
+            except Exception:
+                db.rollback()
+                # one bad row (e.g. duplicate trade id) must not fail the whole group,
+                # fall back to committing each trade on its own to isolate it
+                outcomes = []
+                for trade_data, _, _ in batch:
+                    trade = self._build_trade(trade_data, timestamp)
+                    try:
+                        db.add(trade)
+                        db.commit()
+                        outcomes.append(trade)
+                    except Exception as e:
+                        db.rollback()
+                        failed += 1
+                        outcomes.append(ValueError(f"error creating trade: {str(e)}"))
+            db.expunge_all()
+            notify_trades_created([outcome for outcome in outcomes if isinstance(outcome, Trade)])
+        except Exception as e:
+            failed = len(batch)
+            outcomes = [ValueError(f"error creating trade: {str(e)}")] * len(batch)
+        finally:
+            if db is not None:
+                db.close()
+
+        finished = time.perf_counter()
+        latency_ms = (finished - started) * 1000
+        with self._metrics_lock:
+            self._metrics["batches_flushed"] += 1
+            self._metrics["trades_written"] += len(batch) - failed
+            self._metrics["trades_failed"] += failed
+            self._metrics["last_batch_size"] = len(batch)
+            self._metrics["max_batch_size"] = max(self._metrics["max_batch_size"], len(batch))
+            self._metrics["last_flush_latency_ms"] = latency_ms
+            self._metrics["max_flush_latency_ms"] = max(self._metrics["max_flush_latency_ms"], latency_ms)
+            self._metrics["flush_seconds_total"] += finished - started
+            self._metrics["wait_seconds_total"] += sum(finished - enqueued for _, _, enqueued in batch)
+
+        for (_, future, _), outcome in zip(batch, outcomes):
+            if isinstance(outcome, Exception):
+                future.set_exception(outcome)
+            else:
+                future.set_result(outcome)
+
+    @staticmethod
+    def _build_trade(trade_data: TradeCreate, timestamp: datetime) -> Trade:
+        return Trade(
+            trade_id=trade_data.trade_id,
+            trader=trade_data.trader,
+            asset_class=trade_data.asset_class,
+            quantity=trade_data.quantity,
+            price=trade_data.price,
+            timestamp=timestamp,
+            status=TradeStatus.PENDING
+        )
+
+# shared writer instance, started at application startup when group commit is enabled
+trade_writer = GroupCommitWriter()
+
+def start_trade_writer(session_factory: Callable[..., Session]) -> GroupCommitWriter:
+    """
+    start the shared group commit writer
+    args:
+        session_factory (Callable[..., Session]): factory for the writer's sessions
+    returns:
+        GroupCommitWriter: started writer
+    """
+    trade_writer.start(session_factory)
+    return trade_writer
+
+def stop_trade_writer() -> None:
+    """
+    flush and stop the shared group commit writer
+    """
+    trade_writer.stop()
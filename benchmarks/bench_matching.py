@@ -0,0 +1,58 @@
+"""
+benchmark of the trade matching engine on two large record sets
+
+the right side is a noisy copy of the left: most records are shifted within
+tolerance, some are split in two, some are perturbed beyond tolerance and
+some are dropped. the target is under one second at 1M x 1M records
+
+usage:
+    python -m benchmarks.bench_matching [records] [traders] [asset_classes]
+"""
+import sys
+import time
+import numpy as np
+import pandas as pd
+from app.services.matching_service import match_records
+
+def make_frames(records: int, traders: int, asset_classes: int, seed: int = 42):
+    rng = np.random.default_rng(seed)
+    trader_names = np.array([f"TRADER{i:04d}" for i in range(traders)], dtype=object)
+    asset_names = np.array([f"ASSET{i:05d}" for i in range(asset_classes)], dtype=object)
+    left = pd.DataFrame({
+        "id": np.arange(records),
+        "trader": trader_names[rng.integers(0, traders, records)],
+        "asset_class": asset_names[rng.integers(0, asset_classes, records)],
+        "quantity": rng.integers(1, 10_000, records).astype(float),
+        "price": rng.uniform(1, 500, records).round(2)
+    })
+    right = left.copy()
+    right["quantity"] += rng.uniform(-0.004, 0.004, records).round(3)
+    right["price"] += rng.uniform(-0.004, 0.004, records).round(3)
+    outcome = rng.random(records)
+    # 1% split in two, 1% broken beyond tolerance, 1% missing on the right
+    split = right[outcome < 0.01]
+    halves = pd.concat([split.assign(quantity=split["quantity"] / 2)] * 2)
+    broken = (outcome >= 0.01) & (outcome < 0.02)
+    right.loc[broken, "quantity"] += 5
+    right = pd.concat([right[outcome >= 0.03], right[broken], halves], ignore_index=True)
+    right["id"] = np.arange(len(right)) + records
+    return left, right.sample(frac=1, random_state=seed).reset_index(drop=True)
+
+def main(records: int = 1_000_000, traders: int = 200, asset_classes: int = 2_000) -> None:
+    left, right = make_frames(records, traders, asset_classes)
+
+    started = time.perf_counter()
+    result = match_records(left, right)
+    elapsed = time.perf_counter() - started
+
+    matched = result["matched"]
+    print(f"left: {len(left):,}  right: {len(right):,}")
+    for match_type, links in matched.groupby("match_type"):
+        print(f"{match_type:<12} matches: {links['match_id'].nunique():>10,}  links: {len(links):>10,}")
+    print(f"partial groups:      {len(result['partial']):>10,}")
+    print(f"unmatched left:      {len(result['unmatched_left']):>10,}")
+    print(f"unmatched right:     {len(result['unmatched_right']):>10,}")
+    print(f"elapsed: {elapsed:.2f} s  ({(len(left) + len(right)) / elapsed:,.0f} records/s)")
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:4]))
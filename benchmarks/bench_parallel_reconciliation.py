@@ -0,0 +1,77 @@
+"""
+scaling benchmark of parallel partitioned reconciliation
+
+builds a temporary sqlite database of trades and a positions file keyed by
+(trader, asset_class), then reconciles it with 1, 2, 4 and 8 worker processes
+
+usage:
+    python -m benchmarks.bench_parallel_reconciliation [trades] [traders]
+"""
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session
+import app.services.reconciliation_service as rs
+from app.db.base import Base
+from app.models.models import Trade, TradeStatus
+
+ASSET_CLASSES = ("EQUITY", "FIXED_INCOME", "COMMODITY", "FOREX")
+
+def seed(db: Session, trades: int, traders: int, seed: int = 5) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    trader_ids = rng.integers(0, traders, trades)
+    asset_ids = rng.integers(0, len(ASSET_CLASSES), trades)
+    quantities = rng.integers(1, 1000, trades).astype(float)
+    prices = rng.integers(100, 50000, trades) / 100
+    for start in range(0, trades, 100_000):
+        db.execute(insert(Trade), [
+            {
+                "trade_id": f"BENCH{i}",
+                "trader": f"trader {trader_ids[i]}",
+                "asset_class": ASSET_CLASSES[asset_ids[i]],
+                "quantity": quantities[i],
+                "price": prices[i],
+                "status": TradeStatus.PENDING
+            }
+            for i in range(start, min(start + 100_000, trades))
+        ])
+    db.commit()
+    # positions carry the trade totals with every tenth key off by one
+    positions = pd.DataFrame({
+        "trader": [f"trader {i}" for i in trader_ids],
+        "asset_class": [ASSET_CLASSES[i] for i in asset_ids],
+        "quantity": quantities,
+        "price": prices
+    }).groupby(["trader", "asset_class"]).agg(quantity=("quantity", "sum"), price=("price", "mean")).reset_index()
+    positions.loc[::10, "quantity"] += 1
+    return positions
+
+def main(trades: int = 1_000_000, traders: int = 5_000) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(f"sqlite:///{os.path.join(directory, 'bench.db')}")
+        Base.metadata.create_all(engine)
+        positions_file = os.path.join(directory, "positions.csv")
+        with Session(engine) as db:
+            seed(db, trades, traders).to_csv(positions_file, index=False)
+        rs.positions_path = lambda as_of=None: positions_file
+
+        print(f"trades: {trades:,}  keys: {traders * len(ASSET_CLASSES):,}  cpus: {os.cpu_count()}")
+        baseline = None
+        with Session(engine) as db:
+            for workers in (1, 2, 4, 8):
+                started = time.perf_counter()
+                if workers == 1:
+                    found = rs.find_discrepancies_partitioned(db, ("trader", "asset_class"))
+                else:
+                    found = rs.find_discrepancies_parallel(db, ("trader", "asset_class"), workers=workers)
+                elapsed = time.perf_counter() - started
+                baseline = baseline or elapsed
+                print(f"workers: {workers}  {elapsed:8.2f} s  speedup: {baseline / elapsed:4.2f}x  breaks: {len(found):,}")
+        engine.dispose()
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:3]))
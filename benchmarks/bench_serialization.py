@@ -0,0 +1,73 @@
+"""
+before/after benchmark for the trade list response path
+
+before: select whole Trade objects, validate each into schemas.Trade with
+from_attributes and dump to json, as FastAPI does for a response_model
+after: select only the response columns and encode the rows with orjson
+
+usage:
+    python -m benchmarks.bench_serialization [rows] [repeats]
+"""
+from datetime import datetime, timedelta
+from typing import Callable, List
+import json
+import sys
+import time
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+from app.api.responses import TRADE_COLUMNS, json_rows_response
+from app.db.base import Base
+from app.models.models import Trade, TradeStatus
+from app.schemas import schemas
+
+def seed(db: Session, rows: int) -> None:
+    start = datetime(2024, 1, 1)
+    db.execute(insert(Trade), [
+        {
+            "trade_id": f"BENCH{i}",
+            "trader": f"trader {i % 50}",
+            "asset_class": ("EQUITY", "FX", "BOND")[i % 3],
+            "quantity": 100.0 + i,
+            "price": 50.0 + i / 100,
+            "timestamp": start + timedelta(seconds=i),
+            "status": TradeStatus.PENDING
+        }
+        for i in range(rows)
+    ])
+    db.commit()
+
+def schema_path(db: Session, limit: int) -> bytes:
+    trades = db.execute(select(Trade).order_by(Trade.timestamp.desc()).limit(limit)).scalars().all()
+    adapter = TypeAdapter(List[schemas.Trade])
+    content = adapter.dump_python(adapter.validate_python(trades, from_attributes=True), mode="json")
+    db.expunge_all()
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode()
+
+def fast_path(db: Session, limit: int) -> bytes:
+    rows = db.execute(select(*TRADE_COLUMNS).order_by(Trade.timestamp.desc()).limit(limit)).all()
+    return json_rows_response(rows, TRADE_COLUMNS).body
+
+def measure(path: Callable[[Session, int], bytes], db: Session, limit: int, repeats: int) -> float:
+    path(db, limit)
+    started = time.perf_counter()
+    for _ in range(repeats):
+        path(db, limit)
+    return (time.perf_counter() - started) / repeats * 1000
+
+def main(rows: int = 1000, repeats: int = 50) -> None:
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        seed(db, rows)
+        assert json.loads(schema_path(db, rows)) == json.loads(fast_path(db, rows))
+        before = measure(schema_path, db, rows, repeats)
+        after = measure(fast_path, db, rows, repeats)
+    print(f"rows per response: {rows}")
+    print(f"before (orm + pydantic): {before:8.2f} ms")
+    print(f"after (columns + orjson): {after:8.2f} ms")
+    print(f"speedup: {before / after:.1f}x")
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:3]))
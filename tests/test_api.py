@@ -52,4 +52,527 @@ def test_reconciliation_endpoint(client, clean_db, setup_test_data):
     data = response.json()
     assert "status" in data
     assert "summary" in data
-    assert "discrepancies" in data 
\ No newline at end of file
+    assert "discrepancies" in data 
+
+def test_create_trades_batch_endpoint(client, clean_db):
+    client.post(
+        "/api/v1/trades/",
+        json={
+            "trade_id": "TRADE001",
+            "trader": "John Doe",
+            "asset_class": "EQUITY",
+            "quantity": 100,
+            "price": 50.0
+        }
+    )
+    
+    response = client.post(
+        "/api/v1/trades/batch?chunk_size=2",
+        json=[
+            {"trade_id": "TRADE001", "trader": "John Doe", "asset_class": "EQUITY", "quantity": 100, "price": 50.0},
+            {"trade_id": "TRADE002", "trader": "John Doe", "asset_class": "EQUITY", "quantity": 100, "price": 50.0},
+            {"trade_id": "TRADE003", "trader": "John Doe", "asset_class": "EQUITY", "quantity": -5, "price": 50.0},
+            {"trade_id": "TRADE002", "trader": "Jane Doe", "asset_class": "FOREX", "quantity": 10, "price": 1.1},
+            {"trade_id": "TRADE004", "trader": "Jane Doe", "asset_class": "FOREX", "quantity": 10, "price": 1.1},
+            {"trade_id": "TRADE005", "trader": "Jane Doe", "asset_class": "FOREX", "quantity": 10, "price": 1.1}
+        ]
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert data["total"] == 6
+    assert data["accepted"] == 3
+    assert data["rejected"] == 3
+    assert data["rows_per_second"] > 0
+    assert [r["accepted"] for r in data["results"]] == [False, True, False, False, True, True]
+    assert "already exists" in data["results"][0]["reason"]
+    assert "quantity" in data["results"][2]["reason"]
+    assert "duplicate" in data["results"][3]["reason"]
+    
+    response = client.get("/api/v1/trades/")
+    assert len(response.json()) == 4
+
+def test_upload_trades_csv_endpoint(client, clean_db):
+    lines = ["trade_id,trader,asset_class,quantity,price"]
+    lines += [f"UPLOAD{i},John Doe,EQUITY,100,50.0" for i in range(10)]
+    lines.append("UPLOAD_BAD,John Doe,EQUITY,-1,50.0")
+    
+    response = client.post(
+        "/api/v1/trades/upload?file_format=csv&commit_every=4&upload_id=csv-load",
+        content="\n".join(lines).encode()
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert data["status"] == "completed"
+    assert data["rows_read"] == 11
+    assert data["committed_offset"] == 11
+    assert data["accepted"] == 10
+    assert data["rejected"] == 1
+    assert data["errors"][0]["index"] == 10
+    
+    response = client.get("/api/v1/trades/uploads/csv-load")
+    assert response.status_code == 200
+    assert response.json()["accepted"] == 10
+
+def test_upload_trades_ndjson_resume(client, clean_db):
+    lines = [
+        '{"trade_id": "NDJ1", "trader": "John Doe", "asset_class": "EQUITY", "quantity": 100, "price": 50.0}',
+        'not json',
+        '{"trade_id": "NDJ2", "trader": "John Doe", "asset_class": "EQUITY", "quantity": 100, "price": 50.0}',
+        '{"trade_id": "NDJ3", "trader": "John Doe", "asset_class": "EQUITY", "quantity": 100, "price": 50.0}'
+    ]
+    
+    response = client.post(
+        "/api/v1/trades/upload?file_format=ndjson&commit_every=2&resume_from=2",
+        content="\n".join(lines).encode()
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert data["resumed_from"] == 2
+    assert data["rows_read"] == 2
+    assert data["committed_offset"] == 4
+    assert data["accepted"] == 2
+    
+    response = client.get("/api/v1/trades/")
+    assert sorted(t["trade_id"] for t in response.json()) == ["NDJ2", "NDJ3"]
+
+def test_upload_trades_columnar_endpoint(client, clean_db):
+    import io
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    
+    table = pa.table({
+        "trade_id": ["COL1", "COL2", "", "COL4", "COL1"],
+        "trader": ["John Doe", "John Doe", "John Doe", None, "John Doe"],
+        "asset_class": ["EQUITY"] * 5,
+        "quantity": [100, 200, 300, 400, 500],
+        "price": [50.0, 0.0, 50.0, 50.0, 50.0]
+    })
+    
+    parquet = io.BytesIO()
+    pq.write_table(table, parquet)
+    response = client.post("/api/v1/trades/columnar?file_format=parquet", content=parquet.getvalue())
+    assert response.status_code == 200
+    data = response.json()
+    assert data["total"] == 5
+    assert data["accepted"] == 1
+    assert data["rejection_counts"] == {
+        "price: must be positive": 1,
+        "trade_id: must not be empty": 1,
+        "trader: must not be empty": 1,
+        "duplicate trade id in batch": 1
+    }
+    
+    # the same rows as an arrow stream are now all rejected or duplicates
+    stream = io.BytesIO()
+    with pa.ipc.new_stream(stream, table.schema) as writer:
+        writer.write_table(table)
+    response = client.post("/api/v1/trades/columnar?file_format=arrow", content=stream.getvalue())
+    assert response.status_code == 200
+    data = response.json()
+    assert data["accepted"] == 0
+    assert data["rejection_counts"]["trade id already exists"] == 1
+    
+    response = client.get("/api/v1/trades/")
+    assert [t["trade_id"] for t in response.json()] == ["COL1"]
+    assert response.json()[0]["quantity"] == 100
+
+def test_trade_writer_metrics_endpoint(client, clean_db):
+    response = client.get("/api/v1/trades/writer/metrics")
+    assert response.status_code == 200
+    data = response.json()
+    assert "queue_depth" in data
+    assert "avg_flush_latency_ms" in data
+
+def test_get_trades_cursor_pagination(client, clean_db):
+    for i in range(3):
+        client.post(
+            "/api/v1/trades/",
+            json={"trade_id": f"TRADE00{i}", "trader": "John Doe", "asset_class": "EQUITY", "quantity": 100, "price": 50.0}
+        )
+    
+    response = client.get("/api/v1/trades/?limit=2")
+    assert response.status_code == 200
+    assert len(response.json()) == 2
+    cursor = response.headers["X-Next-Cursor"]
+    
+    response = client.get(f"/api/v1/trades/?limit=2&cursor={cursor}")
+    assert [t["trade_id"] for t in response.json()] == ["TRADE000"]
+    assert "X-Next-Cursor" not in response.headers
+    
+    assert client.get("/api/v1/trades/?cursor=bogus").status_code == 400
+
+def test_query_plans_endpoint(client, clean_db):
+    response = client.post("/api/v1/database/indexes")
+    assert response.status_code == 200
+    assert response.json() == {"created": []}
+    
+    response = client.get("/api/v1/database/query-plans")
+    assert response.status_code == 200
+    reports = response.json()
+    assert len(reports) == 16
+    assert not [r for r in reports if r["flagged"]]
+    trader_page = next(r for r in reports if r["filters"] == ["trader"] and r["cursor"])
+    assert any("ix_trades_trader_timestamp" in line for line in trader_page["plan"])
+
+def test_get_trades_status_filter(client, clean_db):
+    for i in range(2):
+        client.post(
+            "/api/v1/trades/",
+            json={"trade_id": f"TRADE00{i}", "trader": "John Doe", "asset_class": "EQUITY", "quantity": 100, "price": 50.0}
+        )
+    client.patch("/api/v1/trades/TRADE001/status?status=completed")
+    
+    response = client.get("/api/v1/trades/?status=completed")
+    assert [t["trade_id"] for t in response.json()] == ["TRADE001"]
+
+def test_export_trades_endpoint(client, clean_db):
+    import io
+    import json
+    import pyarrow.parquet as pq
+    
+    client.post(
+        "/api/v1/trades/batch",
+        json=[
+            {"trade_id": f"EXP{i}", "trader": "John Doe" if i % 2 else "Jane Doe",
+             "asset_class": "EQUITY", "quantity": 100 + i, "price": 50.0}
+            for i in range(5)
+        ]
+    )
+    
+    response = client.get("/api/v1/trades/export?file_format=csv&trader=John Doe")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    lines = response.text.strip().split("\n")
+    assert lines[0] == "id,trade_id,trader,asset_class,quantity,price,timestamp,status"
+    assert [line.split(",")[1] for line in lines[1:]] == ["EXP1", "EXP3"]
+    
+    response = client.get("/api/v1/trades/export?file_format=ndjson")
+    rows = [json.loads(line) for line in response.text.strip().split("\n")]
+    assert [r["trade_id"] for r in rows] == [f"EXP{i}" for i in range(5)]
+    assert rows[0]["status"] == "pending"
+    
+    response = client.get("/api/v1/trades/export?file_format=parquet&end=2000-01-01T00:00:00")
+    assert pq.read_table(io.BytesIO(response.content)).num_rows == 0
+    response = client.get("/api/v1/trades/export?file_format=parquet")
+    table = pq.read_table(io.BytesIO(response.content))
+    assert table.column("quantity").to_pylist() == [100.0, 101.0, 102.0, 103.0, 104.0]
+    
+    assert client.get("/api/v1/trades/export?file_format=xml").status_code == 400
+
+def test_list_endpoints_match_schema_serialization(client, clean_db):
+    from tests.conftest import TestingSessionLocal
+    from app.models.models import OperationalLog as OperationalLogModel
+    from app.models.models import ReconciliationLog as ReconciliationLogModel
+    from app.models.models import ReconciliationStatus, Trade as TradeModel
+    from app.schemas.schemas import OperationalLog, ReconciliationLog, Trade
+    
+    client.post(
+        "/api/v1/trades/batch",
+        json=[
+            {"trade_id": f"FAST{i}", "trader": "John Doe", "asset_class": "EQUITY",
+             "quantity": 100 + i, "price": 50.25}
+            for i in range(3)
+        ]
+    )
+    client.post("/api/v1/logs/operational?message=started")
+    db = TestingSessionLocal()
+    db.add(ReconciliationLogModel(
+        summary="ok",
+        status=ReconciliationStatus.SUCCESS,
+        discrepancies="[]"
+    ))
+    db.commit()
+    
+    def expected(model, schema, order):
+        rows = db.query(model).order_by(order).all()
+        return [schema.model_validate(row).model_dump(mode="json") for row in rows]
+    
+    response = client.get("/api/v1/trades/?limit=2")
+    assert response.json() == expected(TradeModel, Trade, TradeModel.id.desc())[:2]
+    assert "x-next-cursor" in response.headers
+    assert client.get("/api/v1/logs/operational").json() == expected(
+        OperationalLogModel, OperationalLog, OperationalLogModel.id
+    )
+    assert client.get("/api/v1/reconciliation/logs").json() == expected(
+        ReconciliationLogModel, ReconciliationLog, ReconciliationLogModel.id
+    )
+    assert client.get("/api/v1/logs/reconciliation").json() == expected(
+        ReconciliationLogModel, ReconciliationLog, ReconciliationLogModel.id
+    )
+    db.close()
+
+def test_trade_stats_endpoint(client, clean_db):
+    from datetime import datetime, timedelta
+    from tests.conftest import TestingSessionLocal
+    from app.models.models import Trade as TradeModel
+    
+    client.post(
+        "/api/v1/trades/batch",
+        json=[
+            {"trade_id": "STAT1", "trader": "John Doe", "asset_class": "EQUITY", "quantity": 100, "price": 50.0},
+            {"trade_id": "STAT2", "trader": "John Doe", "asset_class": "FX", "quantity": 300, "price": 1.1},
+            {"trade_id": "STAT3", "trader": "Jane Doe", "asset_class": "EQUITY", "quantity": 200, "price": 51.0}
+        ]
+    )
+    db = TestingSessionLocal()
+    db.query(TradeModel).filter(TradeModel.trade_id == "STAT3").update(
+        {"timestamp": datetime(2024, 1, 2, 15, 30)}
+    )
+    db.query(TradeModel).filter(TradeModel.trade_id != "STAT3").update(
+        {"timestamp": datetime(2024, 1, 1, 9, 0)}
+    )
+    db.commit()
+    db.close()
+    
+    stats = client.get("/api/v1/trades/stats").json()
+    assert stats["total_trades"] == 3
+    assert stats["total_volume"] == 600
+    assert stats["avg_trade_size"] == 200
+    assert stats["active_traders"] == 2
+    assert stats["daily"] == [
+        {"date": "2024-01-01", "trade_count": 2, "total_volume": 400},
+        {"date": "2024-01-02", "trade_count": 1, "total_volume": 200}
+    ]
+    assert stats["by_asset_class"] == [
+        {"key": "EQUITY", "trade_count": 2, "total_volume": 300, "avg_trade_size": 150},
+        {"key": "FX", "trade_count": 1, "total_volume": 300, "avg_trade_size": 300}
+    ]
+    assert [group["key"] for group in stats["by_trader"]] == ["Jane Doe", "John Doe"]
+    
+    stats = client.get("/api/v1/trades/stats?start=2024-01-02T00:00:00&end=2024-01-03T00:00:00").json()
+    assert stats["total_trades"] == 1
+    assert stats["by_trader"] == [
+        {"key": "Jane Doe", "trade_count": 1, "total_volume": 200, "avg_trade_size": 200}
+    ]
+    
+    empty = client.get("/api/v1/trades/stats?end=2023-01-01T00:00:00").json()
+    assert empty["total_trades"] == 0
+    assert empty["daily"] == [] and empty["avg_trade_size"] == 0
+    
+    assert client.get("/api/v1/trades/stats?start=2024-02-01T00:00:00&end=2024-01-01T00:00:00").status_code == 400
+
+def test_reconciliation_job_endpoints(client, clean_db, monkeypatch):
+    import threading
+    import time
+    import pandas as pd
+    import app.services.reconciliation_job_service as jobs
+    import app.services.reconciliation_service as rs
+    
+    monkeypatch.setattr(rs, "read_positions_from_csv", lambda as_of=None: pd.DataFrame({
+        "asset_class": ["EQUITY"], "quantity": [100.0], "price": [50.0]
+    }))
+    client.post(
+        "/api/v1/trades/batch",
+        json=[{"trade_id": "JOB1", "trader": "John Doe", "asset_class": "EQUITY", "quantity": 100, "price": 50.0}]
+    )
+    
+    # hold the first run so identical submissions find it in flight
+    release = threading.Event()
+    run = jobs.run_reconciliation
+    
+    def held_run(*args, **kwargs):
+        release.wait(5)
+        return run(*args, **kwargs)
+    
+    monkeypatch.setattr(jobs, "run_reconciliation", held_run)
+    first = client.post("/api/v1/reconciliation/run")
+    assert first.status_code == 202
+    job = first.json()
+    assert job["status"] in ("queued", "running")
+    assert job["key"] == "asset_class"
+    assert client.post("/api/v1/reconciliation/run").json()["job_id"] == job["job_id"]
+    assert client.post("/api/v1/reconciliation/run?rebuild=true").json()["job_id"] != job["job_id"]
+    release.set()
+    
+    for _ in range(100):
+        status = client.get(f"/api/v1/reconciliation/jobs/{job['job_id']}").json()
+        if status["status"] not in ("queued", "running"):
+            break
+        time.sleep(0.05)
+    assert status["status"] == "completed"
+    assert status["progress"] == 1.0
+    assert status["result"]["id"] == status["reconciliation_log_id"]
+    assert status["result"]["status"] == "success"
+    
+    assert client.get("/api/v1/reconciliation/jobs/unknown").status_code == 404
+    assert client.post("/api/v1/reconciliation/run?key=price").status_code == 400
+
+def test_reconciliation_discrepancies_endpoint(client, clean_db, monkeypatch):
+    import json
+    import pandas as pd
+    import app.services.reconciliation_service as rs
+    
+    monkeypatch.setattr(rs, "read_positions_from_csv", lambda as_of=None: pd.DataFrame({
+        "asset_class": ["EQUITY", "FX"], "quantity": [100.0, 300.0], "price": [50.0, 1.5]
+    }))
+    client.post(
+        "/api/v1/trades/batch",
+        json=[
+            {"trade_id": "DISC1", "trader": "John Doe", "asset_class": "EQUITY", "quantity": 100, "price": 55.0},
+            {"trade_id": "DISC2", "trader": "John Doe", "asset_class": "FX", "quantity": 200, "price": 1.5}
+        ]
+    )
+    first = rs.run_reconciliation(clean_db)
+    second = rs.run_reconciliation(clean_db)
+    
+    breaks = client.get("/api/v1/reconciliation/discrepancies").json()
+    assert [(d["reconciliation_log_id"], d["asset_class"], d["type"]) for d in breaks] == [
+        (second.id, "FX", "quantity"), (second.id, "EQUITY", "price"),
+        (first.id, "FX", "quantity"), (first.id, "EQUITY", "price")
+    ]
+    equity_price = client.get("/api/v1/reconciliation/discrepancies?asset_class=EQUITY&type=price&limit=1").json()
+    assert len(equity_price) == 1
+    assert equity_price[0]["difference"] == -5.0
+    assert equity_price[0]["reconciliation_log_id"] == second.id
+    run = client.get(f"/api/v1/reconciliation/discrepancies?reconciliation_log_id={first.id}").json()
+    assert {d["type"] for d in run} == {"quantity", "price"}
+    
+    # the json field is built from the rows for runs that no longer store it
+    assert first.discrepancies_json is None
+    logs = client.get("/api/v1/reconciliation/logs").json()
+    assert json.loads(logs[0]["discrepancies"]) == json.loads(first.discrepancies)
+    assert json.loads(first.discrepancies) == [
+        {"asset_class": "EQUITY", "type": "price", "position_value": 50.0, "trade_value": 55.0, "difference": -5.0},
+        {"asset_class": "FX", "type": "quantity", "position_value": 300.0, "trade_value": 200.0, "difference": 100.0}
+    ]
+
+def test_discrepancy_rows_keep_json_records_and_migrate_legacy_logs(client, clean_db, monkeypatch):
+    import json
+    import pandas as pd
+    import app.services.reconciliation_service as rs
+    from app.models.models import ReconciliationLog as ReconciliationLogModel, ReconciliationStatus
+    
+    monkeypatch.setattr(rs, "read_positions_from_csv", lambda as_of=None: pd.DataFrame({
+        "asset_class": ["EQUITY", "RATES"], "quantity": [100.0, 5.0], "price": [50.0, 99.0]
+    }))
+    client.post(
+        "/api/v1/trades/batch",
+        json=[{"trade_id": "ROWS1", "trader": "John Doe", "asset_class": "EQUITY", "quantity": 100, "price": 55.0}]
+    )
+    
+    # keys without trades keep the integer 0 of the records the checks emit
+    run = rs.run_reconciliation(clean_db, use_cache=False)
+    assert run.discrepancies == json.dumps([
+        {"asset_class": "EQUITY", "type": "price", "position_value": 50.0, "trade_value": 55.0, "difference": -5.0},
+        {"asset_class": "RATES", "type": "quantity", "position_value": 5.0, "trade_value": 0, "difference": 5.0}
+    ])
+    
+    # a log written before the discrepancies table is migrated into it once
+    legacy_records = [{"asset_class": "FX", "type": "quantity", "position_value": 3.0, "trade_value": 0, "difference": 3.0}]
+    legacy = ReconciliationLogModel(
+        summary="legacy run", status=ReconciliationStatus.PARTIAL, discrepancies=json.dumps(legacy_records)
+    )
+    clean_db.add(legacy)
+    clean_db.commit()
+    assert client.get(f"/api/v1/reconciliation/discrepancies?reconciliation_log_id={legacy.id}").json() == []
+    assert rs.migrate_legacy_discrepancies(clean_db) == 1
+    assert rs.migrate_legacy_discrepancies(clean_db) == 0
+    migrated = client.get(f"/api/v1/reconciliation/discrepancies?reconciliation_log_id={legacy.id}").json()
+    assert [(d["asset_class"], d["type"], d["difference"]) for d in migrated] == [("FX", "quantity", 3.0)]
+    assert json.dumps([row.to_dict() for row in legacy.discrepancy_rows]) == json.dumps(legacy_records)
+
+def test_reconciliation_logs_include_stage_profiles(client, clean_db, tmp_path, monkeypatch):
+    import app.services.reconciliation_service as rs
+    from app.models.models import ReconciliationLog as ReconciliationLogModel
+    from app.schemas.schemas import ReconciliationLog
+    
+    csv_path = tmp_path / "positions.csv"
+    csv_path.write_text("asset_class,quantity,price\nEQUITY,100,50.0\nFX,300,1.5\nRATES,5,99.0\n")
+    monkeypatch.setattr(rs, "positions_path", lambda as_of=None: str(csv_path))
+    client.post(
+        "/api/v1/trades/batch",
+        json=[
+            {"trade_id": f"PROF{i}", "trader": "John Doe", "asset_class": ("EQUITY", "FX")[i % 2],
+             "quantity": 50, "price": 50.0}
+            for i in range(4)
+        ]
+    )
+    rs.run_reconciliation(clean_db, use_cache=True, profile_memory=True)
+    rs.run_reconciliation(clean_db, key="asset_class", chunk_size=2, use_cache=False)
+    
+    logs = client.get("/api/v1/reconciliation/logs").json()
+    stages = {log["id"]: log["stages"] for log in logs}
+    in_memory, partitioned = sorted(stages)
+    assert [stage["stage"] for stage in stages[in_memory]] == ["fingerprint", "positions", "trades", "compare", "save"]
+    assert [stage["rows"] for stage in stages[in_memory]][1:] == [3, 4, 3, 3]
+    assert [stage["stage"] for stage in stages[partitioned]] == ["partitioned_join", "save"]
+    assert all(stage["seconds"] >= 0 for log in logs for stage in log["stages"])
+    assert all(stage["peak_memory_bytes"] >= 0 for stage in stages[in_memory])
+    assert all(stage["peak_memory_bytes"] is None for stage in stages[partitioned])
+    
+    expected = [
+        ReconciliationLog.model_validate(log).model_dump(mode="json")
+        for log in clean_db.query(ReconciliationLogModel).order_by(ReconciliationLogModel.id)
+    ]
+    assert client.get("/api/v1/logs/reconciliation").json() == expected
+
+def test_streaming_reconciliation_endpoints(client, clean_db, tmp_path, monkeypatch):
+    import app.services.reconciliation_service as rs
+    from app.services.streaming_reconciliation_service import stop_streaming_reconciliation
+    
+    csv_path = tmp_path / "positions.csv"
+    csv_path.write_text("asset_class,quantity,price\nEQUITY,100,50.0\nFX,300,1.5\n")
+    monkeypatch.setattr(rs, "positions_path", lambda as_of=None: str(csv_path))
+    assert client.get("/api/v1/reconciliation/stream/verify").status_code == 409
+    
+    try:
+        state = client.post("/api/v1/reconciliation/stream/reload").json()
+        assert state["running"]
+        assert [(b["asset_class"], b["type"]) for b in state["breaks"]] == [("EQUITY", "quantity"), ("FX", "quantity")]
+        
+        # a single bad fill shows up on the next read
+        for trade_id, asset_class, quantity, price in [
+            ("S1", "EQUITY", 100, 50.0), ("S2", "FX", 300, 1.5), ("S3", "FX", 1, 9.0)
+        ]:
+            client.post("/api/v1/trades/", json={
+                "trade_id": trade_id, "trader": "John Doe", "asset_class": asset_class,
+                "quantity": quantity, "price": price
+            })
+        state = client.get("/api/v1/reconciliation/stream").json()
+        assert state["trade_count"] == 3
+        assert [(b["asset_class"], b["type"], b["difference"]) for b in state["breaks"]] == [
+            ("FX", "quantity", -1.0), ("FX", "price", -3.75)
+        ]
+        check = client.get("/api/v1/reconciliation/stream/verify").json()
+        assert check["consistent"]
+        assert check["breaks"] == 2
+        assert client.post("/api/v1/reconciliation/stream/reload?key=price").status_code == 400
+    finally:
+        stop_streaming_reconciliation()
+
+def test_position_snapshot_endpoints(client, clean_db, tmp_path, monkeypatch):
+    import json
+    import app.services.reconciliation_service as rs
+    
+    monkeypatch.setattr(rs, "positions_path", lambda as_of=None: str(tmp_path / "missing.csv"))
+    upload = lambda body: client.post(
+        "/api/v1/reconciliation/positions",
+        params={"as_of": "2024-01-08", "source": "eod.csv"},
+        content=body,
+        headers={"Content-Type": "text/csv"}
+    )
+    first = upload("trader,asset_class,quantity,price\nJohn Doe,EQUITY,100,50.0\n,FX,300,1.5\n")
+    assert first.status_code == 201
+    assert first.json()["version"] == 1
+    assert first.json()["key_columns"] == "trader,asset_class"
+    assert first.json()["row_count"] == 2
+    second = upload("asset_class,quantity,price\nEQUITY,100,55.0\n")
+    assert second.json()["version"] == 2
+    
+    assert upload("asset_class,quantity\nEQUITY,100\n").status_code == 400
+    assert upload("asset_class,quantity,price\nEQUITY,,50.0\n").status_code == 400
+    
+    listed = client.get("/api/v1/reconciliation/positions", params={"as_of": "2024-01-08"}).json()
+    assert [snapshot["id"] for snapshot in listed] == [second.json()["id"], first.json()["id"]]
+    assert client.get(f"/api/v1/reconciliation/positions/{first.json()['id']}").json() == first.json()
+    assert client.get("/api/v1/reconciliation/positions/999").status_code == 404
+    
+    # the file is missing, so the run reads the snapshot
+    client.post(
+        "/api/v1/trades/batch",
+        json=[{"trade_id": "SNAP1", "trader": "John Doe", "asset_class": "EQUITY", "quantity": 100, "price": 50.0}]
+    )
+    result = rs.run_reconciliation(clean_db, snapshot_id=first.json()["id"], use_cache=False)
+    assert json.loads(result.discrepancies) == [
+        {"asset_class": "FX", "type": "quantity", "position_value": 300.0, "trade_value": 0, "difference": 300.0}
+    ]
@@ -0,0 +1,75 @@
+import asyncio
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from app.api import async_trades, async_logs
+from app.db.async_base import get_async_db, to_async_url
+from app.models.models import TradeStatus
+from app.schemas.schemas import TradeCreate
+from app.services import async_trade_service, async_log_service
+
+# Test database URL, same file the sync fixtures create tables in
+ASYNC_DATABASE_URL = "sqlite+aiosqlite:///./test.db"
+
+@pytest.fixture
+def async_session_factory():
+    engine = create_async_engine(ASYNC_DATABASE_URL)
+    yield async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+    asyncio.run(engine.dispose())
+
+def test_to_async_url():
+    assert to_async_url("sqlite:///./tradeops.db") == "sqlite+aiosqlite:///./tradeops.db"
+    assert to_async_url("postgresql://u:p@db/tradeops") == "postgresql+asyncpg://u:p@db/tradeops"
+    assert to_async_url("postgresql+asyncpg://u:p@db/tradeops") == "postgresql+asyncpg://u:p@db/tradeops"
+    with pytest.raises(ValueError):
+        to_async_url("mysql://u:p@db/tradeops")
+
+def test_async_trade_service(clean_db, async_session_factory):
+    async def scenario():
+        async with async_session_factory() as db:
+            for i in range(3):
+                await async_trade_service.create_trade(db, TradeCreate(
+                    trade_id=f"ASYNC{i}", trader="John Doe", asset_class="EQUITY", quantity=100, price=50.0
+                ))
+            trades, cursor = await async_trade_service.get_trades_page(db, trader="John Doe", limit=2)
+            updated = await async_trade_service.update_trade_status(db, "ASYNC1", TradeStatus.COMPLETED)
+            completed, _ = await async_trade_service.get_trades_page(db, status=TradeStatus.COMPLETED)
+            missing = await async_trade_service.get_trade_by_id(db, "MISSING")
+            await async_log_service.create_operational_log(db, "async log")
+            logs = await async_log_service.get_operational_logs(db)
+            return trades, cursor, updated, completed, missing, logs
+    
+    trades, cursor, updated, completed, missing, logs = asyncio.run(scenario())
+    assert len(trades) == 2
+    assert cursor is not None
+    assert updated.status == TradeStatus.COMPLETED
+    assert [trade.trade_id for trade in completed] == ["ASYNC1"]
+    assert missing is None
+    assert [log.message for log in logs] == ["async log"]
+
+def test_async_routers(clean_db, async_session_factory):
+    app = FastAPI()
+    app.include_router(async_trades.router, prefix="/api/v1/trades")
+    app.include_router(async_logs.router, prefix="/api/v1/logs")
+    
+    async def override_get_async_db():
+        async with async_session_factory() as db:
+            yield db
+    
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    with TestClient(app) as client:
+        response = client.post(
+            "/api/v1/trades/",
+            json={"trade_id": "ASYNC_API", "trader": "John Doe", "asset_class": "EQUITY", "quantity": 100, "price": 50.0}
+        )
+        assert response.status_code == 200
+        assert response.json()["status"] == "pending"
+        
+        response = client.patch("/api/v1/trades/ASYNC_API/status?status=completed")
+        assert response.status_code == 200
+        assert response.json()["status"] == "completed"
+        
+        assert client.get("/api/v1/trades/MISSING").status_code == 404
+        assert len(client.get("/api/v1/trades/").json()) == 1
+        assert client.get("/api/v1/logs/reconciliation").json() == []
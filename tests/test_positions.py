@@ -0,0 +1,59 @@
+from app.services import positions_service as ps
+import os
+import pandas as pd
+import pytest
+
+@pytest.fixture
+def positions_file(tmp_path):
+    ps.clear_positions_cache()
+    path = tmp_path / "positions.csv"
+    pd.DataFrame({
+        'asset_class': ['EQUITY', 'FOREX'],
+        'quantity': [1000, 500],
+        'price': [50.0, 1.2]
+    }).to_csv(path, index=False)
+    yield str(path)
+    ps.clear_positions_cache()
+
+def fail_read_csv(*args, **kwargs):
+    raise AssertionError("positions file parsed again")
+
+def test_load_positions_caches_unchanged_file(positions_file, monkeypatch):
+    first = ps.load_positions(positions_file)
+    assert first['quantity'].dtype == 'float64'
+    assert first['asset_class'].tolist() == ['EQUITY', 'FOREX']
+    
+    monkeypatch.setattr(ps.pd, "read_csv", fail_read_csv)
+    pd.testing.assert_frame_equal(ps.load_positions(positions_file), first)
+    
+    # a fresh cache maps the sidecar instead of parsing the csv
+    ps.clear_positions_cache()
+    assert os.path.exists(ps.sidecar_path(positions_file))
+    pd.testing.assert_frame_equal(ps.load_positions(positions_file), first)
+
+def test_load_positions_reparses_changed_file(positions_file):
+    assert len(ps.load_positions(positions_file)) == 2
+    
+    with open(positions_file, "a") as f:
+        f.write("COMMODITY,200,75.0\n")
+    stat = os.stat(positions_file)
+    os.utime(positions_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    
+    positions = ps.load_positions(positions_file)
+    assert positions['asset_class'].tolist() == ['EQUITY', 'FOREX', 'COMMODITY']
+    
+    # the stale sidecar is rebuilt too
+    ps.clear_positions_cache()
+    assert len(ps.load_positions(positions_file)) == 3
+
+def test_content_fingerprint_ignores_touch(positions_file):
+    before = ps.positions_fingerprint(positions_file, hash_content=True)
+    os.utime(positions_file, ns=(0, 0))
+    assert ps.positions_fingerprint(positions_file, hash_content=True) == before
+    assert ps.positions_fingerprint(positions_file).startswith("stat:")
+
+def test_positions_file_setting_is_used(positions_file, monkeypatch):
+    import app.services.reconciliation_service as rs
+    
+    monkeypatch.setattr(rs, "POSITIONS_FILE", positions_file)
+    assert rs.read_positions_from_csv()['asset_class'].tolist() == ['EQUITY', 'FOREX']
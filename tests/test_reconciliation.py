@@ -71,4 +71,551 @@ def test_reconciliation_missing_asset_class(clean_db, setup_test_data):
     assert result.status == ReconciliationStatus.PARTIAL
     assert len(result.discrepancies) == 2
     assert any(d["asset_class"] == "COMMODITY" for d in result.discrepancies)
-    assert any(d["asset_class"] == "FOREX" for d in result.discrepancies) 
\ No newline at end of file
+    assert any(d["asset_class"] == "FOREX" for d in result.discrepancies) 
+
+def legacy_discrepancies(positions_df, trades_df):
+    # the per position loop the vectorized engine replaced
+    from app.services.reconciliation_service import check_price_discrepancy, check_quantity_discrepancy
+    discrepancies = []
+    for _, position in positions_df.iterrows():
+        asset_trades = trades_df[trades_df['asset_class'] == position['asset_class']]
+        trade_quantity = float(asset_trades['quantity'].sum()) if not asset_trades.empty else 0
+        trade_price = float(asset_trades['price'].mean()) if not asset_trades.empty else 0
+        for discrepancy in (
+            check_quantity_discrepancy(position['asset_class'], float(position['quantity']), trade_quantity),
+            check_price_discrepancy(position['asset_class'], float(position['price']), trade_price, trade_quantity)
+        ):
+            if discrepancy:
+                discrepancies.append(discrepancy)
+    return discrepancies
+
+def test_vectorized_discrepancies_match_legacy_loop():
+    import numpy as np
+    import pandas as pd
+    from app.services.reconciliation_service import aggregate_trades, find_discrepancies
+    
+    rng = np.random.default_rng(7)
+    trades_df = pd.DataFrame({
+        'asset_class': rng.choice([f"ASSET{i}" for i in range(30)], 2000),
+        'quantity': rng.integers(1, 100, 2000).astype(float),
+        'price': rng.integers(1, 400, 2000) / 4
+    })
+    totals = aggregate_trades(trades_df).set_index('asset_class')
+    # some positions match exactly, some break, some have no trades, one is duplicated
+    keys = [f"ASSET{i}" for i in range(35)] + ["ASSET3"]
+    positions_df = pd.DataFrame({
+        'asset_class': keys,
+        'quantity': [totals['trade_quantity'].get(k, 10.0) + (k.endswith('1') * 5) for k in keys],
+        'price': [totals['trade_price'].get(k, 2.5) + (k.endswith('2') * 1.5) for k in keys]
+    })
+    
+    discrepancies = find_discrepancies(positions_df, aggregate_trades(trades_df))
+    assert discrepancies
+    assert json.dumps(discrepancies) == json.dumps(legacy_discrepancies(positions_df, trades_df))
+
+def test_reconciliation_without_trades(clean_db, monkeypatch):
+    import pandas as pd
+    import app.services.reconciliation_service as rs
+    
+    monkeypatch.setattr(rs, "read_positions_from_csv", lambda as_of=None: pd.DataFrame({
+        'asset_class': ['EQUITY'], 'quantity': [1000], 'price': [50.0]
+    }))
+    result = run_reconciliation(clean_db)
+    assert json.loads(result.discrepancies) == [{
+        'asset_class': 'EQUITY', 'type': 'quantity', 'position_value': 1000.0,
+        'trade_value': 0, 'difference': 1000.0
+    }]
+
+def test_sql_aggregates_match_dataframe_aggregates(clean_db, monkeypatch):
+    from datetime import datetime
+    import pandas as pd
+    import app.services.reconciliation_service as rs
+    from app.services.trade_service import create_trades_bulk
+    
+    monkeypatch.setattr(rs, "read_positions_from_csv", lambda as_of=None: pd.DataFrame({
+        'asset_class': ['EQUITY', 'FOREX', 'COMMODITY'], 'quantity': [1000, 500, 200], 'price': [50.0, 1.25, 75.0]
+    }))
+    create_trades_bulk(clean_db, [
+        TradeCreate(trade_id="AGG1", trader="John Doe", asset_class="EQUITY", quantity=600, price=50.0),
+        TradeCreate(trade_id="AGG2", trader="John Doe", asset_class="EQUITY", quantity=400, price=50.0),
+        TradeCreate(trade_id="AGG3", trader="Jane Doe", asset_class="FOREX", quantity=500, price=1.5),
+        TradeCreate(trade_id="AGG4", trader="Jane Doe", asset_class="BOND", quantity=10, price=99.0)
+    ])
+    clean_db.query(Trade).filter(Trade.trade_id == "AGG2").update({"timestamp": datetime(2030, 1, 1)})
+    clean_db.commit()
+    
+    totals = rs.get_trade_totals(clean_db).set_index('asset_class')
+    assert totals.loc['EQUITY', 'trade_quantity'] == 1000
+    assert totals.loc['EQUITY', 'trade_count'] == 2
+    
+    for cutoff in (None, datetime(2029, 1, 1)):
+        in_sql = run_reconciliation(clean_db, cutoff, aggregate_in_sql=True)
+        in_pandas = run_reconciliation(clean_db, cutoff, aggregate_in_sql=False)
+        assert in_sql.discrepancies == in_pandas.discrepancies
+    
+    # the cutoff leaves out the equity trade booked after it
+    assert json.loads(in_sql.discrepancies)[0] == {
+        'asset_class': 'EQUITY', 'type': 'quantity', 'position_value': 1000.0,
+        'trade_value': 600.0, 'difference': 400.0
+    }
+
+def test_incremental_reconciliation_matches_full(clean_db, monkeypatch):
+    import numpy as np
+    import pandas as pd
+    import app.services.reconciliation_service as rs
+    from app.models.models import ReconciliationWatermark, TradeStatus
+    from app.services.trade_service import create_trades_bulk, update_trade_status
+    
+    monkeypatch.setattr(rs, "read_positions_from_csv", lambda as_of=None: pd.DataFrame({
+        'asset_class': ['ASSET0', 'ASSET1', 'ASSET2', 'ASSET3'],
+        'quantity': [5000, 5000, 5000, 5000],
+        'price': [12.5, 12.5, 12.5, 12.5]
+    }))
+    rng = np.random.default_rng(3)
+    
+    def sorted_totals(totals):
+        return totals.sort_values('asset_class').reset_index(drop=True).astype({'trade_count': int})
+    
+    for batch in range(4):
+        create_trades_bulk(clean_db, [
+            TradeCreate(
+                trade_id=f"INC{batch}_{i}", trader="John Doe", asset_class=f"ASSET{rng.integers(0, 4)}",
+                quantity=float(rng.integers(1, 100)), price=float(rng.integers(1, 100)) / 4
+            )
+            for i in range(50)
+        ])
+        update_trade_status(clean_db, f"INC{batch}_0", TradeStatus.COMPLETED)
+        
+        incremental = run_reconciliation(clean_db, incremental=True)
+        full = run_reconciliation(clean_db, incremental=False, use_cache=False)
+        assert incremental.discrepancies == full.discrepancies
+        pd.testing.assert_frame_equal(
+            sorted_totals(rs.get_incremental_trade_totals(clean_db)),
+            sorted_totals(rs.get_trade_totals(clean_db))
+        )
+        
+        watermark = clean_db.query(ReconciliationWatermark).one()
+        assert watermark.trade_count == 50 * (batch + 1)
+        assert watermark.max_trade_id == clean_db.query(Trade).count()
+    
+    # a rebuild lands on the same aggregates and watermark
+    rebuilt = run_reconciliation(clean_db, rebuild=True)
+    assert rebuilt.discrepancies == full.discrepancies
+    assert clean_db.query(ReconciliationWatermark).one().trade_count == 200
+    assert rs.fold_new_trades(clean_db) == 0
+
+def test_incremental_reconciliation_rebuilds_after_trades_reset(clean_db, monkeypatch):
+    import warnings
+    import pandas as pd
+    import app.services.reconciliation_service as rs
+    from app.db.sample_data import create_sample_trades
+    
+    monkeypatch.setattr(rs, "read_positions_from_csv", lambda as_of=None: pd.DataFrame({
+        'asset_class': ['EQUITY', 'FIXED_INCOME', 'COMMODITY', 'FOREX'],
+        'quantity': [5000, 50000, 500, 500000],
+        'price': [250.0, 100.0, 1000.0, 1.2]
+    }))
+    
+    # a sample data reset deletes every trade and reuses ids 1..20 on sqlite
+    for _ in range(2):
+        create_sample_trades(clean_db)
+        incremental = run_reconciliation(clean_db, incremental=True, use_cache=False)
+        full = run_reconciliation(clean_db, incremental=False, use_cache=False)
+        assert incremental.discrepancies == full.discrepancies
+    
+    # an explicit rebuild leaves no stale identities behind
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        rs.get_incremental_trade_totals(clean_db, rebuild=True)
+
+def test_incremental_aggregates_go_stale_on_trade_edits_only(clean_db):
+    import app.services.reconciliation_service as rs
+    from app.db.sample_data import create_sample_trades
+    from sqlalchemy import func
+    from app.models.models import ReconciliationWatermark, TradeStatus
+    
+    create_sample_trades(clean_db)
+    rs.get_incremental_trade_totals(clean_db)
+    clean_db.commit()
+    watermark = clean_db.query(ReconciliationWatermark).one()
+    
+    # status changes leave the totals alone
+    trade = clean_db.query(Trade).first()
+    trade.status = TradeStatus.FAILED
+    clean_db.commit()
+    assert not rs.incremental_aggregates_stale(clean_db, watermark)
+    
+    trade.quantity += 1
+    clean_db.commit()
+    assert rs.incremental_aggregates_stale(clean_db, watermark)
+    totals = rs.get_incremental_trade_totals(clean_db).set_index('asset_class')
+    expected = clean_db.query(func.sum(Trade.quantity)).filter(Trade.asset_class == trade.asset_class).scalar()
+    assert totals.loc[trade.asset_class, 'trade_quantity'] == pytest.approx(expected)
+
+def test_partitioned_reconciliation_by_composite_key(clean_db, tmp_path, monkeypatch):
+    import numpy as np
+    import pandas as pd
+    import app.services.reconciliation_service as rs
+    from app.services.trade_service import create_trades_bulk
+    
+    rng = np.random.default_rng(11)
+    traders = [f"trader {i}" for i in range(12)]
+    assets = ["EQUITY", "FOREX", "COMMODITY"]
+    create_trades_bulk(clean_db, [
+        TradeCreate(
+            trade_id=f"KEY{i}", trader=str(rng.choice(traders)), asset_class=str(rng.choice(assets)),
+            quantity=float(rng.integers(1, 50)), price=float(rng.integers(4, 40)) / 4
+        )
+        for i in range(300)
+    ])
+    trades_df = pd.read_sql("select trader, asset_class, quantity, price from trades", clean_db.get_bind())
+    totals = trades_df.groupby(['trader', 'asset_class']).agg(
+        trade_quantity=('quantity', 'sum'), trade_price=('price', 'mean'), trade_count=('quantity', 'size')
+    ).reset_index()
+    
+    # positions match the trades except for a few breaks and a key without trades
+    positions = totals.rename(columns={'trade_quantity': 'quantity', 'trade_price': 'price'})
+    positions = positions[['trader', 'asset_class', 'quantity', 'price']].sample(frac=1, random_state=1)
+    positions.iloc[0, 2] += 10
+    positions.iloc[5, 3] += 1
+    positions = pd.concat([positions, pd.DataFrame(
+        [{'trader': 'nobody', 'asset_class': 'EQUITY', 'quantity': 5.0, 'price': 1.0}]
+    )], ignore_index=True)
+    csv_path = tmp_path / "positions.csv"
+    positions.to_csv(csv_path, index=False)
+    monkeypatch.setattr(rs, "positions_path", lambda as_of=None: str(csv_path))
+    
+    expected = rs.find_discrepancies(positions, totals, key=('trader', 'asset_class'))
+    assert [(d['type'], d['trader']) for d in expected] == [
+        ('quantity', positions.iloc[0, 0]), ('price', positions.iloc[5, 0]), ('quantity', 'nobody')
+    ]
+    for chunk_size in (7, 1000):
+        result = run_reconciliation(clean_db, key="trader,asset_class", chunk_size=chunk_size, use_cache=False)
+        assert json.loads(result.discrepancies) == expected
+    
+    # reconciling by asset class through the join agrees with the in-memory comparison
+    by_asset = run_reconciliation(clean_db, key="asset_class", chunk_size=2)
+    assert json.loads(by_asset.discrepancies) == rs.find_discrepancies(
+        pd.read_csv(csv_path), rs.aggregate_trades(trades_df)
+    )
+    
+    with pytest.raises(ValueError):
+        rs.parse_reconciliation_key("trader,book")
+    with pytest.raises(ValueError):
+        rs.parse_reconciliation_key("trader")
+
+def test_parallel_reconciliation_matches_serial(clean_db, tmp_path, monkeypatch):
+    import pandas as pd
+    import app.services.reconciliation_service as rs
+    from app.services.trade_service import create_trades_bulk
+    
+    create_trades_bulk(clean_db, [
+        TradeCreate(
+            trade_id=f"PAR{i}", trader=f"trader {i % 7}", asset_class=("EQUITY", "FOREX", "BOND")[i % 3],
+            quantity=float(10 + i % 5), price=float(4 + i % 9) / 2
+        )
+        for i in range(210)
+    ])
+    positions = pd.DataFrame({
+        'trader': [f"trader {i % 7}" for i in range(21)] + ["nobody"],
+        'asset_class': [("EQUITY", "FOREX", "BOND")[i % 3] for i in range(21)] + ["EQUITY"],
+        'quantity': [120.0] * 22,
+        'price': [3.5] * 22
+    })
+    csv_path = tmp_path / "positions.csv"
+    positions.to_csv(csv_path, index=False)
+    monkeypatch.setattr(rs, "positions_path", lambda as_of=None: str(csv_path))
+    
+    for key in ("asset_class", "trader,asset_class"):
+        serial = rs.find_discrepancies_partitioned(clean_db, rs.parse_reconciliation_key(key))
+        result = run_reconciliation(clean_db, key=key, workers=3)
+        assert serial
+        assert json.loads(result.discrepancies) == serial
+
+def test_unchanged_inputs_are_served_from_cache(clean_db, tmp_path, monkeypatch):
+    from datetime import datetime
+    import app.services.reconciliation_service as rs
+    from app.models.models import ReconciliationDiscrepancy
+    from app.services.trade_service import create_trades_bulk
+    
+    csv_path = tmp_path / "positions.csv"
+    csv_path.write_text("asset_class,quantity,price\nEQUITY,100,50.0\nFOREX,300,1.5\n")
+    monkeypatch.setattr(rs, "positions_path", lambda as_of=None: str(csv_path))
+    create_trades_bulk(clean_db, [
+        TradeCreate(trade_id="CACHE1", trader="John Doe", asset_class="EQUITY", quantity=100, price=55.0),
+        TradeCreate(trade_id="CACHE2", trader="John Doe", asset_class="FOREX", quantity=200, price=1.5)
+    ])
+    
+    first = run_reconciliation(clean_db)
+    monkeypatch.setattr(rs, "get_incremental_trade_totals", None)
+    cached = run_reconciliation(clean_db)
+    assert "served from cache of run" in cached.summary
+    assert cached.id != first.id
+    assert cached.status == first.status
+    assert json.loads(cached.discrepancies) == json.loads(first.discrepancies)
+    assert clean_db.query(ReconciliationDiscrepancy).filter_by(reconciliation_log_id=cached.id).count() == 2
+    monkeypatch.undo()
+    monkeypatch.setattr(rs, "positions_path", lambda as_of=None: str(csv_path))
+    
+    # a new trade, a changed positions file or another cutoff recompute
+    create_trades_bulk(clean_db, [
+        TradeCreate(trade_id="CACHE3", trader="John Doe", asset_class="FOREX", quantity=100, price=1.5)
+    ])
+    after_trade = run_reconciliation(clean_db)
+    assert "served from cache" not in after_trade.summary
+    assert len(json.loads(after_trade.discrepancies)) == 1
+    csv_path.write_text("asset_class,quantity,price\nEQUITY,100,55.0\nFOREX,300,1.5\n")
+    after_positions = run_reconciliation(clean_db)
+    assert "served from cache" not in after_positions.summary
+    assert after_positions.status == ReconciliationStatus.SUCCESS
+    assert "served from cache" in run_reconciliation(clean_db).summary
+    assert "served from cache" not in run_reconciliation(clean_db, cutoff=datetime(2100, 1, 1)).summary
+    
+    # trades deleted and replaced by as many under the same ids recompute
+    before_reset = run_reconciliation(clean_db)
+    clean_db.query(Trade).delete()
+    clean_db.commit()
+    create_trades_bulk(clean_db, [
+        TradeCreate(trade_id=f"RESET{i}", trader="John Doe", asset_class="EQUITY", quantity=50, price=50.0)
+        for i in range(3)
+    ])
+    assert max(trade.id for trade in clean_db.query(Trade)) == 3
+    after_reset = run_reconciliation(clean_db)
+    assert "served from cache" not in after_reset.summary
+    assert json.loads(after_reset.discrepancies) != json.loads(before_reset.discrepancies)
+
+
+def test_streaming_reconciliation_matches_full_run(clean_db, tmp_path, monkeypatch):
+    import numpy as np
+    import app.services.reconciliation_service as rs
+    from app.models.models import TradeStatus
+    from app.services.streaming_reconciliation_service import StreamingReconciler, unmatched_breaks
+    from app.services.trade_service import create_trades_bulk, update_trade_status
+    from tests.conftest import TestingSessionLocal
+    
+    traders = [f"trader {i}" for i in range(4)]
+    assets = ["EQUITY", "FOREX", "BOND"]
+    csv_path = tmp_path / "positions.csv"
+    csv_path.write_text("trader,asset_class,quantity,price\n" + "".join(
+        f"{trader},{asset},{100 + 10 * i},{2.5 + i % 3}\n"
+        for i, (trader, asset) in enumerate((t, a) for t in traders for a in assets)
+    ))
+    monkeypatch.setattr(rs, "positions_path", lambda as_of=None: str(csv_path))
+    rng = np.random.default_rng(5)
+    
+    def random_trade(trade_id):
+        return TradeCreate(
+            trade_id=trade_id, trader=str(rng.choice(traders)), asset_class=str(rng.choice(assets)),
+            quantity=float(rng.integers(1, 40)), price=float(rng.integers(8, 16)) / 4
+        )
+    
+    create_trades_bulk(clean_db, [random_trade(f"SEED{i}") for i in range(30)])
+    reconciler = StreamingReconciler()
+    reconciler.start(TestingSessionLocal, "trader,asset_class")
+    
+    def assert_consistent():
+        reconciler.catch_up(clean_db)
+        full = run_reconciliation(clean_db, key="trader,asset_class", use_cache=False)
+        expected = json.loads(full.discrepancies)
+        assert expected
+        assert unmatched_breaks(expected, reconciler.breaks(), reconciler.key) == []
+        assert unmatched_breaks(reconciler.breaks(), expected, reconciler.key) == []
+    
+    assert_consistent()
+    for i in range(40):
+        reconciler.on_trades([create_trade(clean_db, random_trade(f"LIVE{i}"))])
+        if i % 10 == 0:
+            reconciler.on_status_change(update_trade_status(clean_db, f"LIVE{i}", TradeStatus.COMPLETED))
+            assert_consistent()
+    
+    # trades loaded without events are caught up, and a live trade after them triggers the catch-up
+    create_trades_bulk(clean_db, [random_trade(f"BULK{i}") for i in range(25)])
+    reconciler.on_trades([create_trade(clean_db, random_trade("AFTER_BULK"))])
+    assert reconciler.state()["trade_count"] == 30 + 40 + 25 + 1
+    assert_consistent()
+    assert reconciler.verify(clean_db)["consistent"]
+    
+    # trades keep streaming in while verify runs the full reconciliation
+    import threading
+    import app.services.streaming_reconciliation_service as srs
+    full_reconciliation = srs.find_discrepancies_partitioned
+    
+    def book_trade():
+        db = TestingSessionLocal()
+        try:
+            reconciler.on_trades([create_trade(db, random_trade("DURING_VERIFY"))])
+        finally:
+            db.close()
+    
+    def reconcile_while_booking(*args, **kwargs):
+        booking = threading.Thread(target=book_trade)
+        booking.start()
+        booking.join(5)
+        assert not booking.is_alive()
+        return full_reconciliation(*args, **kwargs)
+    
+    monkeypatch.setattr(srs, "find_discrepancies_partitioned", reconcile_while_booking)
+    assert reconciler.verify(clean_db)["consistent"]
+    assert reconciler.state()["trade_count"] == 30 + 40 + 25 + 1 + 1
+
+def test_match_records_one_to_one_many_and_partial():
+    from app.services.matching_service import match_records
+    import pandas as pd
+    
+    left = pd.DataFrame([
+        {"id": 1, "trader": "A", "asset_class": "EQUITY", "quantity": 100.0, "price": 10.0},
+        # straddles a quantity bucket boundary of its counterpart
+        {"id": 2, "trader": "A", "asset_class": "EQUITY", "quantity": 200.004, "price": 20.0},
+        {"id": 3, "trader": "A", "asset_class": "FOREX", "quantity": 300.0, "price": 1.5},
+        {"id": 4, "trader": "B", "asset_class": "EQUITY", "quantity": 50.0, "price": 10.0},
+        {"id": 5, "trader": "B", "asset_class": "EQUITY", "quantity": 70.0, "price": 10.0},
+        {"id": 6, "trader": "B", "asset_class": "FOREX", "quantity": 10.0, "price": 2.0},
+        {"id": 7, "trader": "C", "asset_class": "COMMODITY", "quantity": 5.0, "price": 75.0}
+    ])
+    right = pd.DataFrame([
+        {"id": 11, "trader": "A", "asset_class": "EQUITY", "quantity": 100.005, "price": 10.004},
+        {"id": 12, "trader": "A", "asset_class": "EQUITY", "quantity": 200.006, "price": 20.0},
+        {"id": 13, "trader": "A", "asset_class": "FOREX", "quantity": 100.0, "price": 1.5},
+        {"id": 14, "trader": "A", "asset_class": "FOREX", "quantity": 200.0, "price": 1.5},
+        {"id": 15, "trader": "B", "asset_class": "EQUITY", "quantity": 120.0, "price": 10.0},
+        {"id": 16, "trader": "B", "asset_class": "FOREX", "quantity": 12.0, "price": 2.0},
+        {"id": 17, "trader": "D", "asset_class": "EQUITY", "quantity": 1.0, "price": 1.0}
+    ])
+    
+    result = match_records(left, right)
+    links = {
+        (row.match_type, row.left_id, row.right_id)
+        for row in result["matched"].itertuples()
+    }
+    assert links == {
+        ("one_to_one", 1, 11),
+        ("one_to_one", 2, 12),
+        ("one_to_many", 3, 13),
+        ("one_to_many", 3, 14),
+        ("many_to_one", 4, 15),
+        ("many_to_one", 5, 15)
+    }
+    partial = result["partial"].to_dict("records")
+    assert len(partial) == 1
+    assert (partial[0]["trader"], partial[0]["asset_class"]) == ("B", "FOREX")
+    assert (partial[0]["left_ids"], partial[0]["right_ids"]) == ([6], [16])
+    assert partial[0]["quantity_difference"] == pytest.approx(-2.0)
+    assert result["unmatched_left"]["id"].tolist() == [7]
+    assert result["unmatched_right"]["id"].tolist() == [17]
+    
+    with pytest.raises(ValueError):
+        match_records(left.drop(columns="price"), right)
+
+def test_backfill_matches_as_of_runs(clean_db, tmp_path, monkeypatch):
+    from datetime import date, datetime
+    import app.services.reconciliation_service as rs
+    from app.models.models import TradeStatus
+    from app.services.backfill_service import backfill_reconciliation
+    
+    monkeypatch.setattr(rs, "POSITIONS_SNAPSHOT_FILE", str(tmp_path / "positions_{date}.csv"))
+    # monday to wednesday, the weekend before is folded into monday
+    bookings = [
+        (datetime(2024, 1, 5, 10), "EQUITY", 100, 50.0),
+        (datetime(2024, 1, 6, 11), "FOREX", 1000, 1.2),
+        (datetime(2024, 1, 8, 9), "EQUITY", 50, 52.0),
+        (datetime(2024, 1, 8, 23, 59, 59), "FOREX", 500, 1.2),
+        (datetime(2024, 1, 10, 16), "EQUITY", 25, 50.0),
+        (datetime(2024, 1, 11, 9), "EQUITY", 1000, 50.0)
+    ]
+    for i, (timestamp, asset_class, quantity, price) in enumerate(bookings):
+        clean_db.add(Trade(
+            trade_id=f"ASOF{i}", trader="John Doe", asset_class=asset_class,
+            quantity=quantity, price=price, timestamp=timestamp, status=TradeStatus.COMPLETED
+        ))
+    clean_db.commit()
+    (tmp_path / "positions_2024-01-08.csv").write_text("asset_class,quantity,price\nEQUITY,150,50.0\nFOREX,1500,1.2\n")
+    (tmp_path / "positions_2024-01-10.csv").write_text("asset_class,quantity,price\nEQUITY,175,51.0\nFOREX,1400,1.2\n")
+    
+    as_of = run_reconciliation(clean_db, as_of=date(2024, 1, 8), use_cache=False)
+    assert "as of 2024-01-08" in as_of.summary
+    assert [(d["asset_class"], d["type"]) for d in json.loads(as_of.discrepancies)] == [("EQUITY", "price")]
+    with pytest.raises(ValueError):
+        run_reconciliation(clean_db, cutoff=datetime(2024, 1, 8), as_of=date(2024, 1, 8))
+    
+    results = backfill_reconciliation(clean_db, date(2024, 1, 6), date(2024, 1, 10), workers=2)
+    assert [result["as_of"] for result in results] == [date(2024, 1, 8), date(2024, 1, 9), date(2024, 1, 10)]
+    assert results[1]["status"] == ReconciliationStatus.FAILED
+    assert "positions snapshot for 2024-01-09 not found" in results[1]["error"]
+    for result in (results[0], results[2]):
+        expected = run_reconciliation(clean_db, as_of=result["as_of"], use_cache=False)
+        backfilled = clean_db.get(rs.ReconciliationLog, result["reconciliation_log_id"])
+        assert backfilled.status == expected.status
+        assert json.loads(backfilled.discrepancies) == json.loads(expected.discrepancies)
+        assert [stage.stage for stage in backfilled.stages] == ["trades", "positions", "compare", "save"]
+    assert results[2]["discrepancies"] == 2
+
+def test_reconciliation_reads_position_snapshots(clean_db, tmp_path, monkeypatch):
+    from datetime import date
+    import pandas as pd
+    import app.services.reconciliation_service as rs
+    from app.services.position_snapshot_service import create_position_snapshot, parse_positions_file
+    from app.services.trade_service import create_trades_bulk
+    
+    csv_path = tmp_path / "positions.csv"
+    csv_path.write_text(
+        "trader,asset_class,quantity,price\n"
+        "John Doe,EQUITY,100,50.0\nJane Roe,EQUITY,40,51.0\nJohn Doe,FX,300,1.5\nJane Roe,RATES,5,99.0\n"
+    )
+    monkeypatch.setattr(rs, "positions_path", lambda as_of=None: str(csv_path))
+    create_trades_bulk(clean_db, [
+        TradeCreate(trade_id="SNAP1", trader="John Doe", asset_class="EQUITY", quantity=100, price=55.0),
+        TradeCreate(trade_id="SNAP2", trader="Jane Roe", asset_class="EQUITY", quantity=40, price=51.0),
+        TradeCreate(trade_id="SNAP3", trader="John Doe", asset_class="FX", quantity=200, price=1.5)
+    ])
+    snapshot = create_position_snapshot(clean_db, parse_positions_file(str(csv_path)), date(2024, 1, 8), "positions.csv")
+    assert (snapshot.version, snapshot.row_count) == (1, 4)
+    
+    for options in ({}, {"key": "trader,asset_class"}, {"key": "trader,asset_class", "chunk_size": 2}):
+        from_file = run_reconciliation(clean_db, use_cache=False, **options)
+        from_snapshot = run_reconciliation(clean_db, snapshot_id=snapshot.id, use_cache=False, **options)
+        assert json.loads(from_file.discrepancies)
+        assert json.loads(from_snapshot.discrepancies) == json.loads(from_file.discrepancies)
+    
+    # snapshots are immutable, so unchanged reruns are served from cache
+    run_reconciliation(clean_db, snapshot_id=snapshot.id)
+    assert "served from cache" in run_reconciliation(clean_db, snapshot_id=snapshot.id).summary
+    
+    # as-of runs prefer the latest stored snapshot of the date over the snapshot file
+    for price in (50.0, 54.0):
+        create_position_snapshot(clean_db, pd.DataFrame({
+            "asset_class": ["EQUITY", "FX"], "quantity": [140.0, 200.0], "price": [price, 1.5]
+        }), date.today())
+    as_of = run_reconciliation(clean_db, as_of=date.today(), use_cache=False)
+    assert [(d["asset_class"], d["type"], d["trade_value"]) for d in json.loads(as_of.discrepancies)] == [
+        ("EQUITY", "price", 53.0)
+    ]
+    
+    with pytest.raises(ValueError, match="has no trader column"):
+        run_reconciliation(clean_db, snapshot_id=snapshot.id + 1, key="trader,asset_class", use_cache=False)
+    with pytest.raises(ValueError, match="not found"):
+        run_reconciliation(clean_db, snapshot_id=999, use_cache=False)
+
+def test_position_snapshot_version_race_is_retried(clean_db):
+    from datetime import date
+    import pandas as pd
+    from sqlalchemy import event
+    from sqlalchemy.orm import Session
+    from app.models.models import PositionSnapshotVersion
+    from app.services.position_snapshot_service import create_position_snapshot
+    
+    positions = pd.DataFrame({"asset_class": ["EQUITY"], "quantity": [100.0], "price": [50.0]})
+    raced = []
+    
+    @event.listens_for(clean_db, "before_flush")
+    def concurrent_upload(session, flush_context, instances):
+        # another upload of the date commits version 1 after this one numbered itself
+        if not raced:
+            raced.append(True)
+            with Session(bind=clean_db.get_bind()) as other:
+                create_position_snapshot(other, positions, date(2024, 1, 8), "other.csv")
+    
+    snapshot = create_position_snapshot(clean_db, positions, date(2024, 1, 8), "eod.csv")
+    event.remove(clean_db, "before_flush", concurrent_upload)
+    assert raced
+    assert snapshot.version == 2
+    assert [version.source for version in clean_db.query(PositionSnapshotVersion).order_by(PositionSnapshotVersion.version)] == ["other.csv", "eod.csv"]
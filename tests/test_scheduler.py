@@ -1,15 +1,16 @@
 import pytest
-from datetime import datetime, timedelta
-from app.services.scheduler_service import scheduler, run_scheduled_reconciliation, start_scheduler
+from datetime import datetime, timedelta, timezone
+from app.services.scheduler_service import SchedulerLeader, scheduler, run_as_leader, run_scheduled_reconciliation, start_scheduler
 from app.db.base import Base, SessionLocal
-from app.models.models import OperationalLog, ReconciliationLog, ReconciliationStatus
+from app.models.models import OperationalLog, ReconciliationLog, ReconciliationStatus, SchedulerLease
 from app.schemas.schemas import TradeCreate
 from app.services.trade_service import create_trade
 import os
 import shutil
 from apscheduler.schedulers.background import BackgroundScheduler
 import pandas as pd
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, update
+from sqlalchemy.orm import Session
 
 # Test database URL
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
@@ -94,4 +95,29 @@ def test_scheduler_job_creation(clean_db):
         scheduler.shutdown()
         
     finally:
-        clean_db.close() 
\ No newline at end of file
+        clean_db.close() 
+
+def test_scheduler_leader_election():
+    first = SchedulerLeader(engine)
+    second = SchedulerLeader(engine)
+    runs = []
+
+    # one process leads, the other skips the scheduled jobs
+    assert first.refresh()
+    assert not second.refresh()
+    assert run_as_leader(first, runs.append, "first") is None
+    assert run_as_leader(second, runs.append, "second") is None
+    assert runs == ["first"]
+
+    # the leader dies without releasing its lease, which then runs out
+    with Session(engine) as db:
+        db.execute(update(SchedulerLease).values(expires_at=datetime.now(timezone.utc) - timedelta(seconds=1)))
+        db.commit()
+    assert second.refresh()
+    assert not first.refresh()
+    assert not first.is_leader
+
+    # a leader that stops hands over on the next heartbeat
+    second.release()
+    assert first.refresh()
+    first.release()
@@ -6,7 +6,7 @@ from app.db.base import Base, get_db
 import pytest
 from app.models.models import Trade, TradeStatus
 from app.schemas.schemas import TradeCreate
-from app.services.trade_service import create_trade, get_trades
+from app.services.trade_service import create_trade, create_trades_bulk, get_trades, get_trades_page, ingest_trade_records, iter_lines, iter_trade_records
 from datetime import datetime
 
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
@@ -159,4 +159,165 @@ def test_get_trades_api(client, db_session):
     assert response.status_code == 200
     data = response.json()
     assert len(data) == 1
-    assert data[0]["trade_id"] == "TRADE001" 
\ No newline at end of file
+    assert data[0]["trade_id"] == "TRADE001" 
+
+def test_create_trades_bulk(db_session):
+    trades = [
+        TradeCreate(trade_id=f"BULK{i}", trader="John Doe", asset_class="EQUITY", quantity=100, price=50.0)
+        for i in range(25)
+    ]
+    
+    result = create_trades_bulk(db_session, trades, chunk_size=7)
+    assert result["accepted"] == 25
+    assert result["rejected"] == 0
+    assert all(r["accepted"] for r in result["results"])
+    assert db_session.query(Trade).count() == 25
+    assert all(t.status == TradeStatus.PENDING for t in db_session.query(Trade).all())
+    
+    # resubmitting the same batch rejects every row and inserts nothing
+    result = create_trades_bulk(db_session, trades)
+    assert result["accepted"] == 0
+    assert result["rejected"] == 25
+    assert db_session.query(Trade).count() == 25
+
+def test_ingest_trade_records_reports_parse_errors(db_session):
+    lines = iter_lines([b'{"trade_id": "S1", "trader": "A", "asset_cl', b'ass": "EQUITY", "quantity": 1, "price": 2}\n{oops\n'])
+    
+    progress = ingest_trade_records(db_session, iter_trade_records(lines, "ndjson"), commit_every=1)
+    assert progress["status"] == "completed"
+    assert progress["accepted"] == 1
+    assert progress["rejected"] == 1
+    assert "invalid json on line 2" in progress["errors"][0]["reason"]
+
+def test_upload_progress_keeps_only_recent_finished_uploads(db_session, monkeypatch):
+    import app.services.trade_service as ts
+    
+    monkeypatch.setattr(ts, "UPLOAD_PROGRESS_HISTORY", 2)
+    monkeypatch.setattr(ts, "upload_progress", {})
+    for i in range(4):
+        lines = iter_lines([f'{{"trade_id": "P{i}", "trader": "A", "asset_class": "EQUITY", "quantity": 1, "price": 2}}\n'.encode()])
+        ingest_trade_records(db_session, iter_trade_records(lines, "ndjson"), upload_id=f"upload{i}")
+    assert list(ts.upload_progress) == ["upload2", "upload3"]
+    assert ts.get_upload_progress("upload0") is None
+    assert ts.get_upload_progress("upload3")["accepted"] == 1
+
+def test_group_commit_writer(db_session):
+    from concurrent.futures import ThreadPoolExecutor
+    from app.services.trade_writer_service import GroupCommitWriter
+    
+    writer = GroupCommitWriter(max_batch=10, max_delay_ms=20)
+    writer.start(TestingSessionLocal)
+    try:
+        trades = [
+            TradeCreate(trade_id=f"GC{i}", trader="John Doe", asset_class="EQUITY", quantity=100, price=50.0)
+            for i in range(30)
+        ]
+        trades.append(trades[0])
+        
+        def submit(trade):
+            try:
+                return writer.create_trade(trade)
+            except ValueError as e:
+                return e
+        
+        with ThreadPoolExecutor(max_workers=16) as pool:
+            results = list(pool.map(submit, trades))
+    finally:
+        writer.stop()
+    
+    created = [r for r in results if not isinstance(r, Exception)]
+    failed = [r for r in results if isinstance(r, Exception)]
+    assert len(created) == 30
+    assert len(failed) == 1
+    assert all(t.id is not None and t.status == TradeStatus.PENDING for t in created)
+    assert db_session.query(Trade).count() == 30
+    
+    metrics = writer.metrics()
+    assert metrics["trades_written"] == 30
+    assert metrics["trades_failed"] == 1
+    assert metrics["batches_flushed"] < 31
+    assert metrics["max_batch_size"] <= 10
+    assert metrics["queue_depth"] == 0
+
+def test_group_commit_writer_survives_session_errors(db_session):
+    import threading
+    from app.services.trade_writer_service import GroupCommitWriter
+    
+    healthy = threading.Event()
+    
+    def flaky_session_factory(**kwargs):
+        if not healthy.is_set():
+            raise RuntimeError("database unavailable")
+        return TestingSessionLocal(**kwargs)
+    
+    writer = GroupCommitWriter(max_batch=1, max_delay_ms=0)
+    writer.start(flaky_session_factory)
+    try:
+        trade = TradeCreate(trade_id="GC0", trader="John Doe", asset_class="EQUITY", quantity=100, price=50.0)
+        futures = [writer.submit(trade), writer.submit(trade.model_copy(update={"trade_id": "GC1"}))]
+        for future in futures:
+            with pytest.raises(ValueError, match="database unavailable"):
+                future.result(timeout=5)
+        assert writer.running
+        
+        healthy.set()
+        created = writer.create_trade(trade.model_copy(update={"trade_id": "GC2"}), timeout=5)
+    finally:
+        writer.stop()
+    
+    assert created.id is not None
+    assert db_session.query(Trade).count() == 1
+    assert writer.metrics()["trades_failed"] == 2
+
+def test_get_trades_page_keyset(db_session):
+    # bulk inserts share one timestamp, so ordering relies on the id tie-breaker
+    create_trades_bulk(db_session, [
+        TradeCreate(trade_id=f"PAGE{i}", trader="John Doe", asset_class="EQUITY", quantity=100, price=50.0)
+        for i in range(7)
+    ])
+    
+    seen = []
+    cursor = None
+    while True:
+        page, cursor = get_trades_page(db_session, cursor=cursor, limit=3)
+        seen.extend(t.trade_id for t in page)
+        if not cursor:
+            break
+    assert seen == [f"PAGE{i}" for i in reversed(range(7))]
+    assert seen == [t.trade_id for t in get_trades(db_session, limit=10)]
+    
+    # offset paging still works and hands out a cursor for the following page
+    page, cursor = get_trades_page(db_session, skip=2, limit=2)
+    assert [t.trade_id for t in page] == ["PAGE4", "PAGE3"]
+    page, _ = get_trades_page(db_session, cursor=cursor, limit=2)
+    assert [t.trade_id for t in page] == ["PAGE2", "PAGE1"]
+    
+    with pytest.raises(ValueError):
+        get_trades_page(db_session, cursor="not-a-cursor")
+
+def test_ensure_indexes_on_existing_database(db_session):
+    from sqlalchemy import inspect
+    from app.db.db_utils import ensure_indexes
+    
+    with engine.begin() as connection:
+        connection.exec_driver_sql("DROP INDEX ix_trades_trader_timestamp")
+    
+    assert ensure_indexes(engine) == ["ix_trades_trader_timestamp"]
+    assert ensure_indexes(engine) == []
+    assert "ix_trades_trader_timestamp" in {ix["name"] for ix in inspect(engine).get_indexes("trades")}
+
+def test_export_trades_parquet_in_batches(db_session):
+    import io
+    import pyarrow.parquet as pq
+    from app.services.trade_service import export_trades
+    
+    create_trades_bulk(db_session, [
+        TradeCreate(trade_id=f"EXP{i}", trader="John Doe", asset_class="EQUITY", quantity=100, price=50.0)
+        for i in range(25)
+    ])
+    
+    pieces = list(export_trades(db_session, "parquet", batch_size=10))
+    parquet = pq.ParquetFile(io.BytesIO(b"".join(pieces)))
+    assert parquet.metadata.num_rows == 25
+    assert parquet.metadata.num_row_groups == 3
+    assert parquet.read().column("trade_id").to_pylist() == [f"EXP{i}" for i in range(25)]